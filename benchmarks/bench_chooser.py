@@ -0,0 +1,79 @@
+"""
+Change your nautilus directories icons easily
+
+Author : Bilal Elmoussaoui (bil.elmoussaoui@gmail.com)
+Website : https://github.com/bilelmoussaoui/nautilus-folder-icons
+Licence : GPL-3.0
+nautilus-folder-icons is free software: you can redistribute it and/or
+modify it under the terms of the GNU General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+nautilus-folder-icons is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+You should have received a copy of the GNU General Public License
+along with nautilus-folder-icons. If not, see <http://www.gnu.org/licenses/>.
+"""
+import os
+from argparse import ArgumentParser
+from shutil import rmtree
+from tempfile import mkdtemp
+from time import time
+
+from common import (create_icon_theme, get_peak_rss, get_rss, report,
+                    use_icon_theme)
+
+
+def open_chooser(folder):
+    """Open the chooser and wait until all the icons are in the view.
+
+    Returns:
+        float: the window-ready time in seconds.
+    """
+    from gi.repository import GLib
+    from utils import IconCatalog
+    from widgets import FolderIconChooser
+
+    loop = GLib.MainLoop()
+    start = time()
+    chooser = FolderIconChooser([folder])
+    chooser.show_all()
+    chooser.connect("loaded", lambda *args: GLib.idle_add(loop.quit))
+    loop.run()
+    ready = time() - start
+    count = len(chooser._store)
+    chooser.destroy()
+    # Drop the shared catalog, so each run loads the icons again
+    IconCatalog._default = None
+    return ready, count
+
+
+def main():
+    parser = ArgumentParser(description="Icon chooser benchmark")
+    parser.add_argument("--count", type=int, default=5000,
+                        help="number of icons of the synthetic theme")
+    args = parser.parse_args()
+
+    tmp_dir = mkdtemp()
+    try:
+        os.environ["XDG_CACHE_HOME"] = os.path.join(tmp_dir, "cache")
+        create_icon_theme(os.path.join(tmp_dir, "icons"), args.count)
+        use_icon_theme(os.path.join(tmp_dir, "icons"))
+
+        rss_before = get_rss()
+        for run in ("cold", "warm"):
+            ready, count = open_chooser(tmp_dir)
+            report("chooser-" + run, {
+                "icons": count,
+                "window_ready": ready,
+                "rss": get_rss(),
+                "rss_delta": get_rss() - rss_before,
+                "peak_rss": get_peak_rss(),
+            })
+    finally:
+        rmtree(tmp_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Change your nautilus directories icons easily
+
+Author : Bilal Elmoussaoui (bil.elmoussaoui@gmail.com)
+Website : https://github.com/bilelmoussaoui/nautilus-folder-icons
+Licence : GPL-3.0
+nautilus-folder-icons is free software: you can redistribute it and/or
+modify it under the terms of the GNU General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+nautilus-folder-icons is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+You should have received a copy of the GNU General Public License
+along with nautilus-folder-icons. If not, see <http://www.gnu.org/licenses/>.
+"""
+import os
+from argparse import ArgumentParser
+from io import BytesIO
+from shutil import rmtree
+from tempfile import mkdtemp
+from time import time
+
+from common import get_peak_rss, report
+from cli import main
+
+
+class NullOutput(object):
+
+    def write(self, data):
+        pass
+
+
+def create_folders(root, count):
+    """Create `count` empty folders, 100 per parent folder."""
+    folders = []
+    for i in range(count):
+        folder = os.path.join(root, "{:03d}".format(i // 100),
+                              "{:05d}".format(i))
+        os.makedirs(folder)
+        folders.append(folder)
+    return folders
+
+
+def main_bench():
+    parser = ArgumentParser(description="Command line interface benchmark")
+    parser.add_argument("--count", type=int, default=10000,
+                        help="number of folders")
+    parser.add_argument("--jobs", type=int, nargs="+", default=[1, 4, 8],
+                        help="number of workers")
+    args = parser.parse_args()
+
+    # The GVfs metadata is stored per home directory
+    root = mkdtemp(dir=os.path.expanduser("~"))
+    try:
+        folders = create_folders(root, args.count)
+        stdin = b"\0".join(folder.encode("utf-8") for folder in folders)
+        for jobs in args.jobs:
+            for command in (["set", "folder-videos"], ["get"], ["restore"]):
+                start = time()
+                main(["-j", str(jobs)] + command, BytesIO(stdin),
+                     NullOutput())
+                elapsed = time() - start
+                report("cli-" + command[0], {
+                    "folders": args.count,
+                    "jobs": jobs,
+                    "wall_time": elapsed,
+                    "ops_per_sec": args.count / elapsed,
+                    "peak_rss": get_peak_rss(),
+                })
+    finally:
+        rmtree(root)
+
+
+if __name__ == "__main__":
+    main_bench()
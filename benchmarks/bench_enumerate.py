@@ -0,0 +1,88 @@
+"""
+Change your nautilus directories icons easily
+
+Author : Bilal Elmoussaoui (bil.elmoussaoui@gmail.com)
+Website : https://github.com/bilelmoussaoui/nautilus-folder-icons
+Licence : GPL-3.0
+nautilus-folder-icons is free software: you can redistribute it and/or
+modify it under the terms of the GNU General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+nautilus-folder-icons is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+You should have received a copy of the GNU General Public License
+along with nautilus-folder-icons. If not, see <http://www.gnu.org/licenses/>.
+"""
+import os
+from argparse import ArgumentParser
+from shutil import rmtree
+from tempfile import mkdtemp
+from time import time
+
+from gi.repository import GLib
+
+from common import report
+from metadata import (ChildrenIcons, get_default_icon, iter_children_icons,
+                      set_default_icon)
+
+
+def read_async(directory):
+    """Read the children icons with ChildrenIcons."""
+    loop = GLib.MainLoop()
+    icons = []
+    reader = ChildrenIcons(directory)
+    reader.connect("icons", lambda reader, batch: icons.extend(batch))
+    reader.connect("finished", lambda *args: loop.quit())
+    reader.start()
+    loop.run()
+    return icons
+
+
+def main():
+    parser = ArgumentParser(description="Children icons reading benchmark")
+    parser.add_argument("--counts", type=int, nargs="+",
+                        default=[1000, 10000, 50000],
+                        help="number of children folders")
+    args = parser.parse_args()
+
+    for count in args.counts:
+        # The GVfs metadata is stored per home directory
+        root = mkdtemp(dir=os.path.expanduser("~"))
+        try:
+            for i in range(count):
+                folder = os.path.join(root, "{:05d}".format(i))
+                os.mkdir(folder)
+                # Customize one folder out of ten
+                if i % 10 == 0:
+                    set_default_icon(folder, "folder-music", False)
+            names = sorted(os.listdir(root))
+
+            start = time()
+            for name in names:
+                get_default_icon(os.path.join(root, name))
+            per_path = time() - start
+
+            start = time()
+            for _ in iter_children_icons(root):
+                pass
+            enumerate_sync = time() - start
+
+            start = time()
+            read_async(root)
+            enumerate_async = time() - start
+
+            report("children-icons", {
+                "folders": count,
+                "per_path": per_path,
+                "enumerate_sync": enumerate_sync,
+                "enumerate_async": enumerate_async,
+                "speedup": per_path / max(enumerate_sync, 1e-9),
+            })
+        finally:
+            rmtree(root)
+
+
+if __name__ == "__main__":
+    main()
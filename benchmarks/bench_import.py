@@ -0,0 +1,117 @@
+"""
+Change your nautilus directories icons easily
+
+Author : Bilal Elmoussaoui (bil.elmoussaoui@gmail.com)
+Website : https://github.com/bilelmoussaoui/nautilus-folder-icons
+Licence : GPL-3.0
+nautilus-folder-icons is free software: you can redistribute it and/or
+modify it under the terms of the GNU General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+nautilus-folder-icons is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+You should have received a copy of the GNU General Public License
+along with nautilus-folder-icons. If not, see <http://www.gnu.org/licenses/>.
+"""
+import os
+import subprocess
+import sys
+from argparse import ArgumentParser
+from shutil import rmtree
+from tempfile import mkdtemp
+
+from common import ABS_PATH, report
+
+# The modules that must not be imported with the file manager
+LAZY_MODULES = ("utils", "widgets", "cache", "search",
+                "gi.repository.GdkPixbuf")
+
+# What the file manager's python loader imports before the extension
+BASELINE = """
+from gi import require_version
+require_version("{typelib}", "3.0")
+from gi.repository import GObject, {typelib}
+"""
+
+
+def render_extension(directory, file_manager):
+    """Write the extension module with the build time variables."""
+    template = os.path.join(ABS_PATH, "src", "folder-icons.py.in")
+    with open(template) as template_file:
+        content = template_file.read()
+    for key, value in (("@FILE_MANAGER@", file_manager),
+                       ("@GETTEXT@", "nautilus-folder-icons"),
+                       ("@DATA_DIR@", os.path.join(ABS_PATH, "src"))):
+        content = content.replace(key, value)
+    with open(os.path.join(directory, "folder_icons.py"), "w") as module:
+        module.write(content)
+
+
+def import_time(code, directory):
+    """Returns the cumulative import time in seconds & the loaded modules.
+
+    The time is parsed from python's -X importtime output.
+    """
+    code += "\nimport sys\nprint(' '.join(sys.modules))\n"
+    process = subprocess.run([sys.executable, "-X", "importtime", "-c",
+                              code], cwd=directory, stdout=subprocess.PIPE,
+                             stderr=subprocess.PIPE, universal_newlines=True,
+                             check=True)
+    total = 0
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line.split("|")
+        try:
+            cumulative = int(fields[1])
+        except ValueError:
+            # The header line
+            continue
+        # Only count the top level imports, the nested ones are included
+        if not fields[2][1:].startswith("  "):
+            total += cumulative
+    return total / 1e6, process.stdout.split()
+
+
+def main():
+    parser = ArgumentParser(description="Extension import time benchmark")
+    parser.add_argument("--file-manager", default="nautilus",
+                        choices=["nautilus", "nemo"])
+    parser.add_argument("--runs", type=int, default=5,
+                        help="number of runs, the fastest one is kept")
+    parser.add_argument("--threshold", type=float, default=0.05,
+                        help="maximum import time in seconds added by "
+                             "the extension")
+    args = parser.parse_args()
+
+    typelib = "Nautilus" if args.file_manager == "nautilus" else "Nemo"
+    directory = mkdtemp()
+    try:
+        render_extension(directory, args.file_manager)
+        baseline = min(import_time(BASELINE.format(typelib=typelib),
+                                   directory)[0]
+                       for _ in range(args.runs))
+        results = [import_time("import folder_icons", directory)
+                   for _ in range(args.runs)]
+        extension = min(result[0] for result in results)
+        modules = results[0][1]
+    finally:
+        rmtree(directory)
+
+    added = extension - baseline
+    lazy_loaded = [module for module in LAZY_MODULES if module in modules]
+    report("extension-import", {
+        "file_manager": args.file_manager,
+        "baseline": baseline,
+        "extension": extension,
+        "added": added,
+        "threshold": args.threshold,
+        "lazy_loaded": lazy_loaded,
+    })
+    return 0 if added <= args.threshold and not lazy_loaded else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,120 @@
+"""
+Change your nautilus directories icons easily
+
+Author : Bilal Elmoussaoui (bil.elmoussaoui@gmail.com)
+Website : https://github.com/bilelmoussaoui/nautilus-folder-icons
+Licence : GPL-3.0
+nautilus-folder-icons is free software: you can redistribute it and/or
+modify it under the terms of the GNU General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+nautilus-folder-icons is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+You should have received a copy of the GNU General Public License
+along with nautilus-folder-icons. If not, see <http://www.gnu.org/licenses/>.
+"""
+import os
+from argparse import ArgumentParser
+from shutil import rmtree
+from tempfile import mkdtemp
+from time import time
+from urllib.parse import quote, unquote, urlparse
+
+from common import get_rss, report
+from windows import WindowRegistry
+
+
+class PerNavigation(object):
+    """The previous get_widget: a new accel group on each navigation."""
+
+    def __init__(self):
+        self._window = None
+        self._folder = None
+        self._accel_group = None
+
+    def get_widget(self, uri, window):
+        from gi.repository import Gtk
+        self._folder = unquote(urlparse(uri).path)
+        if self._window:
+            self._window.remove_accel_group(self._accel_group)
+        if os.path.isdir(self._folder):
+            self._accel_group = Gtk.AccelGroup()
+            key, mod = Gtk.accelerator_parse("<Shift><Ctrl>S")
+            self._accel_group.connect(key, mod, Gtk.AccelFlags.VISIBLE,
+                                      lambda *args: None)
+            window.add_accel_group(self._accel_group)
+        self._window = window
+
+
+class PerWindow(object):
+    """The registry based get_widget."""
+
+    def __init__(self):
+        self._windows = WindowRegistry(self._setup_window)
+
+    def _setup_window(self, window, state):
+        from gi.repository import Gtk
+        state.accel_group = Gtk.AccelGroup()
+        key, mod = Gtk.accelerator_parse("<Shift><Ctrl>S")
+        state.accel_group.connect(key, mod, Gtk.AccelFlags.VISIBLE,
+                                  lambda *args: None)
+        window.add_accel_group(state.accel_group)
+
+    def get_widget(self, uri, window):
+        self._windows.update(window, uri)
+
+
+def navigate(provider, windows, uris, rounds):
+    """Returns the time spent navigating each window to each location."""
+    start = time()
+    for _ in range(rounds):
+        for uri in uris:
+            for window in windows:
+                provider.get_widget(uri, window)
+    return time() - start
+
+
+def main():
+    parser = ArgumentParser(description="Rapid navigation benchmark")
+    parser.add_argument("--locations", type=int, default=1000,
+                        help="number of visited folders")
+    parser.add_argument("--windows", type=int, default=4,
+                        help="number of file manager windows")
+    parser.add_argument("--rounds", type=int, default=5,
+                        help="number of visits of each folder")
+    args = parser.parse_args()
+
+    from gi.repository import Gtk
+
+    root = mkdtemp()
+    try:
+        uris = []
+        for i in range(args.locations):
+            folder = os.path.join(root, "folder {:05d}".format(i))
+            os.mkdir(folder)
+            uris.append("file://" + quote(folder))
+
+        for name, provider_class in (("per-navigation", PerNavigation),
+                                     ("per-window", PerWindow)):
+            windows = [Gtk.Window() for _ in range(args.windows)]
+            rss_before = get_rss()
+            elapsed = navigate(provider_class(), windows, uris, args.rounds)
+            navigations = args.locations * args.windows * args.rounds
+            report("navigation-" + name, {
+                "locations": args.locations,
+                "windows": args.windows,
+                "navigations": navigations,
+                "total": elapsed,
+                "per_navigation": elapsed / navigations,
+                "rss_delta": get_rss() - rss_before,
+            })
+            for window in windows:
+                window.destroy()
+    finally:
+        rmtree(root)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Change your nautilus directories icons easily
+
+Author : Bilal Elmoussaoui (bil.elmoussaoui@gmail.com)
+Website : https://github.com/bilelmoussaoui/nautilus-folder-icons
+Licence : GPL-3.0
+nautilus-folder-icons is free software: you can redistribute it and/or
+modify it under the terms of the GNU General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+nautilus-folder-icons is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+You should have received a copy of the GNU General Public License
+along with nautilus-folder-icons. If not, see <http://www.gnu.org/licenses/>.
+"""
+import os
+from argparse import ArgumentParser
+from shutil import rmtree
+from tempfile import mkdtemp
+from time import time
+
+from common import create_icon_theme, get_peak_rss, report, use_icon_theme
+
+
+def main():
+    parser = ArgumentParser(description="Icon preview benchmark")
+    parser.add_argument("--count", type=int, default=2000,
+                        help="number of icons of the synthetic theme")
+    parser.add_argument("--runs", type=int, default=3,
+                        help="number of passes over the icons")
+    args = parser.parse_args()
+
+    tmp_dir = mkdtemp()
+    try:
+        icon_names = create_icon_theme(os.path.join(tmp_dir, "icons"),
+                                       args.count)
+        theme = use_icon_theme(os.path.join(tmp_dir, "icons"))
+        from utils import Image, PixbufCache, load_pixbuf
+
+        start = time()
+        for icon_name in icon_names:
+            load_pixbuf(theme, icon_name, Image.SIZE)
+        elapsed = time() - start
+        report("load-pixbuf", {
+            "icons": args.count,
+            "wall_time": elapsed,
+            "ops_per_sec": args.count / max(elapsed, 1e-9),
+            "peak_rss": get_peak_rss(),
+        })
+
+        # Browsing the icons back & forth, like the keyboard navigation
+        image = Image()
+        start = time()
+        for _ in range(args.runs):
+            for icon_name in icon_names:
+                image.set_icon(icon_name)
+        elapsed = time() - start
+        operations = args.count * args.runs
+        report("image-set-icon", {
+            "icons": args.count,
+            "runs": args.runs,
+            "wall_time": elapsed,
+            "ops_per_sec": operations / max(elapsed, 1e-9),
+            "hit_rate": PixbufCache.get_default().get_stats()["hit_rate"],
+            "peak_rss": get_peak_rss(),
+        })
+    finally:
+        rmtree(tmp_dir)
+
+
+if __name__ == "__main__":
+    main()
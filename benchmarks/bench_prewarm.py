@@ -0,0 +1,112 @@
+"""
+Change your nautilus directories icons easily
+
+Author : Bilal Elmoussaoui (bil.elmoussaoui@gmail.com)
+Website : https://github.com/bilelmoussaoui/nautilus-folder-icons
+Licence : GPL-3.0
+nautilus-folder-icons is free software: you can redistribute it and/or
+modify it under the terms of the GNU General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+nautilus-folder-icons is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+You should have received a copy of the GNU General Public License
+along with nautilus-folder-icons. If not, see <http://www.gnu.org/licenses/>.
+"""
+import os
+from argparse import ArgumentParser
+from shutil import rmtree
+from tempfile import mkdtemp
+from time import time
+
+from common import create_icon_theme, report, use_icon_theme
+
+
+def run_until(loop, condition, timeout=60):
+    """Run the main loop until condition() is true."""
+    from gi.repository import GLib
+
+    def check():
+        if condition():
+            loop.quit()
+            return False
+        return True
+    GLib.timeout_add(1, check)
+    GLib.timeout_add_seconds(timeout, loop.quit)
+    loop.run()
+
+
+def open_chooser(folder, parent):
+    """Activate the chooser like the shortcut does.
+
+    Returns:
+        float: the time in seconds from the activation to the first paint.
+    """
+    from gi.repository import Gdk, GLib
+    from utils import _PREWARMED, change_folder_icon
+
+    loop = GLib.MainLoop()
+    painted = []
+
+    def on_draw(*args):
+        if not painted:
+            painted.append(time())
+            GLib.idle_add(loop.quit)
+
+    start = time()
+    change_folder_icon([folder], parent)
+    chooser = _PREWARMED.get("chooser")
+    if chooser is None:
+        from gi.repository import Gtk
+        chooser = [window for window in Gtk.Window.list_toplevels()
+                   if window.get_transient_for() is parent][-1]
+    handler = chooser.connect_after("draw", on_draw)
+    run_until(loop, lambda: painted)
+    chooser.disconnect(handler)
+    latency = painted[0] - start if painted else None
+    chooser.emit("delete-event", Gdk.Event.new(Gdk.EventType.DELETE))
+    return latency
+
+
+def main():
+    parser = ArgumentParser(description="Chooser activation latency")
+    parser.add_argument("--count", type=int, default=5000,
+                        help="number of icons of the synthetic theme")
+    parser.add_argument("--runs", type=int, default=3,
+                        help="number of activations per mode")
+    args = parser.parse_args()
+
+    tmp_dir = mkdtemp()
+    try:
+        os.environ["XDG_CACHE_HOME"] = os.path.join(tmp_dir, "cache")
+        create_icon_theme(os.path.join(tmp_dir, "icons"), args.count)
+        use_icon_theme(os.path.join(tmp_dir, "icons"))
+        from gi.repository import GLib, Gtk
+        import utils
+
+        parent = Gtk.Window()
+        for mode in (None, utils.PREWARM_CATALOG, utils.PREWARM_WINDOW):
+            # Start from an empty catalog for each mode
+            utils.IconCatalog._default = None
+            utils._PREWARMED.clear()
+            loop = GLib.MainLoop()
+            if mode:
+                utils.prewarm(mode)
+                run_until(loop, lambda: (
+                    utils.IconCatalog._default is not None
+                    and utils.IconCatalog._default.get_search() is not None))
+            latencies = [open_chooser(tmp_dir, parent)
+                         for _ in range(args.runs)]
+            report("chooser-activation", {
+                "icons": args.count,
+                "prewarm": mode or "none",
+                "first_paint": latencies,
+            })
+    finally:
+        rmtree(tmp_dir)
+
+
+if __name__ == "__main__":
+    main()
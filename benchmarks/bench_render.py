@@ -0,0 +1,83 @@
+"""
+Change your nautilus directories icons easily
+
+Author : Bilal Elmoussaoui (bil.elmoussaoui@gmail.com)
+Website : https://github.com/bilelmoussaoui/nautilus-folder-icons
+Licence : GPL-3.0
+nautilus-folder-icons is free software: you can redistribute it and/or
+modify it under the terms of the GNU General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+nautilus-folder-icons is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+You should have received a copy of the GNU General Public License
+along with nautilus-folder-icons. If not, see <http://www.gnu.org/licenses/>.
+"""
+import os
+from argparse import ArgumentParser
+from shutil import rmtree
+from tempfile import mkdtemp
+from time import time
+
+from common import create_icon_theme, get_peak_rss, report, use_icon_theme
+
+
+def load_then_scale(theme, icon_name, size):
+    """The previous path: load at the theme's size then scale."""
+    from gi.repository import GdkPixbuf
+    pixbuf = theme.lookup_icon(icon_name, size, 0).load_icon()
+    if pixbuf.props.width != size or pixbuf.props.height != size:
+        pixbuf = pixbuf.scale_simple(size, size,
+                                     GdkPixbuf.InterpType.BILINEAR)
+    return pixbuf
+
+
+def main():
+    parser = ArgumentParser(description="Icon rendering benchmark")
+    parser.add_argument("--count", type=int, default=1000,
+                        help="number of icons of the synthetic theme")
+    parser.add_argument("--sizes", type=int, nargs="+",
+                        default=[64, 96, 128, 192],
+                        help="the rendered sizes")
+    args = parser.parse_args()
+
+    tmp_dir = mkdtemp()
+    try:
+        icon_names = create_icon_theme(os.path.join(tmp_dir, "icons"),
+                                       args.count)
+        theme = use_icon_theme(os.path.join(tmp_dir, "icons"))
+        from utils import render_icon
+
+        start = time()
+        old_bytes = 0
+        for icon_name in icon_names:
+            for size in args.sizes:
+                old_bytes += load_then_scale(theme, icon_name,
+                                             size).get_byte_length()
+        old_time = time() - start
+
+        start = time()
+        new_bytes = 0
+        for icon_name in icon_names:
+            pixbufs = render_icon(theme, icon_name, args.sizes)
+            new_bytes += sum(pixbuf.get_byte_length()
+                             for pixbuf in pixbufs.values())
+        new_time = time() - start
+
+        report("render-icons", {
+            "icons": args.count,
+            "sizes": args.sizes,
+            "load_then_scale": old_time,
+            "render_at_size": new_time,
+            "speedup": old_time / max(new_time, 1e-9),
+            "pixels_bytes": new_bytes,
+            "peak_rss": get_peak_rss(),
+        })
+    finally:
+        rmtree(tmp_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Change your nautilus directories icons easily
+
+Author : Bilal Elmoussaoui (bil.elmoussaoui@gmail.com)
+Website : https://github.com/bilelmoussaoui/nautilus-folder-icons
+Licence : GPL-3.0
+nautilus-folder-icons is free software: you can redistribute it and/or
+modify it under the terms of the GNU General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+nautilus-folder-icons is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+You should have received a copy of the GNU General Public License
+along with nautilus-folder-icons. If not, see <http://www.gnu.org/licenses/>.
+"""
+from argparse import ArgumentParser
+from time import time
+
+from common import report
+from search import IconSearch
+
+WORDS = ["documents", "download", "music", "pictures", "videos", "black",
+         "blue", "red", "green", "yellow", "home", "network", "remote"]
+QUERY = "folder blue mus"
+
+
+def generate_names(count):
+    """Returns `count` icon names, folder-<word>-<word>-<number>."""
+    return ["folder-{}-{}-{}".format(WORDS[i % len(WORDS)],
+                                     WORDS[(i // len(WORDS)) % len(WORDS)],
+                                     i)
+            for i in range(count)]
+
+
+def filter_func(names, data):
+    """The linear filter, ran for each row on every keystroke."""
+    results = []
+    for name in names:
+        found = True
+        for string in data.split(" "):
+            found = found and string.lower() in name
+        if found:
+            results.append(name)
+    return results
+
+
+def main():
+    parser = ArgumentParser(description="Icon search benchmark")
+    parser.add_argument("--count", type=int, default=10000,
+                        help="number of icon names")
+    args = parser.parse_args()
+    names = generate_names(args.count)
+    # Each keystroke of the query
+    queries = [QUERY[:i] for i in range(1, len(QUERY) + 1)]
+
+    start = time()
+    search = IconSearch(names)
+    build = time() - start
+
+    start = time()
+    for query in queries:
+        search.search(query)
+    indexed = (time() - start) / len(queries)
+
+    start = time()
+    for query in queries:
+        filter_func(names, query)
+    linear = (time() - start) / len(queries)
+
+    report("search", {
+        "names": args.count,
+        "index_build": build,
+        "keystroke_indexed": indexed,
+        "keystroke_linear": linear,
+        "results": len(search.search(QUERY)),
+    })
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Change your nautilus directories icons easily
+
+Author : Bilal Elmoussaoui (bil.elmoussaoui@gmail.com)
+Website : https://github.com/bilelmoussaoui/nautilus-folder-icons
+Licence : GPL-3.0
+nautilus-folder-icons is free software: you can redistribute it and/or
+modify it under the terms of the GNU General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+nautilus-folder-icons is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+You should have received a copy of the GNU General Public License
+along with nautilus-folder-icons. If not, see <http://www.gnu.org/licenses/>.
+"""
+import sys
+from argparse import ArgumentParser
+from time import time
+from urllib.parse import unquote, urlparse
+
+from common import report
+from selection import SelectionCache
+
+
+class FakeLocation(object):
+
+    def __init__(self, path):
+        self._path = path
+
+    def get_path(self):
+        return self._path
+
+
+class FakeFileInfo(object):
+    """Mimics the file manager's FileInfo."""
+
+    def __init__(self, path):
+        self._path = path
+
+    def is_directory(self):
+        return True
+
+    def get_uri_scheme(self):
+        return "file"
+
+    def get_uri(self):
+        return "file://" + self._path
+
+    def get_location(self):
+        return FakeLocation(self._path)
+
+
+def parse_all(files):
+    """The previous path: every selected file uri is parsed."""
+    return [unquote(urlparse(file_.get_uri()).path) for file_ in files]
+
+
+def main():
+    parser = ArgumentParser(description="Menu items selection benchmark")
+    parser.add_argument("--count", type=int, default=50000,
+                        help="number of selected folders")
+    parser.add_argument("--budget", type=float, default=0.01,
+                        help="maximum time in seconds to build the menu "
+                             "of a new selection")
+    args = parser.parse_args()
+
+    files = [FakeFileInfo("/tmp/folder {:05d}".format(i))
+             for i in range(args.count)]
+
+    start = time()
+    parse_all(files)
+    parse_time = time() - start
+
+    cache = SelectionCache()
+    start = time()
+    selection = cache.get(files)
+    bool(selection) and selection.is_single
+    new_selection = time() - start
+
+    start = time()
+    selection = cache.get(list(files))
+    bool(selection) and selection.is_single
+    same_selection = time() - start
+
+    start = time()
+    selection.folders
+    activate = time() - start
+
+    report("get-file-items", {
+        "files": args.count,
+        "parse_all": parse_time,
+        "new_selection": new_selection,
+        "same_selection": same_selection,
+        "activate": activate,
+        "budget": args.budget,
+    })
+    return 0 if max(new_selection, same_selection) <= args.budget else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
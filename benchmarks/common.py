@@ -0,0 +1,141 @@
+"""
+Change your nautilus directories icons easily
+
+Author : Bilal Elmoussaoui (bil.elmoussaoui@gmail.com)
+Website : https://github.com/bilelmoussaoui/nautilus-folder-icons
+Licence : GPL-3.0
+nautilus-folder-icons is free software: you can redistribute it and/or
+modify it under the terms of the GNU General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+nautilus-folder-icons is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+You should have received a copy of the GNU General Public License
+along with nautilus-folder-icons. If not, see <http://www.gnu.org/licenses/>.
+"""
+import json
+import resource
+import struct
+import zlib
+from os import makedirs, path
+from sys import path as sys_path
+
+CURRENT_DIR = path.dirname(path.abspath(__file__))
+ABS_PATH = path.abspath(path.join(CURRENT_DIR, "../"))
+sys_path.insert(0, path.join(ABS_PATH, 'src/'))
+
+THEME_NAME = "Synthetic"
+
+INDEX_THEME = """[Icon Theme]
+Name={name}
+Comment=Synthetic icon theme used by the benchmarks
+Inherits=hicolor
+Directories=scalable/places,128x128/places
+
+[scalable/places]
+Size=64
+MinSize=16
+MaxSize=512
+Context=Places
+Type=Scalable
+
+[128x128/places]
+Size=128
+Context=Places
+Type=Fixed
+"""
+
+SVG_TEMPLATE = """<?xml version="1.0" encoding="UTF-8"?>
+<svg xmlns="http://www.w3.org/2000/svg" width="64" height="64">
+  <path d="M4 10h20l6 6h30v40H4z" fill="#{color:06x}"/>
+  <rect x="4" y="20" width="56" height="36" fill="#{shade:06x}"/>
+</svg>
+"""
+
+
+def write_png(filename, size, color):
+    """Write a plain RGBA png without any dependency."""
+    red, green, blue = (color >> 16) & 0xff, (color >> 8) & 0xff, color & 0xff
+    row = b"\x00" + struct.pack("BBBB", red, green, blue, 0xff) * size
+    raw = row * size
+
+    def chunk(kind, data):
+        body = kind + data
+        return (struct.pack(">I", len(data)) + body
+                + struct.pack(">I", zlib.crc32(body) & 0xffffffff))
+
+    with open(filename, "wb") as png_file:
+        png_file.write(b"\x89PNG\r\n\x1a\n")
+        png_file.write(chunk(b"IHDR", struct.pack(">IIBBBBB", size, size,
+                                                  8, 6, 0, 0, 0)))
+        png_file.write(chunk(b"IDAT", zlib.compress(raw)))
+        png_file.write(chunk(b"IEND", b""))
+
+
+def create_icon_theme(base_dir, count, name=THEME_NAME, png_ratio=0.5):
+    """Create a synthetic icon theme with `count` folder-* Places icons.
+
+    Args:
+        base_dir (str): the directory that will contain the theme.
+        count (int): the number of icons.
+        name (str): the theme name.
+        png_ratio (float): the ratio of 128px png icons, the rest are svg.
+
+    Returns:
+        list: the icon names.
+    """
+    theme_dir = path.join(base_dir, name)
+    svg_dir = path.join(theme_dir, "scalable", "places")
+    png_dir = path.join(theme_dir, "128x128", "places")
+    for directory in (svg_dir, png_dir):
+        if not path.exists(directory):
+            makedirs(directory)
+    with open(path.join(theme_dir, "index.theme"), "w") as index_file:
+        index_file.write(INDEX_THEME.format(name=name))
+
+    png_count = int(count * png_ratio)
+    icon_names = []
+    for i in range(count):
+        icon_name = "folder-synthetic-{:05d}".format(i)
+        color = (i * 2654435761) & 0xffffff
+        if i < png_count:
+            write_png(path.join(png_dir, icon_name + ".png"), 128, color)
+        else:
+            with open(path.join(svg_dir, icon_name + ".svg"), "w") as svg:
+                svg.write(SVG_TEMPLATE.format(color=color,
+                                              shade=color ^ 0x202020))
+        icon_names.append(icon_name)
+    return icon_names
+
+
+def use_icon_theme(base_dir, name=THEME_NAME):
+    """Make the synthetic theme the default Gtk icon theme."""
+    from gi import require_version
+    require_version("Gtk", "3.0")
+    from gi.repository import Gtk
+
+    theme = Gtk.IconTheme.get_default()
+    theme.prepend_search_path(base_dir)
+    Gtk.Settings.get_default().props.gtk_icon_theme_name = name
+    return theme
+
+
+def get_rss():
+    """Returns the current resident set size in bytes."""
+    with open("/proc/self/statm") as statm:
+        pages = int(statm.read().split()[1])
+    return pages * resource.getpagesize()
+
+
+def get_peak_rss():
+    """Returns the peak resident set size in bytes."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def report(name, results):
+    """Print the results of a benchmark as a JSON line."""
+    results = dict(results)
+    results["benchmark"] = name
+    print(json.dumps(results, sort_keys=True))
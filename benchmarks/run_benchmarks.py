@@ -0,0 +1,291 @@
+"""
+Change your nautilus directories icons easily
+
+Author : Bilal Elmoussaoui (bil.elmoussaoui@gmail.com)
+Website : https://github.com/bilelmoussaoui/nautilus-folder-icons
+Licence : GPL-3.0
+nautilus-folder-icons is free software: you can redistribute it and/or
+modify it under the terms of the GNU General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+nautilus-folder-icons is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+You should have received a copy of the GNU General Public License
+along with nautilus-folder-icons. If not, see <http://www.gnu.org/licenses/>.
+"""
+import json
+import os
+import socket
+import subprocess
+import sys
+from argparse import ArgumentParser
+from glob import glob
+from shutil import rmtree, which
+from tempfile import mkdtemp
+from time import sleep, time
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# The compared metrics, 1 if higher is better, -1 if lower is better.
+# The other fields of a result are the benchmark's parameters,
+# a result is compared to the baseline's one with the same parameters.
+METRICS = {
+    "ops_per_sec": 1,
+    "speedup": 1,
+    "activate": -1,
+    "added": -1,
+    "enumerate_async": -1,
+    "enumerate_sync": -1,
+    "extension": -1,
+    "first_paint": -1,
+    "index_build": -1,
+    "keystroke_indexed": -1,
+    "new_selection": -1,
+    "peak_rss": -1,
+    "per_navigation": -1,
+    "render_at_size": -1,
+    "rss": -1,
+    "rss_delta": -1,
+    "same_selection": -1,
+    "total": -1,
+    "wall_time": -1,
+    "window_ready": -1,
+}
+# Measurements of the environment or of the previous implementations,
+# reported but neither compared nor part of the parameters
+INFORMATIONAL = set(["baseline", "budget", "hit_rate", "keystroke_linear",
+                     "lazy_loaded", "load_then_scale", "parse_all",
+                     "per_path", "pixels_bytes", "threshold"])
+# Differences below these are noise: 1ms & 1MiB
+NOISE = {"time": 1e-3, "memory": 1 << 20}
+DISPLAYS = ["auto", "current", "xvfb", "broadway", "none"]
+
+
+def find_benchmarks(names=None):
+    """Returns the benchmarks scripts, all of them if no names are given."""
+    scripts = sorted(glob(os.path.join(CURRENT_DIR, "bench_*.py")))
+    if names:
+        scripts = [script for script in scripts
+                   if any(name in os.path.basename(script)
+                          for name in names)]
+    return scripts
+
+
+class HeadlessDisplay(object):
+    """A display server for the Gtk benchmarks, stopped on exit."""
+
+    def __init__(self, mode="auto"):
+        if mode == "auto":
+            if os.environ.get("DISPLAY") or \
+                    os.environ.get("WAYLAND_DISPLAY"):
+                mode = "current"
+            elif which("Xvfb"):
+                mode = "xvfb"
+            elif which("broadwayd"):
+                mode = "broadway"
+            else:
+                mode = "none"
+        self.mode = mode
+        self.env = {}
+        self._process = None
+
+    def __enter__(self):
+        if self.mode == "xvfb":
+            self._start_xvfb()
+        elif self.mode == "broadway":
+            self._start_broadway()
+        return self
+
+    def __exit__(self, *args):
+        if self._process:
+            self._process.terminate()
+            self._process.wait()
+
+    def _start_xvfb(self):
+        # Xvfb picks a free display & writes it's number to the pipe
+        read_fd, write_fd = os.pipe()
+        self._process = subprocess.Popen(
+            ["Xvfb", "-displayfd", str(write_fd), "-nolisten", "tcp",
+             "-screen", "0", "1280x1024x24"],
+            pass_fds=(write_fd, ), stderr=subprocess.DEVNULL)
+        os.close(write_fd)
+        with os.fdopen(read_fd) as pipe:
+            number = pipe.readline().strip()
+        if not number:
+            raise RuntimeError("Xvfb failed to start")
+        self.env = {"DISPLAY": ":" + number, "GDK_BACKEND": "x11"}
+
+    def _start_broadway(self, timeout=5):
+        number = 50 + os.getpid() % 50
+        self._process = subprocess.Popen(
+            ["broadwayd", ":{}".format(number)],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        # broadwayd listens on the port 8080 + the display number
+        deadline = time() + timeout
+        while True:
+            try:
+                socket.create_connection(("127.0.0.1", 8080 + number),
+                                         0.1).close()
+                break
+            except OSError:
+                if time() > deadline or self._process.poll() is not None:
+                    raise RuntimeError("broadwayd failed to start")
+                sleep(0.1)
+        self.env = {"BROADWAY_DISPLAY": ":{}".format(number),
+                    "GDK_BACKEND": "broadway"}
+
+
+def run_benchmark(script, env, timeout=None):
+    """Run a benchmark script & collect it's JSON results."""
+    start = time()
+    record = {"script": os.path.basename(script), "results": []}
+    try:
+        process = subprocess.run([sys.executable, script], env=env,
+                                 cwd=CURRENT_DIR, timeout=timeout,
+                                 stdout=subprocess.PIPE,
+                                 stderr=subprocess.PIPE,
+                                 universal_newlines=True)
+    except subprocess.TimeoutExpired:
+        record["exit_code"] = None
+        record["error"] = "Timed out after {}s".format(timeout)
+    else:
+        record["exit_code"] = process.returncode
+        for line in process.stdout.splitlines():
+            try:
+                result = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(result, dict) and "benchmark" in result:
+                record["results"].append(result)
+        if process.returncode != 0:
+            record["error"] = process.stderr.strip()[-2000:]
+    record["duration"] = time() - start
+    return record
+
+
+def get_key(result):
+    """Returns what identifies a result: it's name & parameters."""
+    parameters = dict((field, value) for field, value in result.items()
+                      if field not in METRICS and field not in INFORMATIONAL)
+    return json.dumps(parameters, sort_keys=True)
+
+
+def get_value(value):
+    """The compared value of a metric, the best one of several runs."""
+    if isinstance(value, list):
+        return min(value) if value else None
+    return value
+
+
+def compare(results, baseline, tolerance):
+    """Returns the regressed metrics compared to the baseline.
+
+    Args:
+        results (list): the results of this run.
+        baseline (list): the results of the baseline run.
+        tolerance (float): the allowed relative difference.
+    """
+    previous = dict((get_key(result), result) for result in baseline)
+    regressions = []
+    for result in results:
+        old_result = previous.get(get_key(result))
+        if old_result is None:
+            continue
+        for metric, direction in METRICS.items():
+            old = get_value(old_result.get(metric))
+            new = get_value(result.get(metric))
+            if not isinstance(old, (int, float)) or \
+                    not isinstance(new, (int, float)):
+                continue
+            change = (new - old) * direction
+            noise = NOISE["memory" if "rss" in metric else "time"]
+            if direction < 0 and -change < noise:
+                # Lower is better, but the difference is negligible
+                continue
+            if change < -tolerance * abs(old):
+                regressions.append({
+                    "benchmark": result["benchmark"],
+                    "metric": metric,
+                    "baseline": old,
+                    "value": new,
+                    "change": (new - old) / old if old else None,
+                })
+    return regressions
+
+
+def iter_results(report):
+    for record in report["scripts"]:
+        for result in record["results"]:
+            yield result
+
+
+def main():
+    parser = ArgumentParser(description="Run the benchmarks & compare "
+                                        "them to a baseline")
+    parser.add_argument("benchmarks", nargs="*",
+                        help="only the scripts which name contains these, "
+                             "e.g. cli or render")
+    parser.add_argument("-o", "--output", default=None,
+                        help="write the report to this file, "
+                             "it can be used as a baseline later")
+    parser.add_argument("--baseline", default=None,
+                        help="a previous report to compare to")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="the allowed relative regression")
+    parser.add_argument("--display", choices=DISPLAYS, default="auto",
+                        help="the display server of the Gtk benchmarks")
+    parser.add_argument("--timeout", type=float, default=1800,
+                        help="maximum time in seconds per benchmark")
+    args = parser.parse_args()
+
+    # Don't touch the user's caches & journal
+    tmp_dir = mkdtemp()
+    with HeadlessDisplay(args.display) as display:
+        env = dict(os.environ)
+        env.update(display.env)
+        env["XDG_CACHE_HOME"] = os.path.join(tmp_dir, "cache")
+        env["XDG_DATA_HOME"] = os.path.join(tmp_dir, "data")
+        scripts = []
+        for script in find_benchmarks(args.benchmarks):
+            record = run_benchmark(script, env, args.timeout)
+            sys.stderr.write("{script}: {count} results in {duration:.1f}s"
+                             "\n".format(count=len(record["results"]),
+                                         **record))
+            scripts.append(record)
+    rmtree(tmp_dir)
+
+    report = {
+        "version": 1,
+        "time": time(),
+        "python": sys.version.split()[0],
+        "display": display.mode,
+        "scripts": scripts,
+    }
+    failed = [record["script"] for record in scripts
+              if record["exit_code"] != 0]
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+        report["baseline"] = args.baseline
+        report["regressions"] = compare(list(iter_results(report)),
+                                        list(iter_results(baseline)),
+                                        args.tolerance)
+    output = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, "w") as output_file:
+            output_file.write(output)
+            output_file.write("\n")
+    else:
+        print(output)
+    for regression in report.get("regressions", []):
+        sys.stderr.write("Regression: {}\n".format(
+            json.dumps(regression, sort_keys=True)))
+    for script in failed:
+        sys.stderr.write("Failed: {}\n".format(script))
+    return 1 if failed or report.get("regressions") else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,246 @@
+"""
+Change your nautilus directories icons easily
+
+Author : Bilal Elmoussaoui (bil.elmoussaoui@gmail.com)
+Website : https://github.com/bilelmoussaoui/nautilus-folder-icons
+Licence : GPL-3.0
+nautilus-folder-icons is free software: you can redistribute it and/or
+modify it under the terms of the GNU General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+nautilus-folder-icons is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+You should have received a copy of the GNU General Public License
+along with nautilus-folder-icons. If not, see <http://www.gnu.org/licenses/>.
+"""
+import mmap
+import os
+import struct
+from collections import namedtuple
+from hashlib import sha1
+from os import path
+from tempfile import mkstemp
+
+from configparser import ConfigParser, Error as ConfigError
+
+
+CACHE_MAGIC = b"NFIC"
+CACHE_VERSION = 1
+
+# magic, version, fingerprint length
+_HEADER = struct.Struct("<4sHI")
+_COUNT = struct.Struct("<I")
+_NAME_LEN = struct.Struct("<H")
+# width, height, rowstride, has_alpha, data offset, data length
+_ENTRY = struct.Struct("<HHIBQI")
+
+CacheEntry = namedtuple("CacheEntry", ["name", "width", "height",
+                                       "rowstride", "has_alpha", "pixels"])
+
+
+def get_cache_dir():
+    """Returns the directory where the rendered icons are cached."""
+    cache_dir = os.environ.get("XDG_CACHE_HOME")
+    if not cache_dir:
+        cache_dir = path.join(path.expanduser("~"), ".cache")
+    return path.join(cache_dir, "nautilus-folder-icons")
+
+
+def get_cache_path(theme_name, size, scale):
+    """Returns the cache file path of a theme at a specific size.
+
+    Args:
+        theme_name (str): the icon theme name.
+        size (int): the icon size in pixels.
+        scale (int): the scale factor.
+    """
+    filename = "{}-{}@{}.cache".format(theme_name.replace("/", "_"),
+                                       size, scale)
+    return path.join(get_cache_dir(), filename)
+
+
+def _theme_dirs(theme_name, search_path):
+    """Returns the directory & the index.theme file of a theme."""
+    for base_dir in search_path:
+        theme_dir = path.join(base_dir, theme_name)
+        index_file = path.join(theme_dir, "index.theme")
+        if path.isfile(index_file):
+            return theme_dir, index_file
+    return None, None
+
+
+def theme_fingerprint(theme_name, search_path, size, scale):
+    """Compute a fingerprint that changes whenever the theme is updated.
+
+    The fingerprint contains the mtimes of every index.theme and icon
+    directory of the theme and the themes it inherits from.
+
+    Args:
+        theme_name (str): the icon theme name.
+        search_path (list): the icon theme search path.
+        size (int): the icon size in pixels.
+        scale (int): the scale factor.
+    """
+    parts = ["{}:{}@{}".format(theme_name, size, scale)]
+    themes = [theme_name]
+    visited = set()
+    while themes:
+        current = themes.pop(0)
+        if current in visited:
+            continue
+        visited.add(current)
+        theme_dir, index_file = _theme_dirs(current, search_path)
+        if not theme_dir:
+            continue
+        parts.append("{}:{}".format(index_file,
+                                    os.stat(index_file).st_mtime))
+        config = ConfigParser(interpolation=None, strict=False)
+        try:
+            config.read(index_file)
+            directories = config.get("Icon Theme", "Directories")
+            inherits = config.get("Icon Theme", "Inherits",
+                                  fallback="hicolor")
+        except ConfigError:
+            continue
+        for directory in directories.split(","):
+            directory = path.join(theme_dir, directory.strip())
+            if path.isdir(directory):
+                parts.append("{}:{}".format(directory,
+                                            os.stat(directory).st_mtime))
+        themes.extend([theme.strip() for theme in inherits.split(",")
+                       if theme.strip()])
+    return sha1("\n".join(parts).encode("utf-8")).hexdigest()
+
+
+def theme_aliases(theme_name, search_path, context="Places"):
+    """Returns the icons of a theme that are symlinks to other icons.
+
+    Args:
+        theme_name (str): the icon theme name.
+        search_path (list): the icon theme search path.
+        context (str): the icons context.
+
+    Returns:
+        dict: alias icon name -> icon name.
+    """
+    aliases = {}
+    theme_dir, index_file = _theme_dirs(theme_name, search_path)
+    if not theme_dir:
+        return aliases
+    config = ConfigParser(interpolation=None, strict=False)
+    try:
+        config.read(index_file)
+        directories = config.get("Icon Theme", "Directories").split(",")
+    except ConfigError:
+        return aliases
+    for directory in directories:
+        directory = directory.strip()
+        if config.get(directory, "Context", fallback=None) != context:
+            continue
+        directory = path.join(theme_dir, directory)
+        if not path.isdir(directory):
+            continue
+        for entry in os.scandir(directory):
+            if entry.is_symlink():
+                alias = path.splitext(entry.name)[0]
+                target = path.basename(os.readlink(entry.path))
+                aliases[alias] = path.splitext(target)[0]
+    return aliases
+
+
+def write_cache(filename, fingerprint, entries):
+    """Write the rendered icons to a cache file.
+
+    The file is written to a temporary file first and then moved,
+    so readers never see a partial cache.
+
+    Args:
+        filename (str): the cache file path.
+        fingerprint (str): the theme fingerprint.
+        entries (list): a list of CacheEntry.
+    """
+    fingerprint = fingerprint.encode("utf-8")
+    names = [entry.name.encode("utf-8") for entry in entries]
+
+    offset = _HEADER.size + len(fingerprint) + _COUNT.size
+    offset += sum(_NAME_LEN.size + len(name) + _ENTRY.size
+                  for name in names)
+
+    cache_dir = path.dirname(filename)
+    if not path.exists(cache_dir):
+        os.makedirs(cache_dir)
+    fd, tmp_filename = mkstemp(dir=cache_dir, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as cache_file:
+            cache_file.write(_HEADER.pack(CACHE_MAGIC, CACHE_VERSION,
+                                          len(fingerprint)))
+            cache_file.write(fingerprint)
+            cache_file.write(_COUNT.pack(len(entries)))
+            for name, entry in zip(names, entries):
+                cache_file.write(_NAME_LEN.pack(len(name)))
+                cache_file.write(name)
+                cache_file.write(_ENTRY.pack(entry.width, entry.height,
+                                             entry.rowstride,
+                                             int(entry.has_alpha),
+                                             offset, len(entry.pixels)))
+                offset += len(entry.pixels)
+            for entry in entries:
+                cache_file.write(entry.pixels)
+        os.rename(tmp_filename, filename)
+    except (IOError, OSError):
+        if path.exists(tmp_filename):
+            os.remove(tmp_filename)
+        raise
+
+
+def read_cache(filename, fingerprint):
+    """Read the rendered icons from a cache file.
+
+    The file is memory mapped and the pixels are returned as
+    memoryview's of the mapping, nothing is decoded.
+
+    Args:
+        filename (str): the cache file path.
+        fingerprint (str): the expected theme fingerprint.
+
+    Returns:
+        list: a list of CacheEntry or None if the cache is stale/missing.
+    """
+    try:
+        with open(filename, "rb") as cache_file:
+            data = mmap.mmap(cache_file.fileno(), 0,
+                             access=mmap.ACCESS_READ)
+    except (IOError, OSError, ValueError):
+        return None
+    try:
+        magic, version, fp_len = _HEADER.unpack_from(data, 0)
+        offset = _HEADER.size
+        stored = data[offset:offset + fp_len].decode("utf-8")
+        offset += fp_len
+        if (magic != CACHE_MAGIC or version != CACHE_VERSION
+                or stored != fingerprint):
+            data.close()
+            return None
+        count, = _COUNT.unpack_from(data, offset)
+        offset += _COUNT.size
+        view = memoryview(data)
+        entries = []
+        for _ in range(count):
+            name_len, = _NAME_LEN.unpack_from(data, offset)
+            offset += _NAME_LEN.size
+            name = data[offset:offset + name_len].decode("utf-8")
+            offset += name_len
+            (width, height, rowstride, has_alpha,
+             data_offset, data_len) = _ENTRY.unpack_from(data, offset)
+            offset += _ENTRY.size
+            if data_offset + data_len > len(data):
+                raise ValueError("Truncated cache file")
+            pixels = view[data_offset:data_offset + data_len]
+            entries.append(CacheEntry(name, width, height, rowstride,
+                                      bool(has_alpha), pixels))
+        return entries
+    except (struct.error, ValueError, UnicodeDecodeError):
+        # The mapping is released once the views are garbage collected
+        return None
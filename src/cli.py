@@ -0,0 +1,308 @@
+"""
+Change your nautilus directories icons easily
+
+Author : Bilal Elmoussaoui (bil.elmoussaoui@gmail.com)
+Website : https://github.com/bilelmoussaoui/nautilus-folder-icons
+Licence : GPL-3.0
+nautilus-folder-icons is free software: you can redistribute it and/or
+modify it under the terms of the GNU General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+nautilus-folder-icons is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+You should have received a copy of the GNU General Public License
+along with nautilus-folder-icons. If not, see <http://www.gnu.org/licenses/>.
+"""
+import json
+import sys
+from argparse import ArgumentParser
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from gettext import gettext as _
+from os import cpu_count, path
+
+from gi.repository import GLib
+
+from journal import Journal
+from metadata import (WRITER, estimate_apply, get_default_icon, is_path,
+                      iter_subtrees, restore_default_icon, set_default_icon)
+
+# Number of queued operations per worker
+QUEUE_FACTOR = 4
+
+
+def read_paths(paths, stream=None):
+    """Yields the paths from the arguments or NUL-delimited from a stream.
+
+    Args:
+        paths (list): the paths given as arguments.
+        stream (file): a binary stream, used if there are no paths.
+    """
+    if paths:
+        for path_ in paths:
+            yield path.abspath(path_)
+        return
+    buffer = b""
+    while True:
+        chunk = stream.read(65536)
+        if not chunk:
+            break
+        buffer += chunk
+        *entries, buffer = buffer.split(b"\0")
+        for entry in entries:
+            if entry:
+                yield path.abspath(entry.decode("utf-8", "surrogateescape"))
+    if buffer:
+        yield path.abspath(buffer.decode("utf-8", "surrogateescape"))
+
+
+def run_parallel(func, items, jobs):
+    """Yields func(item) for each item, ran on a pool of workers.
+
+    The items are consumed lazily, at most jobs * QUEUE_FACTOR are queued.
+    The results are yielded in the items order.
+    """
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        queue = deque()
+        for item in items:
+            queue.append(executor.submit(func, item))
+            if len(queue) >= jobs * QUEUE_FACTOR:
+                yield queue.popleft().result()
+        while queue:
+            yield queue.popleft().result()
+
+
+def has_symbolic(icon):
+    """Whether the icon theme has the icon's symbolic variant.
+
+    Gtk is only imported when a themed icon is looked up.
+    """
+    from utils import IconNames
+    return IconNames.get_default().get_symbolic(icon) is not None
+
+
+def get_icon(folder):
+    return {"path": folder, "icon": get_default_icon(folder)}
+
+
+def set_icon(folder, icon, symbolic, operation=None):
+    written = set_default_icon(folder, icon, symbolic, operation)
+    return {"path": folder, "icon": icon, "written": written}
+
+
+def restore_icon(folder, operation=None):
+    written = restore_default_icon(folder, operation)
+    return {"path": folder, "written": written}
+
+
+def run_batch(batch, stdout):
+    """Run a BatchApply & write its report, returns the exit code."""
+    loop = GLib.MainLoop()
+    batch.connect("finished", lambda *args: loop.quit())
+    batch.start()
+    loop.run()
+    for folder, error in batch.report.items():
+        if error is None:
+            result = {"path": folder, "written": folder in batch.written}
+        else:
+            result = {"path": folder, "error": error}
+        stdout.write(json.dumps(result))
+        stdout.write("\n")
+    return 1 if batch.failed else 0
+
+
+def undo(stdout):
+    """Revert the last journaled change, returns the exit code."""
+    batch = Journal.get_default().undo()
+    if batch is None:
+        stdout.write(json.dumps({"error": _("Nothing to undo")}))
+        stdout.write("\n")
+        return 1
+    return run_batch(batch, stdout)
+
+
+def export(root, output, stdout):
+    """Write the icons of a tree to a snapshot file, returns the exit code."""
+    from snapshot import export_snapshot
+    try:
+        if output == "-":
+            count = export_snapshot(root, stdout)
+        else:
+            with open(output, "w") as stream:
+                count = export_snapshot(root, stream)
+    except GLib.Error as error:
+        result = {"path": root, "error": error.message}
+    except OSError as error:
+        result = {"path": root, "error": str(error)}
+    else:
+        if output == "-":
+            return 0
+        result = {"path": root, "output": output, "count": count}
+    stdout.write(json.dumps(result))
+    stdout.write("\n")
+    return 1 if "error" in result else 0
+
+
+def import_(filename, root, concurrency, journal, stdout):
+    """Apply a snapshot file, returns the exit code."""
+    from snapshot import import_snapshot
+    operation = None
+    if journal:
+        operation = Journal.get_default().begin(
+            "import {}".format(path.basename(filename)))
+    try:
+        with open(filename) as stream:
+            batch = import_snapshot(stream, root, concurrency, operation)
+            return run_batch(batch, stdout)
+    except (OSError, ValueError) as error:
+        if operation:
+            operation.close()
+        stdout.write(json.dumps({"path": filename, "error": str(error)}))
+        stdout.write("\n")
+        return 1
+
+
+def watch(filename=None):
+    """Apply the rules to the new folders until interrupted."""
+    from rules import RulesEngine, load_rules
+    roots, rules = load_rules(filename)
+    engine = RulesEngine(roots, rules)
+    engine.start()
+    try:
+        GLib.MainLoop().run()
+    except KeyboardInterrupt:
+        pass
+    engine.stop()
+    return 0
+
+
+def safe_call(func, folder, *args):
+    """Returns the result of func or the error as a JSON-able dict."""
+    try:
+        return func(folder, *args)
+    except GLib.Error as error:
+        return {"path": folder, "error": error.message}
+    except (OSError, ValueError) as error:
+        return {"path": folder, "error": str(error)}
+
+
+def get_parser():
+    parser = ArgumentParser(prog="folder-icons",
+                            description=_("Get, set or restore folders "
+                                          "icons from the command line"))
+    parser.add_argument("-j", "--jobs", type=int, default=cpu_count() or 1,
+                        help=_("number of parallel workers"))
+    parser.add_argument("-r", "--recursive", action="store_true",
+                        help=_("include the subfolders"))
+    parser.add_argument("--max-depth", type=int, default=None,
+                        help=_("maximum depth of the subfolders"))
+    parser.add_argument("--include", action="append", default=None,
+                        help=_("only the subfolders matching the glob"))
+    parser.add_argument("--exclude", action="append", default=None,
+                        help=_("skip the subfolders matching the glob"))
+    parser.add_argument("--stats", action="store_true",
+                        help=_("print the number of issued & skipped "
+                               "writes to stderr"))
+    parser.add_argument("--dry-run", action="store_true",
+                        help=_("only count the folders & estimate the "
+                               "time it would take"))
+    parser.add_argument("--no-journal", action="store_true",
+                        help=_("don't record the changes, they can't be "
+                               "undone"))
+
+    commands = parser.add_subparsers(dest="command")
+    commands.required = True
+    paths_help = _("the folders, read NUL-delimited from stdin if missing")
+    get = commands.add_parser("get", help=_("print the folders icons"))
+    get.add_argument("paths", nargs="*", help=paths_help)
+    set_ = commands.add_parser("set", help=_("set the folders icon"))
+    set_.add_argument("icon", help=_("the icon name or path"))
+    set_.add_argument("paths", nargs="*", help=paths_help)
+    restore = commands.add_parser("restore",
+                                  help=_("restore the folders default icon"))
+    restore.add_argument("paths", nargs="*", help=paths_help)
+    commands.add_parser("undo", help=_("revert the last set or restore"))
+    watch = commands.add_parser("watch",
+                                help=_("apply the rules to the new folders"))
+    watch.add_argument("--rules", default=None,
+                       help=_("the rules file, "
+                              "~/.config/nautilus-folder-icons/rules.json "
+                              "by default"))
+    export_ = commands.add_parser("export",
+                                  help=_("write the icons of a tree "
+                                         "to a snapshot file"))
+    export_.add_argument("root", help=_("the exported folder"))
+    export_.add_argument("-o", "--output", default="-",
+                         help=_("the snapshot file, stdout by default"))
+    import_ = commands.add_parser("import",
+                                  help=_("apply a snapshot file"))
+    import_.add_argument("snapshot", help=_("the snapshot file"))
+    import_.add_argument("--root", default=None,
+                         help=_("apply to this folder instead of "
+                                "the exported one"))
+    return parser
+
+
+def main(argv=None, stdin=None, stdout=None):
+    """Runs the command line interface, returns the exit code.
+
+    Each result is written as a JSON line.
+    """
+    args = get_parser().parse_args(argv)
+    stdin = stdin or sys.stdin.buffer
+    stdout = stdout or sys.stdout
+
+    if args.command == "undo":
+        return undo(stdout)
+    if args.command == "watch":
+        return watch(args.rules)
+    if args.command == "export":
+        return export(args.root, args.output, stdout)
+    if args.command == "import":
+        return import_(args.snapshot, args.root, args.jobs * QUEUE_FACTOR,
+                       not args.no_journal, stdout)
+
+    folders = read_paths(args.paths, stdin)
+    if args.recursive:
+        folders = iter_subtrees(folders, args.max_depth,
+                                args.include, args.exclude)
+
+    if args.dry_run:
+        count, estimate = estimate_apply(folders)
+        stdout.write(json.dumps({"count": count, "estimate": estimate}))
+        stdout.write("\n")
+        return 0
+
+    operation = None
+    if args.command != "get" and not args.no_journal:
+        description = "restore"
+        if args.command == "set":
+            description = "set {}".format(args.icon)
+        operation = Journal.get_default().begin(description)
+
+    if args.command == "get":
+        func, extra = get_icon, ()
+    elif args.command == "set":
+        icon = args.icon
+        if path.exists(icon):
+            icon = path.abspath(icon)
+        # The symbolic variant is looked up once, not per folder
+        symbolic = not is_path(icon) and has_symbolic(icon)
+        func, extra = set_icon, (icon, symbolic, operation)
+    else:
+        func, extra = restore_icon, (operation, )
+
+    failed = False
+    for result in run_parallel(lambda folder: safe_call(func, folder, *extra),
+                               folders, max(args.jobs, 1)):
+        failed = failed or "error" in result
+        stdout.write(json.dumps(result))
+        stdout.write("\n")
+    if operation:
+        operation.close()
+    if args.stats:
+        sys.stderr.write(json.dumps(WRITER.get_stats()))
+        sys.stderr.write("\n")
+    return 1 if failed else 0
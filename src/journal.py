@@ -0,0 +1,533 @@
+"""
+Change your nautilus directories icons easily
+
+Author : Bilal Elmoussaoui (bil.elmoussaoui@gmail.com)
+Website : https://github.com/bilelmoussaoui/nautilus-folder-icons
+Licence : GPL-3.0
+nautilus-folder-icons is free software: you can redistribute it and/or
+modify it under the terms of the GNU General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+nautilus-folder-icons is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+You should have received a copy of the GNU General Public License
+along with nautilus-folder-icons. If not, see <http://www.gnu.org/licenses/>.
+"""
+import json
+import os
+from collections import OrderedDict, namedtuple
+from os import path
+from tempfile import mkstemp
+from threading import Lock, Thread
+from time import time
+
+# The journaled attributes & their short name in the journal file
+ATTRIBUTE_KEYS = {
+    "metadata::custom-icon": "c",
+    "metadata::custom-icon-name": "n",
+    "metadata::symbolic-icon": "s",
+}
+KEY_ATTRIBUTES = dict((key, attribute)
+                      for attribute, key in ATTRIBUTE_KEYS.items())
+
+# The records kinds, an operation starts with an OPERATION record
+OPERATION = "O"
+ENTRY = "E"
+
+# id, time, description, the id of the undone operation or None
+OperationRecord = namedtuple("OperationRecord",
+                             ["id", "time", "description", "undoes"])
+# the operation id, the folder's path, it's previous & new attributes
+EntryRecord = namedtuple("EntryRecord",
+                         ["operation", "folder", "previous", "new"])
+
+
+def get_journal_path():
+    """Returns the journal file path."""
+    data_home = os.environ.get("XDG_DATA_HOME")
+    if not data_home:
+        data_home = path.join(path.expanduser("~"), ".local", "share")
+    return path.join(data_home, "nautilus-folder-icons", "journal")
+
+
+def pack_attributes(attributes):
+    """Shorten the attributes names, see ATTRIBUTE_KEYS."""
+    return dict((ATTRIBUTE_KEYS.get(attribute, attribute), value)
+                for attribute, value in attributes.items())
+
+
+def unpack_attributes(attributes):
+    """The opposite of pack_attributes."""
+    return dict((KEY_ATTRIBUTES.get(key, key), value)
+                for key, value in attributes.items())
+
+
+class Operation(object):
+    """A group of journal entries, a bulk apply for example.
+
+    The operation's record is only written with it's first entry,
+    so an operation that changes nothing isn't journaled.
+    """
+
+    def __init__(self, journal, operation_id, header):
+        self._journal = journal
+        self.id = operation_id
+        self._header = header
+        self._lock = Lock()
+
+    def write_header(self):
+        """Write the operation's record, if not done yet."""
+        with self._lock:
+            header, self._header = self._header, None
+        if header:
+            self._journal.append(header)
+
+    def record(self, folder, previous, new):
+        """Record a metadata change.
+
+        Args:
+            folder (str): the folder's path.
+            previous (dict): attribute -> value before the change,
+                None if it wasn't set.
+            new (dict): attribute -> the written value, None if unset.
+        """
+        with self._lock:
+            header, self._header = self._header, None
+            self._journal.append([ENTRY, self.id, folder,
+                                  pack_attributes(previous),
+                                  pack_attributes(new)], header)
+
+    def close(self):
+        """Write the pending entries of the journal, in a thread."""
+        self._journal.submit()
+
+
+class IndexedOperation(object):
+    """An operation of the journal's index."""
+    __slots__ = ("record", "offset", "size", "entries")
+
+    def __init__(self, record, offset):
+        # The OperationRecord & it's position in the file
+        self.record = record
+        self.offset = offset
+        # The size in bytes of it's records & it's number of entries
+        self.size = 0
+        self.entries = 0
+
+
+def get_operation_id(line):
+    """Returns the (kind, operation id) of a record's line, None if invalid.
+
+    The records are written without spaces, the entries aren't parsed.
+    """
+    try:
+        if line.startswith(b'["E",'):
+            return ENTRY, int(line[5:line.index(b",", 5)])
+        record = json.loads(line.decode("utf-8"))
+        if record[0] == OPERATION:
+            return OPERATION, record
+    except (ValueError, IndexError, TypeError, UnicodeDecodeError):
+        pass
+    return None
+
+
+class Journal(object):
+    """Append-only journal of the icon metadata changes.
+
+    Each line is a JSON record. The entries are written in batches by
+    a thread & each batch is synced to the disk. The operations are indexed
+    incrementally, only the records written since the last lookup
+    are read. Once the journal gets too large, it's compacted in
+    a thread: the undo target & the most recent operations that fit
+    in half of the maximum size are kept.
+    """
+    # Number of records written at once
+    BATCH_SIZE = 512
+    # Size (in bytes) above which the journal is compacted
+    MAX_SIZE = 16 * 1024 * 1024
+    # Number of operations kept by the compaction
+    MAX_OPERATIONS = 32
+    _default = None
+
+    def __init__(self, filename=None, max_size=None, max_operations=None):
+        self.filename = filename or get_journal_path()
+        self._max_size = max_size or Journal.MAX_SIZE
+        self._max_operations = max_operations or Journal.MAX_OPERATIONS
+        # Guards the pending records, the batches & the writer
+        self._lock = Lock()
+        self._pending = []
+        self._batches = []
+        self._writer = None
+        self._last_id = 0
+        # Guards the writes to the file
+        self._write_lock = Lock()
+        # Guards the index, taken before _write_lock if both are needed
+        self._index_lock = Lock()
+        self._operations = OrderedDict()
+        # The indexed file & how much of it is indexed
+        self._index_inode = None
+        self._index_offset = 0
+        self._compaction = None
+
+    @staticmethod
+    def get_default():
+        """Returns the journal of the user."""
+        if Journal._default is None:
+            Journal._default = Journal()
+        return Journal._default
+
+    def load(self):
+        """Index the journal, called from a thread at startup.
+
+        Otherwise the first lookup indexes the whole journal.
+        """
+        with self._index_lock:
+            self._refresh_index()
+
+    def begin(self, description, undoes=None):
+        """Start a new operation.
+
+        An undo is written right away, even if it changes nothing,
+        so the undone operation isn't the undo target anymore.
+
+        Args:
+            description (str): what the operation does.
+            undoes (int): the id of the operation it undoes.
+
+        Returns:
+            Operation: records the operation's entries.
+        """
+        with self._index_lock:
+            self._refresh_index()
+            last_id = max(self._operations) if self._operations else 0
+        with self._lock:
+            self._last_id = max(self._last_id, last_id) + 1
+            operation_id = self._last_id
+        self._start_compaction()
+        operation = Operation(self, operation_id,
+                              [OPERATION, operation_id, time(), description,
+                               undoes])
+        if undoes is not None:
+            operation.write_header()
+        return operation
+
+    def append(self, record, header=None):
+        """Queue a record, the batch is submitted once full.
+
+        Args:
+            record (list): the record.
+            header (list): the operation's record, queued first.
+        """
+        with self._lock:
+            if header:
+                self._pending.append(header)
+            self._pending.append(record)
+            full = len(self._pending) >= Journal.BATCH_SIZE
+        if full:
+            self.submit()
+
+    def submit(self):
+        """Hand the queued records to the writer thread, returns at once.
+
+        The writer isn't a daemon thread, the batches are still written
+        if the process exits meanwhile.
+        """
+        with self._lock:
+            if not self._pending:
+                return
+            self._batches.append(self._pending)
+            self._pending = []
+            if self._writer is None:
+                self._writer = Thread(target=self._write_batches)
+                self._writer.start()
+
+    def sync(self):
+        """Wait until the submitted records are synced to the disk."""
+        while True:
+            with self._lock:
+                writer = self._writer
+            if writer is None:
+                return
+            writer.join()
+
+    def flush(self):
+        """Write the queued records & wait until they're on the disk."""
+        self.submit()
+        self.sync()
+
+    def _write_batches(self):
+        """Write & sync the submitted batches, runs in the writer thread."""
+        while True:
+            with self._lock:
+                if not self._batches:
+                    self._writer = None
+                    return
+                records = self._batches.pop(0)
+            data = "".join(json.dumps(record, separators=(",", ":")) + "\n"
+                           for record in records)
+            try:
+                with self._write_lock:
+                    directory = path.dirname(self.filename)
+                    if not path.exists(directory):
+                        os.makedirs(directory)
+                    with open(self.filename, "a") as journal_file:
+                        journal_file.write(data)
+                        journal_file.flush()
+                        os.fsync(journal_file.fileno())
+            except (IOError, OSError):
+                # The journal is lost, the icons are still written
+                continue
+
+    def replay(self):
+        """Yields the journal's records, read lazily from the file.
+
+        The records are OperationRecord & EntryRecord, in their
+        writing order. Truncated or invalid lines are skipped.
+        """
+        self.flush()
+        try:
+            journal_file = open(self.filename)
+        except (IOError, OSError):
+            return
+        with journal_file:
+            for line in journal_file:
+                try:
+                    record = json.loads(line)
+                    if record[0] == OPERATION:
+                        yield OperationRecord(*record[1:5])
+                    elif record[0] == ENTRY:
+                        yield EntryRecord(record[1], record[2],
+                                          unpack_attributes(record[3]),
+                                          unpack_attributes(record[4]))
+                except (ValueError, IndexError, TypeError, AttributeError):
+                    continue
+
+    def _refresh_index(self):
+        """Index the records written since, _index_lock must be held."""
+        try:
+            journal_file = open(self.filename, "rb")
+        except (IOError, OSError):
+            self._operations = OrderedDict()
+            self._index_inode = None
+            self._index_offset = 0
+            return
+        with journal_file:
+            stat = os.fstat(journal_file.fileno())
+            if (stat.st_ino != self._index_inode
+                    or stat.st_size < self._index_offset):
+                # Compacted by another process
+                self._operations = OrderedDict()
+                self._index_inode = stat.st_ino
+                self._index_offset = 0
+            offset = self._index_offset
+            journal_file.seek(offset)
+            for line in journal_file:
+                if not line.endswith(b"\n"):
+                    # Still being written
+                    break
+                self._index_line(line, offset)
+                offset += len(line)
+            self._index_offset = offset
+
+    def _index_line(self, line, offset):
+        parsed = get_operation_id(line)
+        if parsed is None:
+            return
+        kind, value = parsed
+        if kind == OPERATION:
+            try:
+                record = OperationRecord(*value[1:5])
+            except TypeError:
+                return
+            operation = IndexedOperation(record, offset)
+            self._operations[record.id] = operation
+        else:
+            operation = self._operations.get(value)
+            if operation is None:
+                return
+            operation.entries += 1
+        operation.size += len(line)
+
+    def _get_index(self):
+        """Returns the IndexedOperation of the journal, up to date."""
+        self.flush()
+        with self._index_lock:
+            self._refresh_index()
+            return list(self._operations.values())
+
+    def iter_operations(self):
+        """Yields the OperationRecord of the journal."""
+        for operation in self._get_index():
+            yield operation.record
+
+    def get_undoable(self):
+        """Returns the last operation that wasn't undone, None otherwise.
+
+        The undo operations themselves are skipped, so successive undos
+        go back further in the history. So are the operations without
+        any entry, they changed nothing.
+        """
+        operations = self._get_index()
+        undone = set(operation.record.undoes for operation in operations
+                     if operation.record.undoes is not None)
+        for operation in reversed(operations):
+            record = operation.record
+            if (record.undoes is None and operation.entries
+                    and record.id not in undone):
+                return record
+        return None
+
+    def iter_previous_states(self, operation_id):
+        """Yields the (folder, previous attributes) of an operation.
+
+        A folder changed more than once gets it's oldest attributes.
+        The journal is only read from the operation's record.
+        """
+        self.flush()
+        with self._index_lock:
+            self._refresh_index()
+            operation = self._operations.get(operation_id)
+            offset = operation.offset if operation else None
+        if offset is None:
+            return
+        try:
+            journal_file = open(self.filename, "rb")
+        except (IOError, OSError):
+            return
+        seen = set()
+        with journal_file:
+            journal_file.seek(offset)
+            for line in journal_file:
+                parsed = get_operation_id(line)
+                if parsed != (ENTRY, operation_id):
+                    continue
+                try:
+                    record = json.loads(line.decode("utf-8"))
+                    folder = record[2]
+                    previous = unpack_attributes(record[3])
+                except (ValueError, IndexError, TypeError, AttributeError,
+                        UnicodeDecodeError):
+                    continue
+                if folder not in seen:
+                    seen.add(folder)
+                    yield folder, previous
+
+    def undo(self, concurrency=None):
+        """Revert the last operation, see get_undoable.
+
+        The previous attributes are written back with a BatchApply,
+        the undo is journaled as well.
+
+        Returns:
+            BatchApply: the batch to start, None if there's nothing to undo.
+        """
+        from metadata import BatchApply
+        operation = self.get_undoable()
+        if operation is None:
+            return None
+        undo = self.begin("undo {}".format(operation.description),
+                          undoes=operation.id)
+        return BatchApply(self.iter_previous_states(operation.id),
+                          concurrency=concurrency, operation=undo)
+
+    def _start_compaction(self):
+        """Compact the journal in a thread if it's too large."""
+        if self._compaction is not None and self._compaction.is_alive():
+            return
+        try:
+            if path.getsize(self.filename) <= self._max_size:
+                return
+        except OSError:
+            return
+        self._compaction = Thread(target=self._compact_quietly)
+        self._compaction.daemon = True
+        self._compaction.start()
+
+    def _compact_quietly(self):
+        try:
+            self.compact()
+        except (IOError, OSError):
+            pass
+
+    def wait(self):
+        """Wait for the running compaction, if any."""
+        if self._compaction is not None:
+            self._compaction.join()
+
+    def compact(self):
+        """Only keep the most recent operations.
+
+        The most recent undoable operation is always kept, whatever
+        it's size. The older operations are kept, newest first, while
+        they fit in half of the maximum size, so the compaction isn't
+        ran again right away. The undone operations, the undos & the
+        operations without entries are dropped. The file is only locked
+        to copy the records written during the compaction.
+        """
+        self.flush()
+        with self._index_lock:
+            self._refresh_index()
+            operations = list(self._operations.values())
+            indexed = self._index_offset
+            inode = self._index_inode
+        undone = set(operation.record.undoes for operation in operations
+                     if operation.record.undoes is not None)
+        candidates = [operation for operation in operations
+                      if operation.record.undoes is None
+                      and operation.entries
+                      and operation.record.id not in undone]
+        kept = OrderedDict()
+        total = 0
+        for operation in reversed(candidates[-self._max_operations:]):
+            if kept and total + operation.size > self._max_size // 2:
+                break
+            total += operation.size
+            kept[operation.record.id] = operation
+        if len(kept) == len(operations):
+            # Nothing to drop, a single operation over the maximum size
+            return
+
+        directory = path.dirname(self.filename)
+        fd, tmp_filename = mkstemp(dir=directory, suffix=".tmp")
+        try:
+            offsets = {}
+            with os.fdopen(fd, "wb") as tmp_file:
+                with open(self.filename, "rb") as journal_file:
+                    position = 0
+                    for line in journal_file:
+                        if position >= indexed:
+                            break
+                        position += len(line)
+                        parsed = get_operation_id(line)
+                        if parsed is None:
+                            continue
+                        kind, value = parsed
+                        operation_id = value[1] if kind == OPERATION \
+                            else value
+                        if operation_id in kept:
+                            if kind == OPERATION:
+                                offsets[operation_id] = tmp_file.tell()
+                            tmp_file.write(line)
+                    written = tmp_file.tell()
+                    with self._index_lock, self._write_lock:
+                        if os.fstat(journal_file.fileno()).st_ino != inode:
+                            raise OSError("Compacted by another process")
+                        # The records written during the compaction
+                        journal_file.seek(indexed)
+                        tmp_file.write(journal_file.read())
+                        tmp_file.flush()
+                        os.fsync(tmp_file.fileno())
+                        os.rename(tmp_filename, self.filename)
+                        for operation_id, operation in kept.items():
+                            operation.offset = offsets[operation_id]
+                        self._operations = OrderedDict(
+                            (operation_id, kept[operation_id])
+                            for operation_id in offsets)
+                        self._index_inode = os.stat(self.filename).st_ino
+                        self._index_offset = written
+        except (IOError, OSError):
+            if path.exists(tmp_filename):
+                os.remove(tmp_filename)
+            raise
@@ -0,0 +1,210 @@
+"""
+Change your nautilus directories icons easily
+
+Author : Bilal Elmoussaoui (bil.elmoussaoui@gmail.com)
+Website : https://github.com/bilelmoussaoui/nautilus-folder-icons
+Licence : GPL-3.0
+nautilus-folder-icons is free software: you can redistribute it and/or
+modify it under the terms of the GNU General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+nautilus-folder-icons is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+You should have received a copy of the GNU General Public License
+along with nautilus-folder-icons. If not, see <http://www.gnu.org/licenses/>.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from hashlib import sha1
+from multiprocessing import get_context
+from os import path
+
+from cache import CacheEntry, get_cache_dir, read_cache, write_cache
+
+# Colon separated list of the user icon directories
+LIBRARIES_ENV = "FOLDER_ICONS_LIBRARIES"
+SUPPORTED_EXTS = [".svg", ".png"]
+# Below this number of changed files, the icons are rendered in-process
+POOL_THRESHOLD = 16
+
+
+def get_library_dirs():
+    """Returns the user icon directories.
+
+    $XDG_DATA_HOME/nautilus-folder-icons/icons & the directories
+    of the FOLDER_ICONS_LIBRARIES environment variable.
+    """
+    data_home = os.environ.get("XDG_DATA_HOME")
+    if not data_home:
+        data_home = path.join(path.expanduser("~"), ".local", "share")
+    directories = [path.join(data_home, "nautilus-folder-icons", "icons")]
+    directories.extend(os.environ.get(LIBRARIES_ENV, "").split(os.pathsep))
+    library_dirs = []
+    for directory in directories:
+        if not directory:
+            continue
+        directory = path.abspath(path.expanduser(directory))
+        if directory not in library_dirs and path.isdir(directory):
+            library_dirs.append(directory)
+    return library_dirs
+
+
+def get_library_label(filename):
+    """Returns the searchable name of a library icon, from it's file name."""
+    name = path.splitext(path.basename(filename))[0]
+    return "-".join(name.replace("_", " ").split())
+
+
+def scan_library(directories):
+    """Yields the (path, mtime in ns) of the icons of the directories.
+
+    The hidden files are skipped & the directories symlinks aren't
+    followed. The icons are yielded sorted by path.
+    """
+    pending = sorted(directories, reverse=True)
+    while pending:
+        directory = pending.pop()
+        try:
+            entries = sorted(os.scandir(directory), key=lambda e: e.name)
+        except OSError:
+            continue
+        subdirs = []
+        for entry in entries:
+            if entry.name.startswith("."):
+                continue
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.path)
+                elif (path.splitext(entry.name)[1].lower() in SUPPORTED_EXTS
+                        and entry.is_file()):
+                    yield entry.path, entry.stat().st_mtime_ns
+            except OSError:
+                continue
+        pending.extend(reversed(subdirs))
+
+
+def render_thumbnail(filename, size):
+    """Rasterize an icon file at size, runs in the worker processes.
+
+    Returns:
+        CacheEntry: the rendered icon, None if it can't be loaded.
+    """
+    from gi import require_version
+    require_version("GdkPixbuf", "2.0")
+    from gi.repository import GdkPixbuf, GLib
+    try:
+        pixbuf = GdkPixbuf.Pixbuf.new_from_file_at_scale(filename, size,
+                                                         size, True)
+    except GLib.Error:
+        return None
+    return CacheEntry(filename, pixbuf.props.width, pixbuf.props.height,
+                      pixbuf.props.rowstride, pixbuf.props.has_alpha,
+                      pixbuf.read_pixel_bytes().get_data())
+
+
+def _render_all(filenames, size, workers=None):
+    """Render the icons, in a process pool if there are many of them."""
+    if len(filenames) < POOL_THRESHOLD:
+        return [render_thumbnail(filename, size) for filename in filenames]
+    # Forking a process that runs GLib threads isn't safe
+    context = get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers,
+                             mp_context=context) as executor:
+        chunksize = max(len(filenames) // (4 * (workers or os.cpu_count()
+                                                or 1)), 1)
+        return list(executor.map(render_thumbnail, filenames,
+                                 [size] * len(filenames),
+                                 chunksize=chunksize))
+
+
+def _entry_key(filename, mtime):
+    """The cached entry name, the icon's mtime & path."""
+    return "{}:{}".format(mtime, filename)
+
+
+class IconLibrary(object):
+    """Persistent index of the user icon directories.
+
+    The rendered icons are stored in a cache file with their mtime.
+    A rescan only renders the new & modified icons.
+    """
+
+    def __init__(self, directories=None, size=64, scale=1, workers=None):
+        """
+        Args:
+            directories (list): the icon directories, see get_library_dirs.
+            size (int): the icon size in pixels.
+            scale (int): the scale factor.
+            workers (int): the maximum number of rendering processes.
+        """
+        if directories is None:
+            directories = get_library_dirs()
+        self.directories = directories
+        self._size = size
+        self._scale = scale
+        self._workers = workers
+        key = "\n".join(directories + [str(size), str(scale)])
+        self._fingerprint = sha1(key.encode("utf-8")).hexdigest()
+        self.cache_path = path.join(get_cache_dir(),
+                                    "library-{}@{}.cache".format(size, scale))
+        self.rendered = 0
+        self.reused = 0
+        # The (path, mtime) of the icons found by the last update
+        self.scanned = []
+
+    def scan(self):
+        """Returns the (path, mtime in ns) of the icons, see scan_library.
+
+        Only the directories are read, no icon is rendered.
+        """
+        scanned = []
+        for filename, mtime in scan_library(self.directories):
+            try:
+                # The cache stores the names as utf-8
+                filename.encode("utf-8")
+            except UnicodeEncodeError:
+                continue
+            scanned.append((filename, mtime))
+        return scanned
+
+    def update(self):
+        """Scan the directories & render the changed icons.
+
+        Returns:
+            list: the CacheEntry of the icons, named by their path.
+        """
+        if not self.directories:
+            return []
+        cached = read_cache(self.cache_path, self._fingerprint) or []
+        known = dict((entry.name, entry) for entry in cached)
+
+        scanned = self.scanned = self.scan()
+        changed = [filename for filename, mtime in scanned
+                   if _entry_key(filename, mtime) not in known]
+        rendered = dict(zip(changed,
+                            _render_all(changed, self._size * self._scale,
+                                        self._workers)))
+
+        entries = []
+        stored = []
+        for filename, mtime in scanned:
+            key = _entry_key(filename, mtime)
+            entry = known.get(key)
+            if entry is None:
+                # The icons that can't be loaded are stored empty,
+                # so they're not loaded again until they're modified
+                entry = rendered[filename] or CacheEntry(filename, 0, 0, 0,
+                                                         False, b"")
+            stored.append(entry._replace(name=key))
+            if entry.width:
+                entries.append(entry._replace(name=filename))
+        self.rendered = len(changed)
+        self.reused = len(scanned) - len(changed)
+        if changed or len(stored) != len(cached):
+            try:
+                write_cache(self.cache_path, self._fingerprint, stored)
+            except (IOError, OSError):
+                pass
+        return entries
@@ -0,0 +1,632 @@
+"""
+Change your nautilus directories icons easily
+
+Author : Bilal Elmoussaoui (bil.elmoussaoui@gmail.com)
+Website : https://github.com/bilelmoussaoui/nautilus-folder-icons
+Licence : GPL-3.0
+nautilus-folder-icons is free software: you can redistribute it and/or
+modify it under the terms of the GNU General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+nautilus-folder-icons is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+You should have received a copy of the GNU General Public License
+along with nautilus-folder-icons. If not, see <http://www.gnu.org/licenses/>.
+"""
+import os
+from fnmatch import fnmatch
+from os import path
+from threading import Lock, Thread
+from time import time
+try:
+    from Queue import Empty, Full, Queue
+    from urllib2 import unquote
+    from urlparse import urlparse
+except ImportError:
+    from queue import Empty, Full, Queue
+    from urllib.parse import unquote, urlparse
+
+from gi.repository import Gio, GLib, GObject
+
+import tracing
+from tracing import GVFS
+
+
+# The icon attributes, by precedence
+ICON_ATTRIBUTES = ["metadata::custom-icon",
+                   "metadata::custom-icon-name",
+                   "standard::icon"]
+# The attributes needed to read the children icons
+ENUMERATE_ATTRIBUTES = ("standard::name,standard::type,"
+                        "standard::icon,metadata::*")
+
+
+# The icon attributes that are written
+WRITTEN_ATTRIBUTES = ["metadata::custom-icon",
+                      "metadata::custom-icon-name",
+                      "metadata::symbolic-icon"]
+
+
+def uriparse(uri):
+    """Uri parser & return the path."""
+    if not isinstance(uri, str):
+        uri = uri.get_uri()
+    return unquote(urlparse(uri).path)
+
+
+def is_path(icon):
+    """Returns whether an icon is an absolute path or an icon name."""
+    return len(icon.split("/")) > 1
+
+
+def get_attribute_value(ginfo, attribute):
+    if ginfo.has_attribute(attribute):
+        attribute_type = ginfo.get_attribute_type(attribute)
+        if attribute_type == Gio.FileAttributeType.STRING:
+            value = ginfo.get_attribute_string(attribute)
+            if value is not None:
+                return uriparse(value)
+        elif attribute_type == Gio.FileAttributeType.OBJECT:
+            # This return a Gio.ThemedIcon object
+            value = ginfo.get_attribute_object(attribute)
+            icon_names = value.props.names
+            if icon_names:
+                return icon_names[0]
+    return None
+
+
+def get_icon_from_info(ginfo):
+    """Returns the icon of a folder from it's queried attributes."""
+    for attribute in ICON_ATTRIBUTES:
+        icon_name = get_attribute_value(ginfo, attribute)
+        if icon_name:
+            return icon_name
+    return "inode-directory"
+
+
+def get_default_icon(directory):
+    """Use Gio to get the default icon."""
+    gfile = Gio.File.new_for_path(directory)
+    with tracing.span("query_info", GVFS):
+        ginfo = gfile.query_info("standard::icon,metadata::*",
+                                 Gio.FileQueryInfoFlags.NOFOLLOW_SYMLINKS)
+    return get_icon_from_info(ginfo)
+
+
+def iter_children_icons(directory, folders_only=True):
+    """Yields the (path, icon) of the children of a directory.
+
+    All the children are read with a single enumeration instead
+    of a query per child.
+
+    Args:
+        directory (str): the parent directory path.
+        folders_only (bool): whether to skip the children
+            that are not directories.
+    """
+    gfile = Gio.File.new_for_path(directory)
+    with tracing.span("enumerate_children", GVFS):
+        enumerator = gfile.enumerate_children(
+            ENUMERATE_ATTRIBUTES, Gio.FileQueryInfoFlags.NOFOLLOW_SYMLINKS)
+    try:
+        while True:
+            ginfo = enumerator.next_file()
+            if ginfo is None:
+                break
+            is_folder = ginfo.get_file_type() == Gio.FileType.DIRECTORY
+            if folders_only and not is_folder:
+                continue
+            yield (path.join(directory, ginfo.get_name()),
+                   get_icon_from_info(ginfo))
+    finally:
+        enumerator.close()
+
+
+class ChildrenIcons(GObject.GObject):
+    """Read the (path, icon) of the children of a directory asynchronously.
+
+    The children are enumerated in batches and streamed with the "icons"
+    signal, one emission per batch.
+    """
+    __gsignals__ = {
+        # a list of (path, icon)
+        'icons': (GObject.SignalFlags.RUN_FIRST, None, (object, )),
+        # the error message or None
+        'finished': (GObject.SignalFlags.RUN_FIRST, None, (object, )),
+    }
+    BATCH_SIZE = 256
+
+    def __init__(self, directory, folders_only=True, cancellable=None):
+        """
+        Args:
+            directory (str): the parent directory path.
+            folders_only (bool): see iter_children_icons.
+            cancellable (Gio.Cancellable): cancels the enumeration.
+        """
+        GObject.GObject.__init__(self)
+        self._directory = directory
+        self._folders_only = folders_only
+        self.cancellable = cancellable or Gio.Cancellable()
+
+    def start(self):
+        """Start the enumeration, returns immediately."""
+        gfile = Gio.File.new_for_path(self._directory)
+        gfile.enumerate_children_async(
+            ENUMERATE_ATTRIBUTES, Gio.FileQueryInfoFlags.NOFOLLOW_SYMLINKS,
+            GLib.PRIORITY_DEFAULT, self.cancellable, self._on_enumerate,
+            tracing.span("enumerate_children", GVFS))
+
+    def cancel(self):
+        self.cancellable.cancel()
+
+    def _on_enumerate(self, gfile, result, trace):
+        trace.finish()
+        try:
+            enumerator = gfile.enumerate_children_finish(result)
+        except GLib.Error as error:
+            self.emit("finished", error.message)
+            return
+        self._next_files(enumerator)
+
+    def _next_files(self, enumerator):
+        enumerator.next_files_async(ChildrenIcons.BATCH_SIZE,
+                                    GLib.PRIORITY_DEFAULT, self.cancellable,
+                                    self._on_next_files,
+                                    tracing.span("next_files", GVFS))
+
+    def _on_next_files(self, enumerator, result, trace):
+        trace.finish()
+        try:
+            ginfos = enumerator.next_files_finish(result)
+        except GLib.Error as error:
+            enumerator.close_async(GLib.PRIORITY_DEFAULT, None, None)
+            self.emit("finished", error.message)
+            return
+        if not ginfos:
+            enumerator.close_async(GLib.PRIORITY_DEFAULT, None, None)
+            self.emit("finished", None)
+            return
+        icons = [(path.join(self._directory, ginfo.get_name()),
+                  get_icon_from_info(ginfo))
+                 for ginfo in ginfos
+                 if not self._folders_only
+                 or ginfo.get_file_type() == Gio.FileType.DIRECTORY]
+        if icons:
+            self.emit("icons", icons)
+        self._next_files(enumerator)
+
+
+def get_icon_state(icon, symbolic=None):
+    """Returns the metadata a folder should have to use an icon.
+
+    Args:
+        icon (str): the icon name or path, None for the default icon.
+        symbolic (bool): whether the theme has the icon's symbolic
+            variant, looked up in the icon theme if None.
+
+    Returns:
+        dict: attribute -> value, None if the attribute must be unset.
+    """
+    state = dict.fromkeys(WRITTEN_ATTRIBUTES)
+    if icon is None:
+        return state
+    # In case the icon is a path & not an icon name
+    # Only one of the attributes is set, otherwise Nautilus
+    # won't be able to handle both icons at the same time
+    if is_path(icon):
+        state["metadata::custom-icon"] = "file://{}".format(icon)
+    else:
+        state["metadata::custom-icon-name"] = icon
+        # Makes sure we have a fallback icon.
+        symbolic_icon = "{}-symbolic".format(icon)
+        if symbolic is None:
+            # Only a themed icon lookup requires Gtk
+            from utils import IconNames
+            symbolic = IconNames.get_default().get_symbolic(icon) is not None
+        if symbolic:
+            state["metadata::symbolic-icon"] = symbolic_icon
+    return state
+
+
+def get_icon_changes(ginfo, state):
+    """Returns the attributes that differ from the wanted state.
+
+    Args:
+        ginfo (Gio.FileInfo): the folder's current metadata.
+        state (dict): see get_icon_state.
+    """
+    changes = {}
+    for attribute, value in state.items():
+        current = None
+        if ginfo.has_attribute(attribute):
+            current = ginfo.get_attribute_as_string(attribute)
+        if current != value:
+            changes[attribute] = value
+    return changes
+
+
+def get_previous_values(ginfo, changes):
+    """Returns the current values of the changed attributes.
+
+    Args:
+        ginfo (Gio.FileInfo): the folder's current metadata.
+        changes (dict): see get_icon_changes.
+
+    Returns:
+        dict: attribute -> value, None if the attribute isn't set.
+    """
+    previous = {}
+    for attribute in changes:
+        previous[attribute] = None
+        if ginfo.has_attribute(attribute):
+            previous[attribute] = ginfo.get_attribute_as_string(attribute)
+    return previous
+
+
+def changes_to_info(changes):
+    """Returns a Gio.FileInfo with only the changed attributes."""
+    ginfo = Gio.FileInfo.new()
+    for attribute, value in changes.items():
+        if value is None:
+            # Unset the attribute
+            ginfo.set_attribute(attribute, Gio.FileAttributeType.INVALID, 0)
+        else:
+            ginfo.set_attribute_string(attribute, value)
+    return ginfo
+
+
+class MetadataWriter(object):
+    """Write the icon metadata of folders, skipping the no-op writes.
+
+    The current metadata is compared with the wanted one and all the
+    set/unset operations are merged into a single write.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self.written = 0
+        self.skipped = 0
+
+    def count(self, written):
+        """Update the writes counters."""
+        with self._lock:
+            if written:
+                self.written += 1
+            else:
+                self.skipped += 1
+
+    def get_stats(self):
+        return {"written": self.written, "skipped": self.skipped}
+
+    def write(self, folder, icon, symbolic=None, operation=None):
+        """Set (or restore if icon is None) the icon of a folder.
+
+        Args:
+            folder (str): the folder's path.
+            icon (str): the icon name or path.
+            symbolic (bool): see get_icon_state.
+            operation (journal.Operation): journals the change.
+
+        Returns:
+            bool: whether the metadata was written.
+        """
+        gfile = Gio.File.new_for_path(folder)
+        with tracing.span("query_info", GVFS):
+            ginfo = gfile.query_info("metadata::*",
+                                     Gio.FileQueryInfoFlags.NOFOLLOW_SYMLINKS)
+        changes = get_icon_changes(ginfo, get_icon_state(icon, symbolic))
+        if changes:
+            with tracing.span("set_attributes", GVFS):
+                gfile.set_attributes_from_info(
+                    changes_to_info(changes),
+                    Gio.FileQueryInfoFlags.NOFOLLOW_SYMLINKS)
+            if operation:
+                operation.record(folder, get_previous_values(ginfo, changes),
+                                 changes)
+        self.count(bool(changes))
+        return bool(changes)
+
+
+# The writer used by default, it's counters cover the whole session
+WRITER = MetadataWriter()
+
+
+def restore_default_icon(folder, operation=None):
+    """Restore default icon of a folder.
+
+    Args:
+        folder (str): the folder's path.
+        operation (journal.Operation): journals the change.
+    """
+    return WRITER.write(folder, None, operation=operation)
+
+
+def set_default_icon(folder, icon, symbolic=None, operation=None):
+    """Use Gio to set the default folder icon.
+
+    Args:
+        folder (str): the folder's path.
+        icon   (str): the icon name to be set.
+        symbolic (bool): see get_icon_state.
+        operation (journal.Operation): journals the change.
+    """
+    return WRITER.write(folder, icon, symbolic, operation)
+
+
+class BatchApply(GObject.GObject):
+    """Set (or restore) the icon of many folders asynchronously.
+
+    At most `concurrency` folders are queried/updated at the same time
+    using the Gio async API, so the main loop is never blocked.
+    The folders can be any iterable, it's consumed lazily. It can also
+    yield (folder, state) pairs to write a different state per folder,
+    or (folder, error) pairs to report a rejected folder.
+    An iterable without a length (a walker) is consumed in a thread,
+    as each step may scan a large directory.
+    """
+    __gsignals__ = {
+        # done, total (-1 if unknown)
+        'progress': (GObject.SignalFlags.RUN_FIRST, None, (int, int)),
+        # the report: folder path -> error message or None
+        'finished': (GObject.SignalFlags.RUN_FIRST, None, (object, )),
+    }
+    CONCURRENCY = 16
+    # The folders walked ahead of the pending operations
+    QUEUE_SIZE = 256
+
+    def __init__(self, folders, icon=None, concurrency=None,
+                 cancellable=None, writer=None, operation=None):
+        """
+        Args:
+            folders (iterable): the folders paths or (path, state) pairs.
+            icon (str): the icon name or path, None to restore the default.
+            concurrency (int): the maximum number of pending operations.
+            cancellable (Gio.Cancellable): cancels the remaining folders.
+            writer (MetadataWriter): counts the issued/skipped writes.
+            operation (journal.Operation): journals the changes.
+        """
+        GObject.GObject.__init__(self)
+        self._folders = iter(folders)
+        self._total = len(folders) if hasattr(folders, "__len__") else -1
+        # The wanted state is the same for all the folders
+        self._state = get_icon_state(icon)
+        self._writer = writer or WRITER
+        self._operation = operation
+        self._concurrency = concurrency or BatchApply.CONCURRENCY
+        self.cancellable = cancellable or Gio.Cancellable()
+        self._pending = 0
+        self._done = 0
+        self._exhausted = False
+        self._finished = False
+        # Fed by the walker thread if the total is unknown
+        self._queue = Queue(BatchApply.QUEUE_SIZE) if self._total < 0 else None
+        self._fed = False
+        self._lock = Lock()
+        self._scheduled = False
+        self.report = {}
+        # The folders which metadata was actually written
+        self.written = []
+
+    def start(self):
+        """Start applying the icon, returns immediately."""
+        if self._queue is not None:
+            Thread(target=self._feed, daemon=True).start()
+        self._fill()
+
+    def cancel(self):
+        """Cancel the pending & remaining folders."""
+        self.cancellable.cancel()
+
+    @property
+    def failed(self):
+        """Returns the folders that failed with their error message."""
+        return dict((folder, error) for folder, error in self.report.items()
+                    if error is not None)
+
+    def _feed(self):
+        """Walk the folders off the main loop, runs in a thread."""
+        try:
+            for folder in self._folders:
+                while not self.cancellable.is_cancelled():
+                    try:
+                        self._queue.put(folder, timeout=0.1)
+                        break
+                    except Full:
+                        pass
+                else:
+                    break
+                self._wake()
+        finally:
+            self._fed = True
+            self._wake()
+
+    def _wake(self):
+        """Resume filling from the main loop, at most once at a time."""
+        with self._lock:
+            if self._scheduled:
+                return
+            self._scheduled = True
+        GLib.idle_add(self._on_fed)
+
+    def _on_fed(self):
+        with self._lock:
+            self._scheduled = False
+        self._fill()
+        return False
+
+    def _next_folder(self):
+        """Returns the next folder, None if the walker is behind."""
+        if self._queue is None:
+            return next(self._folders)
+        # Once fed, an empty queue is the end of the folders
+        fed = self._fed
+        try:
+            return self._queue.get_nowait()
+        except Empty:
+            if fed:
+                raise StopIteration
+            return None
+
+    def _fill(self):
+        """Start new operations until the concurrency window is full."""
+        while (self._pending < self._concurrency and not self._exhausted
+               and not self.cancellable.is_cancelled()):
+            try:
+                folder = self._next_folder()
+            except StopIteration:
+                self._exhausted = True
+                break
+            if folder is None:
+                # Resumed by the walker thread
+                break
+            if isinstance(folder, tuple):
+                folder, state = folder
+            else:
+                state = self._state
+            if isinstance(state, Exception):
+                # Rejected by the folders iterable, nothing to write
+                self.report[folder] = str(state)
+                self._done += 1
+                self.emit("progress", self._done, self._total)
+                continue
+            self._pending += 1
+            gfile = Gio.File.new_for_path(folder)
+            gfile.query_info_async("metadata::*",
+                                   Gio.FileQueryInfoFlags.NOFOLLOW_SYMLINKS,
+                                   GLib.PRIORITY_DEFAULT, self.cancellable,
+                                   self._on_query_info,
+                                   (folder, state,
+                                    tracing.span("query_info", GVFS)))
+        if (self._pending == 0 and not self._finished
+                and (self._exhausted or self.cancellable.is_cancelled())):
+            self._finished = True
+            if self._operation:
+                self._operation.close()
+            self.emit("finished", self.report)
+
+    def _on_query_info(self, gfile, result, data):
+        folder, state, trace = data
+        trace.finish()
+        try:
+            ginfo = gfile.query_info_finish(result)
+        except GLib.Error as error:
+            self._complete(folder, error.message)
+            return
+        changes = get_icon_changes(ginfo, state)
+        if not changes:
+            self._writer.count(False)
+            self._complete(folder, None)
+            return
+        previous = get_previous_values(ginfo, changes)
+        gfile.set_attributes_async(
+            changes_to_info(changes),
+            Gio.FileQueryInfoFlags.NOFOLLOW_SYMLINKS,
+            GLib.PRIORITY_DEFAULT, self.cancellable,
+            self._on_set_attributes,
+            (folder, previous, changes, tracing.span("set_attributes", GVFS)))
+
+    def _on_set_attributes(self, gfile, result, data):
+        folder, previous, changes, trace = data
+        trace.finish()
+        try:
+            gfile.set_attributes_finish(result)
+            self._writer.count(True)
+            self.written.append(folder)
+            if self._operation:
+                self._operation.record(folder, previous, changes)
+            self._complete(folder, None)
+        except GLib.Error as error:
+            self._complete(folder, error.message)
+
+    def _complete(self, folder, error):
+        self.report[folder] = error
+        self._pending -= 1
+        self._done += 1
+        self.emit("progress", self._done, self._total)
+        self._fill()
+
+
+def walk_folders(root, max_depth=None, include=None, exclude=None):
+    """Yields the root folder and it's subfolders, lazily.
+
+    Symlinks are never followed, like the NOFOLLOW_SYMLINKS queries,
+    which avoids symlink loops.
+
+    Args:
+        root (str): the root folder path.
+        max_depth (int): the maximum depth, 0 for the root only.
+        include (list): glob patterns, only the matching folders
+            names are yielded. Their subfolders are still walked.
+        exclude (list): glob patterns, the matching folders and
+            their subfolders are skipped.
+    """
+    def matches(name, patterns):
+        return any(fnmatch(name, pattern) for pattern in patterns)
+
+    # A stack of (folder, depth), only the pending folders are kept
+    stack = [(root, 0)]
+    while stack:
+        folder, depth = stack.pop()
+        name = path.basename(folder.rstrip("/"))
+        if not include or matches(name, include):
+            yield folder
+        if max_depth is not None and depth >= max_depth:
+            continue
+        try:
+            entries = os.scandir(folder)
+        except OSError:
+            continue
+        subfolders = []
+        with entries:
+            for entry in entries:
+                try:
+                    if not entry.is_dir(follow_symlinks=False):
+                        continue
+                except OSError:
+                    continue
+                if exclude and matches(entry.name, exclude):
+                    continue
+                subfolders.append(entry.path)
+        subfolders.sort(reverse=True)
+        stack.extend((subfolder, depth + 1) for subfolder in subfolders)
+
+
+def estimate_apply(folders, sample=50):
+    """Count the folders an icon would be applied to, without writing.
+
+    Args:
+        folders (iterable): the folders paths, consumed lazily.
+        sample (int): the number of folders metadata to read to
+            estimate the time of a metadata round trip.
+
+    Returns:
+        tuple: the number of folders & the estimated time in seconds.
+    """
+    count = 0
+    elapsed = 0
+    for folder in folders:
+        if count < sample:
+            start = time()
+            try:
+                gfile = Gio.File.new_for_path(folder)
+                with tracing.span("query_info", GVFS):
+                    gfile.query_info("metadata::*",
+                                     Gio.FileQueryInfoFlags.NOFOLLOW_SYMLINKS)
+            except GLib.Error:
+                pass
+            elapsed += time() - start
+        count += 1
+    if not count:
+        return 0, 0
+    # Applying an icon reads & writes the metadata of each folder
+    per_folder = 2 * elapsed / min(count, sample)
+    return count, per_folder * count
+
+
+def iter_subtrees(folders, max_depth=None, include=None, exclude=None):
+    """Yields the folders and all their subfolders, lazily."""
+    for folder in folders:
+        for subfolder in walk_folders(folder, max_depth, include, exclude):
+            yield subfolder
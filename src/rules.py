@@ -0,0 +1,335 @@
+"""
+Change your nautilus directories icons easily
+
+Author : Bilal Elmoussaoui (bil.elmoussaoui@gmail.com)
+Website : https://github.com/bilelmoussaoui/nautilus-folder-icons
+Licence : GPL-3.0
+nautilus-folder-icons is free software: you can redistribute it and/or
+modify it under the terms of the GNU General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+nautilus-folder-icons is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+You should have received a copy of the GNU General Public License
+along with nautilus-folder-icons. If not, see <http://www.gnu.org/licenses/>.
+"""
+import json
+import os
+import re
+from fnmatch import translate
+from os import path
+
+from gi.repository import Gio, GLib
+
+from journal import Journal
+from metadata import BatchApply
+
+# The glob special characters
+MAGIC = re.compile(r"[*?[]")
+
+
+def get_rules_path():
+    """Returns the rules configuration file path."""
+    config_home = os.environ.get("XDG_CONFIG_HOME")
+    if not config_home:
+        config_home = path.join(path.expanduser("~"), ".config")
+    return path.join(config_home, "nautilus-folder-icons", "rules.json")
+
+
+class Rule(object):
+    """An icon applied to the new folders matching all the conditions."""
+    __slots__ = ("index", "icon", "name", "parent", "marker", "_name_match")
+
+    def __init__(self, index, icon, name=None, parent=None, marker=None):
+        """
+        Args:
+            index (int): the rule's priority, the lowest first.
+            icon (str): the icon name or path.
+            name (str): a glob the folder's name must match.
+            parent (str): a path the folder must be inside of.
+            marker (str): a file name the folder must contain.
+        """
+        self.index = index
+        self.icon = icon
+        self.name = name
+        self.parent = path.abspath(path.expanduser(parent)) if parent else None
+        self.marker = marker
+        self._name_match = re.compile(translate(name)).match if name else None
+
+    def matches(self, folder, name, children):
+        """Whether a folder matches all the rule's conditions.
+
+        Args:
+            folder (str): the folder's path.
+            name (str): the folder's name.
+            children (callable): returns the set of the folder's children.
+        """
+        if self._name_match and not self._name_match(name):
+            return False
+        if self.parent and not folder.startswith(self.parent + os.sep):
+            return False
+        if self.marker and self.marker not in children():
+            return False
+        return True
+
+
+class RuleSet(object):
+    """Rules indexed by their most selective condition.
+
+    Each rule is indexed once: by it's name if it has no wildcard, by
+    the literal prefix or suffix of it's name glob, by it's parent path
+    or by it's marker. A folder is then only checked against the rules
+    of the index entries it hits, instead of all of them. Only the rules
+    without any of these, like a single "*music*" glob, are checked for
+    every folder.
+    """
+
+    def __init__(self, rules):
+        self._rules = list(rules)
+        self._names = {}
+        self._prefixes = {}
+        self._suffixes = {}
+        self._parents = {}
+        self._markers = {}
+        # The rules without any indexable condition
+        self._others = []
+        for rule in self._rules:
+            self._index(rule)
+
+    def __len__(self):
+        return len(self._rules)
+
+    def _index(self, rule):
+        if rule.name:
+            parts = MAGIC.split(rule.name)
+            if len(parts) == 1:
+                self._names.setdefault(rule.name, []).append(rule)
+                return
+            prefix, suffix = parts[0], parts[-1]
+            # The suffix might be the end of a [...] set
+            if "]" in suffix:
+                suffix = ""
+            if prefix and len(prefix) >= len(suffix):
+                self._prefixes.setdefault(prefix, []).append(rule)
+                return
+            if suffix:
+                self._suffixes.setdefault(suffix, []).append(rule)
+                return
+        if rule.parent:
+            self._parents.setdefault(rule.parent, []).append(rule)
+        elif rule.marker:
+            self._markers.setdefault(rule.marker, []).append(rule)
+        else:
+            self._others.append(rule)
+
+    def match(self, folder):
+        """Returns the first rule matching a folder, None otherwise.
+
+        Args:
+            folder (str): the folder's absolute path.
+        """
+        name = path.basename(folder)
+        candidates = list(self._names.get(name, ()))
+        for i in range(1, len(name) + 1):
+            candidates.extend(self._prefixes.get(name[:i], ()))
+            candidates.extend(self._suffixes.get(name[-i:], ()))
+        parent = path.dirname(folder)
+        while self._parents:
+            candidates.extend(self._parents.get(parent, ()))
+            if parent == path.dirname(parent):
+                break
+            parent = path.dirname(parent)
+
+        listing = []
+
+        def children():
+            # The folder is only listed once, if a rule needs it
+            if not listing:
+                try:
+                    listing.append(set(os.listdir(folder)))
+                except OSError:
+                    listing.append(set())
+            return listing[0]
+
+        if self._markers:
+            for child in children():
+                candidates.extend(self._markers.get(child, ()))
+        candidates.extend(self._others)
+
+        for rule in sorted(set(candidates), key=lambda rule: rule.index):
+            if rule.matches(folder, name, children):
+                return rule
+        return None
+
+
+def load_rules(filename=None):
+    """Read the rules configuration.
+
+    The configuration is a JSON object, for example:
+        {"roots": [{"path": "~/Projects", "depth": 2}],
+         "rules": [{"icon": "folder-development", "marker": ".git"},
+                   {"icon": "folder-music", "name": "*music*"}]}
+
+    Returns:
+        tuple: the list of (root path, depth) & the RuleSet.
+    """
+    with open(filename or get_rules_path()) as config_file:
+        config = json.load(config_file)
+    roots = []
+    for root in config.get("roots", []):
+        if not isinstance(root, dict):
+            root = {"path": root}
+        roots.append((path.abspath(path.expanduser(root["path"])),
+                      max(int(root.get("depth", 1)), 1)))
+    rules = [Rule(index, rule["icon"], rule.get("name"), rule.get("parent"),
+                  rule.get("marker"))
+             for index, rule in enumerate(config.get("rules", []))]
+    return roots, RuleSet(rules)
+
+
+class RulesEngine(object):
+    """Apply the rules to the folders created inside the roots.
+
+    The roots are watched with Gio.FileMonitor. The created folders are
+    collected for a short delay, evaluated once and written in a batch
+    per icon.
+    """
+    # Time (in milliseconds) the created folders are collected for
+    DELAY = 500
+
+    def __init__(self, roots, rules, delay=None):
+        """
+        Args:
+            roots (list): the (path, depth) of the watched folders,
+                depth 1 only watches the root's direct children.
+            rules (RuleSet): the rules.
+            delay (int): see DELAY.
+        """
+        self._roots = roots
+        self._rules = rules
+        self._delay = delay or RulesEngine.DELAY
+        # folder path -> (Gio.FileMonitor, depth)
+        self._monitors = {}
+        # folder path -> remaining watch depth
+        self._pending = {}
+        # The (folder, depth) still to watch, see _watch_next
+        self._to_watch = []
+        self._watch_id = None
+        self._evaluated = set()
+        self._batches = set()
+        self._source_id = None
+        self.applied = 0
+
+    def start(self):
+        """Watch the roots, the existing folders are left untouched.
+
+        The monitors are created from a low priority idle source, one
+        folder at a time, to not hold the main loop on large roots.
+        """
+        for root, depth in reversed(self._roots):
+            if path.isdir(root):
+                self._watch(root, depth)
+
+    def stop(self):
+        """Stop watching the roots & cancel the pending evaluation."""
+        for monitor, depth in self._monitors.values():
+            monitor.cancel()
+        self._monitors.clear()
+        self._pending.clear()
+        del self._to_watch[:]
+        if self._watch_id is not None:
+            GLib.source_remove(self._watch_id)
+            self._watch_id = None
+        if self._source_id is not None:
+            GLib.source_remove(self._source_id)
+            self._source_id = None
+
+    def _watch(self, folder, depth):
+        self._to_watch.append((folder, depth))
+        if self._watch_id is None:
+            self._watch_id = GLib.idle_add(self._watch_next,
+                                           priority=GLib.PRIORITY_LOW)
+
+    def _watch_next(self):
+        """Watch the next pending folder, queue its sub-folders."""
+        if not self._to_watch:
+            self._watch_id = None
+            return False
+        folder, depth = self._to_watch.pop()
+        if folder in self._monitors:
+            return True
+        try:
+            monitor = Gio.File.new_for_path(folder).monitor_directory(
+                Gio.FileMonitorFlags.WATCH_MOVES, None)
+        except GLib.Error:
+            return True
+        monitor.connect("changed", self._on_changed, folder)
+        self._monitors[folder] = (monitor, depth)
+        if depth > 1:
+            try:
+                entries = list(os.scandir(folder))
+            except OSError:
+                return True
+            self._to_watch.extend((entry.path, depth - 1)
+                                  for entry in entries
+                                  if entry.is_dir(follow_symlinks=False))
+        return True
+
+    def _unwatch(self, folder):
+        prefix = folder + os.sep
+        for watched in list(self._monitors):
+            if watched == folder or watched.startswith(prefix):
+                self._monitors.pop(watched)[0].cancel()
+
+    def _on_changed(self, monitor, gfile, other_file, event, parent):
+        if event in (Gio.FileMonitorEvent.CREATED,
+                     Gio.FileMonitorEvent.MOVED_IN):
+            folder = gfile.get_path()
+        elif event == Gio.FileMonitorEvent.RENAMED:
+            self._forget(gfile.get_path())
+            folder = other_file.get_path()
+        elif event in (Gio.FileMonitorEvent.DELETED,
+                       Gio.FileMonitorEvent.MOVED_OUT):
+            self._forget(gfile.get_path())
+            return
+        else:
+            return
+        if folder in self._evaluated or parent not in self._monitors:
+            return
+        self._pending[folder] = self._monitors[parent][1] - 1
+        if self._source_id is None:
+            self._source_id = GLib.timeout_add(self._delay, self._flush)
+
+    def _forget(self, folder):
+        self._evaluated.discard(folder)
+        self._pending.pop(folder, None)
+        self._unwatch(folder)
+
+    def _flush(self):
+        """Evaluate the created folders, runs once the delay is over."""
+        self._source_id = None
+        pending, self._pending = self._pending, {}
+        groups = {}
+        for folder, depth in pending.items():
+            if path.islink(folder) or not path.isdir(folder):
+                continue
+            self._evaluated.add(folder)
+            if depth > 0:
+                self._watch(folder, depth)
+            rule = self._rules.match(folder)
+            if rule:
+                groups.setdefault(rule.icon, []).append(folder)
+        for icon, folders in groups.items():
+            operation = Journal.get_default().begin(
+                "rule set {}".format(icon))
+            batch = BatchApply(folders, icon, operation=operation)
+            batch.connect("finished", self._on_batch_finished)
+            self._batches.add(batch)
+            batch.start()
+        return False
+
+    def _on_batch_finished(self, batch, report):
+        self._batches.discard(batch)
+        self.applied += len(batch.written)
@@ -0,0 +1,183 @@
+"""
+Change your nautilus directories icons easily
+
+Author : Bilal Elmoussaoui (bil.elmoussaoui@gmail.com)
+Website : https://github.com/bilelmoussaoui/nautilus-folder-icons
+Licence : GPL-3.0
+nautilus-folder-icons is free software: you can redistribute it and/or
+modify it under the terms of the GNU General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+nautilus-folder-icons is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+You should have received a copy of the GNU General Public License
+along with nautilus-folder-icons. If not, see <http://www.gnu.org/licenses/>.
+"""
+from bisect import bisect_left
+
+# Match ranks, the higher the better
+EXACT = 3
+PREFIX = 2
+SUBSTRING = 1
+# Number of cached per term matches
+MATCHES_CACHE_SIZE = 256
+
+
+def tokenize(name):
+    """Split an icon name into it's hyphen separated lowercase parts."""
+    return set(token for token in name.lower().split("-") if token)
+
+
+def trigrams(text):
+    """Returns the set of trigrams of a string."""
+    return set(text[i:i + 3] for i in range(len(text) - 2))
+
+
+class IconSearch(object):
+    """Ranked search over icon names.
+
+    The index is built once, each query is then evaluated using
+    a sorted token list (exact & prefix matches) and a trigram index
+    (substring matches). All the query terms have to match.
+    """
+
+    def __init__(self, names, aliases=None, labels=None):
+        """
+        Args:
+            names (list): the icon names, in their display order.
+            aliases (dict): alias name -> icon name.
+            labels (dict): icon name -> the text searched instead of the
+                name, for the icons files paths.
+        """
+        self._names = list(names)
+        labels = labels or {}
+        positions = dict((name, i) for i, name in enumerate(self._names))
+        # names index -> searchable texts (name or label & aliases)
+        self._texts = [[labels.get(name, name).lower()]
+                       for name in self._names]
+        for alias, name in (aliases or {}).items():
+            if name in positions:
+                self._texts[positions[name]].append(alias.lower())
+        # The texts of a name joined, for a single substring check
+        self._joined = ["\n".join(texts) for texts in self._texts]
+
+        # token -> list of names indexes
+        token_index = {}
+        # trigram -> set of names indexes
+        self._trigram_index = {}
+        for index, texts in enumerate(self._texts):
+            for text in texts:
+                for token in tokenize(text):
+                    token_index.setdefault(token, set()).add(index)
+                for trigram in trigrams(text):
+                    self._trigram_index.setdefault(trigram,
+                                                   set()).add(index)
+        self._tokens = sorted(token_index)
+        self._token_indexes = [list(token_index[token])
+                               for token in self._tokens]
+
+        # names indexes sorting key, shortest names first
+        self._order = [0] * len(self._names)
+        by_length = sorted(range(len(self._names)),
+                           key=lambda i: (len(self._texts[i][0]), i))
+        for position, index in enumerate(by_length):
+            self._order[index] = position
+        # Per term matches, successive keystrokes share most terms
+        self._matches_cache = {}
+
+    def __len__(self):
+        return len(self._names)
+
+    def _match_term(self, term):
+        """Returns a dict of names indexes -> rank for a single term."""
+        matches = self._matches_cache.get(term)
+        if matches is None:
+            if len(self._matches_cache) >= MATCHES_CACHE_SIZE:
+                self._matches_cache.clear()
+            matches = self._compute_matches(term)
+            self._matches_cache[term] = matches
+        return matches
+
+    def _substring_candidates(self, term):
+        """Returns the names indexes that might contain the term."""
+        # The previous keystroke matches contain all of this term's
+        previous = self._matches_cache.get(term[:-1])
+        if previous is not None:
+            return previous
+        if len(term) < 3:
+            return range(len(self._names))
+        candidates = None
+        for trigram in trigrams(term):
+            indexes = self._trigram_index.get(trigram, ())
+            if candidates is None:
+                candidates = set(indexes)
+            else:
+                candidates &= indexes
+            if not candidates:
+                break
+        return candidates
+
+    def _compute_matches(self, term):
+        texts = self._texts
+        joined = self._joined
+        matches = dict.fromkeys(
+            [index for index in self._substring_candidates(term)
+             if term in joined[index]],
+            SUBSTRING)
+        if "-" in term:
+            # The term spans multiple tokens, match the whole names
+            for index in list(matches):
+                for text in texts[index]:
+                    if text == term:
+                        matches[index] = EXACT
+                        break
+                    elif text.startswith(term):
+                        matches[index] = PREFIX
+            return matches
+
+        # Prefix matches, the sorted tokens starting with the term
+        position = bisect_left(self._tokens, term)
+        while (position < len(self._tokens)
+               and self._tokens[position].startswith(term)):
+            if self._tokens[position] != term:
+                matches.update(dict.fromkeys(self._token_indexes[position],
+                                             PREFIX))
+            position += 1
+        # Exact matches last, so they override the prefix ones
+        position = bisect_left(self._tokens, term)
+        if position < len(self._tokens) and self._tokens[position] == term:
+            matches.update(dict.fromkeys(self._token_indexes[position],
+                                         EXACT))
+        return matches
+
+    def search(self, query):
+        """Returns the icon names matching a query, best matches first.
+
+        Args:
+            query (str): space separated search terms.
+        """
+        terms = query.lower().split()
+        if not terms:
+            return list(self._names)
+
+        ranks = None
+        for term in terms:
+            matches = self._match_term(term)
+            if ranks is None:
+                ranks = matches
+            else:
+                ranks = dict((index, rank + matches[index])
+                             for index, rank in ranks.items()
+                             if index in matches)
+            if not ranks:
+                return []
+        # Order by the searched texts length, then group by rank
+        groups = {}
+        for index in sorted(ranks, key=self._order.__getitem__):
+            groups.setdefault(ranks[index], []).append(self._names[index])
+        results = []
+        for rank in sorted(groups, reverse=True):
+            results.extend(groups[rank])
+        return results
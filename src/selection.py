@@ -0,0 +1,108 @@
+"""
+Change your nautilus directories icons easily
+
+Author : Bilal Elmoussaoui (bil.elmoussaoui@gmail.com)
+Website : https://github.com/bilelmoussaoui/nautilus-folder-icons
+Licence : GPL-3.0
+nautilus-folder-icons is free software: you can redistribute it and/or
+modify it under the terms of the GNU General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+nautilus-folder-icons is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+You should have received a copy of the GNU General Public License
+along with nautilus-folder-icons. If not, see <http://www.gnu.org/licenses/>.
+"""
+import operator
+
+# Number of folders needed to build the menu: none, one or many
+MENU_FOLDERS_LIMIT = 2
+
+
+def is_local_folder(file_info):
+    """Whether a file manager FileInfo is a local directory."""
+    return file_info.is_directory() and file_info.get_uri_scheme() == "file"
+
+
+def get_path(file_info):
+    """Returns the path of a FileInfo, without parsing it's uri."""
+    return file_info.get_location().get_path()
+
+
+class FolderSelection(object):
+    """The local folders of a file manager selection.
+
+    The selection is only scanned as far as needed: building the menu
+    stops at the second folder, the folders paths are only resolved
+    once a menu item is activated.
+    """
+    __slots__ = ("_files", "_position", "_found")
+
+    def __init__(self, files):
+        self._files = files
+        # The scan position & the local folders found so far
+        self._position = 0
+        self._found = []
+
+    def _scan(self, limit=None):
+        files = self._files
+        while self._position < len(files):
+            if limit is not None and len(self._found) >= limit:
+                break
+            file_info = files[self._position]
+            self._position += 1
+            if is_local_folder(file_info):
+                self._found.append(file_info)
+
+    def count(self, limit=None):
+        """Returns the number of folders, counted up to limit."""
+        self._scan(limit)
+        if limit is None:
+            return len(self._found)
+        return min(len(self._found), limit)
+
+    def __bool__(self):
+        return self.count(1) > 0
+
+    @property
+    def is_single(self):
+        return self.count(MENU_FOLDERS_LIMIT) == 1
+
+    @property
+    def folders(self):
+        """The folders paths, resolved on each access.
+
+        The folders might have been renamed since the selection was made.
+        """
+        self._scan()
+        return [get_path(file_info) for file_info in self._found]
+
+
+class SelectionCache(object):
+    """Keeps the FolderSelection of the last selection.
+
+    The file manager asks for the menu items on every right-click &
+    selection change, an unchanged selection isn't scanned again.
+    The selections are compared by the identity of their FileInfo.
+    """
+    __slots__ = ("_files", "_selection", "hits", "misses")
+
+    def __init__(self):
+        self._files = None
+        self._selection = None
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, files):
+        """Returns the FolderSelection of a list of FileInfo."""
+        files = tuple(files)
+        if (self._files is not None and len(files) == len(self._files)
+                and all(map(operator.is_, files, self._files))):
+            self.hits += 1
+            return self._selection
+        self.misses += 1
+        self._files = files
+        self._selection = FolderSelection(files)
+        return self._selection
@@ -0,0 +1,194 @@
+"""
+Change your nautilus directories icons easily
+
+Author : Bilal Elmoussaoui (bil.elmoussaoui@gmail.com)
+Website : https://github.com/bilelmoussaoui/nautilus-folder-icons
+Licence : GPL-3.0
+nautilus-folder-icons is free software: you can redistribute it and/or
+modify it under the terms of the GNU General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+nautilus-folder-icons is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+You should have received a copy of the GNU General Public License
+along with nautilus-folder-icons. If not, see <http://www.gnu.org/licenses/>.
+"""
+import json
+from os import path, sep
+
+from gi.repository import Gio, GLib
+
+import tracing
+from journal import pack_attributes, unpack_attributes
+from metadata import WRITTEN_ATTRIBUTES, BatchApply
+from tracing import GVFS
+
+# The first line of a snapshot file
+FORMAT = "nautilus-folder-icons-snapshot"
+VERSION = 1
+# The attributes needed to walk a tree & read it's icons
+SNAPSHOT_ATTRIBUTES = ",".join(["standard::name", "standard::type"]
+                               + WRITTEN_ATTRIBUTES)
+# The custom icons inside the exported tree are stored relatively
+RELATIVE_PREFIX = "./"
+
+
+def get_attributes(ginfo):
+    """Returns the written attributes that are set on a folder."""
+    attributes = {}
+    for attribute in WRITTEN_ATTRIBUTES:
+        if ginfo.has_attribute(attribute):
+            attributes[attribute] = ginfo.get_attribute_as_string(attribute)
+    return attributes
+
+
+def relativize(attributes, root):
+    """Store a custom icon that is inside the root relatively to it."""
+    uri = attributes.get("metadata::custom-icon")
+    if uri is not None:
+        icon = Gio.File.new_for_uri(uri).get_path()
+        if icon and icon.startswith(root.rstrip(sep) + sep):
+            attributes["metadata::custom-icon"] = (
+                RELATIVE_PREFIX + path.relpath(icon, root))
+    return attributes
+
+
+def absolutize(attributes, root):
+    """The opposite of relativize, using the import root."""
+    icon = attributes.get("metadata::custom-icon")
+    if icon is not None and icon.startswith(RELATIVE_PREFIX):
+        icon = path.join(root, icon[len(RELATIVE_PREFIX):])
+        attributes["metadata::custom-icon"] = (
+            Gio.File.new_for_path(icon).get_uri())
+    return attributes
+
+
+def iter_snapshot(root):
+    """Yields the (relative path, attributes) of the customized folders.
+
+    The tree is walked depth first with one enumeration per directory,
+    only the directories left to enumerate are kept in memory.
+    Symlinks are never followed.
+
+    Args:
+        root (str): the exported tree.
+    """
+    root = path.abspath(root)
+    with tracing.span("query_info", GVFS):
+        ginfo = Gio.File.new_for_path(root).query_info(
+            SNAPSHOT_ATTRIBUTES, Gio.FileQueryInfoFlags.NOFOLLOW_SYMLINKS)
+    attributes = get_attributes(ginfo)
+    if attributes:
+        yield ".", relativize(attributes, root)
+    stack = [root]
+    while stack:
+        directory = stack.pop()
+        gfile = Gio.File.new_for_path(directory)
+        try:
+            with tracing.span("enumerate_children", GVFS):
+                enumerator = gfile.enumerate_children(
+                    SNAPSHOT_ATTRIBUTES,
+                    Gio.FileQueryInfoFlags.NOFOLLOW_SYMLINKS)
+        except GLib.Error:
+            # Unreadable directories are skipped, like os.walk does
+            continue
+        try:
+            while True:
+                ginfo = enumerator.next_file()
+                if ginfo is None:
+                    break
+                if ginfo.get_file_type() != Gio.FileType.DIRECTORY:
+                    continue
+                folder = path.join(directory, ginfo.get_name())
+                stack.append(folder)
+                attributes = get_attributes(ginfo)
+                if attributes:
+                    yield (path.relpath(folder, root),
+                           relativize(attributes, root))
+        finally:
+            enumerator.close()
+
+
+def export_snapshot(root, stream):
+    """Write the icons of a tree to a text stream, returns the entries count.
+
+    The first line is the header, then each customized folder is
+    a [relative path, attributes] JSON line. The attributes names
+    are shortened like in the journal.
+    """
+    root = path.abspath(root)
+    header = {"format": FORMAT, "version": VERSION, "root": root}
+    stream.write(json.dumps(header))
+    stream.write("\n")
+    count = 0
+    for folder, attributes in iter_snapshot(root):
+        stream.write(json.dumps([folder, pack_attributes(attributes)],
+                                separators=(",", ":")))
+        stream.write("\n")
+        count += 1
+    return count
+
+
+def read_header(stream):
+    """Returns the snapshot header, the stream is left at the entries.
+
+    Raises:
+        ValueError: if the stream isn't a snapshot.
+    """
+    header = json.loads(stream.readline() or "null")
+    if not isinstance(header, dict) or header.get("format") != FORMAT:
+        raise ValueError("Not a folder icons snapshot")
+    if header.get("version") != VERSION:
+        raise ValueError("Unsupported snapshot version: {}".format(
+            header.get("version")))
+    return header
+
+
+def iter_states(stream, root):
+    """Yields the (folder, state) pairs of the snapshot entries.
+
+    The folders are remapped to the root, the attributes
+    that are missing from an entry are unset. The entries that are
+    absolute or outside of the root are yielded with a ValueError,
+    so are the invalid lines, as "line <number>".
+    """
+    prefix = root.rstrip(sep) + sep
+    # The header is the first line
+    for number, line in enumerate(stream, 2):
+        if not line.strip():
+            continue
+        try:
+            entry, attributes = json.loads(line)
+            folder = path.normpath(path.join(root, entry))
+            state = dict.fromkeys(WRITTEN_ATTRIBUTES)
+            state.update(absolutize(unpack_attributes(attributes), root))
+        except (ValueError, TypeError, AttributeError) as error:
+            yield "line {}".format(number), ValueError(
+                "Invalid snapshot entry: {}".format(error))
+            continue
+        if path.isabs(entry) or not (folder == root
+                                     or folder.startswith(prefix)):
+            yield entry, ValueError(
+                "The folder is outside of the snapshot root")
+            continue
+        yield folder, state
+
+
+def import_snapshot(stream, root=None, concurrency=None, operation=None):
+    """Apply a snapshot, entries are read lazily while applying.
+
+    Args:
+        stream (file): the snapshot text stream.
+        root (str): the tree to apply to, the exported root if None.
+        concurrency (int): see BatchApply.
+        operation (journal.Operation): journals the changes.
+
+    Returns:
+        BatchApply: the batch to start.
+    """
+    header = read_header(stream)
+    root = path.abspath(root or header["root"])
+    return BatchApply(iter_states(stream, root), concurrency=concurrency,
+                      operation=operation)
@@ -0,0 +1,268 @@
+"""
+Change your nautilus directories icons easily
+
+Author : Bilal Elmoussaoui (bil.elmoussaoui@gmail.com)
+Website : https://github.com/bilelmoussaoui/nautilus-folder-icons
+Licence : GPL-3.0
+nautilus-folder-icons is free software: you can redistribute it and/or
+modify it under the terms of the GNU General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+nautilus-folder-icons is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+You should have received a copy of the GNU General Public License
+along with nautilus-folder-icons. If not, see <http://www.gnu.org/licenses/>.
+"""
+import atexit
+import os
+from functools import wraps
+from os import path
+from threading import Lock, get_ident
+from time import perf_counter
+
+# Opt-in: the trace file path, or 1 for the cache directory.
+# The aggregated histograms are written next to it.
+TRACE_ENV = "FOLDER_ICONS_TRACE"
+ENABLED = bool(os.environ.get(TRACE_ENV))
+
+# The metadata calls, each one is a GVfs round trip
+GVFS = "gvfs"
+DEFAULT_CATEGORY = "folder-icons"
+
+
+def get_trace_paths(value=None):
+    """Returns the Chrome trace & the histograms files paths.
+
+    Args:
+        value (str): the FOLDER_ICONS_TRACE value.
+    """
+    value = value or os.environ.get(TRACE_ENV, "1")
+    if value == "1":
+        cache_dir = os.environ.get("XDG_CACHE_HOME")
+        if not cache_dir:
+            cache_dir = path.join(path.expanduser("~"), ".cache")
+        value = path.join(cache_dir, "nautilus-folder-icons",
+                          "trace-{}.json".format(os.getpid()))
+    root, _ = path.splitext(value)
+    return value, root + ".histograms.json"
+
+
+class Histogram(object):
+    """Durations distribution, in power of two microseconds buckets."""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+        self.buckets = {}
+
+    def add(self, duration):
+        """Add a duration, in seconds."""
+        self.count += 1
+        self.total += duration
+        self.min = duration if self.min is None else min(self.min, duration)
+        self.max = duration if self.max is None else max(self.max, duration)
+        bucket = 1 << int(duration * 1e6).bit_length()
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+
+    def get_percentile(self, percentile):
+        """The upper bound of the bucket of the percentile, in seconds."""
+        rank = percentile * self.count
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= rank:
+                return bucket / 1e6
+        return self.max
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "total": self.total,
+            "mean": self.total / self.count if self.count else 0.0,
+            "min": self.min,
+            "max": self.max,
+            "p50": self.get_percentile(0.5),
+            "p90": self.get_percentile(0.9),
+            "p99": self.get_percentile(0.99),
+            # upper bound in microseconds -> count
+            "buckets": dict((str(bucket), count) for bucket, count
+                            in sorted(self.buckets.items())),
+        }
+
+
+class Tracer(object):
+    """Collect the spans & counters of the process.
+
+    The histograms cover all the spans, the trace events are only kept
+    up to MAX_EVENTS so a long session doesn't grow unbounded.
+    """
+    MAX_EVENTS = 200000
+
+    def __init__(self, max_events=None):
+        self._lock = Lock()
+        self._max_events = max_events or Tracer.MAX_EVENTS
+        self._origin = perf_counter()
+        self._pid = os.getpid()
+        self.events = []
+        self.dropped = 0
+        self.histograms = {}
+        self.counters = {}
+
+    def add_span(self, name, category, start, end, args=None):
+        """Record a finished span, the times are perf_counter values."""
+        event = {
+            "name": name,
+            "cat": category,
+            "ph": "X",
+            "ts": (start - self._origin) * 1e6,
+            "dur": (end - start) * 1e6,
+            "pid": self._pid,
+            "tid": get_ident(),
+        }
+        if args:
+            event["args"] = args
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.add(end - start)
+            if category == GVFS:
+                self._count("gvfs_round_trips", 1)
+            if len(self.events) < self._max_events:
+                self.events.append(event)
+            else:
+                self.dropped += 1
+
+    def count(self, name, value=1):
+        """Increment a counter."""
+        with self._lock:
+            self._count(name, value)
+
+    def _count(self, name, value):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def get_stats(self):
+        """Returns the histograms per span name & the counters."""
+        with self._lock:
+            return {
+                "spans": dict((name, histogram.to_dict())
+                              for name, histogram in self.histograms.items()),
+                "counters": dict(self.counters),
+                "dropped_events": self.dropped,
+            }
+
+    def get_trace(self):
+        """Returns the Chrome trace format document."""
+        with self._lock:
+            events = list(self.events)
+            end = (perf_counter() - self._origin) * 1e6
+            # The counters final values
+            events.extend({"name": name, "ph": "C", "ts": end,
+                           "pid": self._pid, "tid": 0,
+                           "args": {name: value}}
+                          for name, value in self.counters.items())
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def export(self, trace_file, histograms_file):
+        """Write the Chrome trace & the histograms JSON files."""
+        import json
+        directory = path.dirname(trace_file)
+        if directory and not path.exists(directory):
+            os.makedirs(directory)
+        with open(trace_file, "w") as trace:
+            json.dump(self.get_trace(), trace)
+        with open(histograms_file, "w") as histograms:
+            json.dump(self.get_stats(), histograms, indent=2, sort_keys=True)
+
+
+TRACER = Tracer()
+
+
+class Span(object):
+    """A timed section, as a context manager or finished explicitly.
+
+    The explicit finish is used by the async operations, the span
+    is started with the request & finished in the callback.
+    """
+    __slots__ = ("name", "category", "args", "_start")
+
+    def __init__(self, name, category=DEFAULT_CATEGORY, args=None):
+        self.name = name
+        self.category = category
+        self.args = args
+        self._start = perf_counter()
+
+    def finish(self):
+        TRACER.add_span(self.name, self.category, self._start,
+                        perf_counter(), self.args)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.finish()
+
+
+class NullSpan(object):
+    """The span used when tracing is off, does nothing."""
+    __slots__ = ()
+
+    def finish(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+
+NULL_SPAN = NullSpan()
+
+
+def span(name, category=DEFAULT_CATEGORY, args=None):
+    """Start a span, see Span. Returns a shared no-op span if disabled."""
+    if not ENABLED:
+        return NULL_SPAN
+    return Span(name, category, args)
+
+
+def count(name, value=1):
+    """Increment a counter, if enabled."""
+    if ENABLED:
+        TRACER.count(name, value)
+
+
+def traced(name=None, category=DEFAULT_CATEGORY):
+    """Decorator, time each call of the function.
+
+    The function is returned as it is if tracing is disabled,
+    so the calls cost nothing more.
+    """
+    def decorator(func):
+        if not ENABLED:
+            return func
+        span_name = name or func.__name__
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with Span(span_name, category):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def export():
+    """Write the trace files, see get_trace_paths."""
+    try:
+        TRACER.export(*get_trace_paths())
+    except (IOError, OSError) as error:
+        print("Failed to write the folder icons trace: {}".format(error))
+
+
+if ENABLED:
+    atexit.register(export)
@@ -15,20 +15,169 @@ GNU General Public License for more details.
 You should have received a copy of the GNU General Public License
 along with nautilus-folder-icons. If not, see <http://www.gnu.org/licenses/>.
 """
+import os
+from collections import OrderedDict
 from os import path
-try:
-    from urllib2 import unquote
-    from urlparse import urlparse
-except ImportError:
-    from urllib.parse import unquote, urlparse
+from threading import Event, Lock, Thread, current_thread, main_thread
+from weakref import WeakKeyDictionary
 
 from gi import require_version
 require_version("Gtk", "3.0")
 require_version("Gdk", "3.0")
 from gi.repository import Gdk, GdkPixbuf, Gio, GLib, Gtk
 
+from cache import (CacheEntry, get_cache_path, read_cache, theme_aliases,
+                   theme_fingerprint, write_cache)
+from journal import Journal
+from library import SUPPORTED_EXTS, IconLibrary, get_library_label
+# The Gio only helpers, re-exported here
+from metadata import (BatchApply, estimate_apply, get_attribute_value,
+                      get_default_icon, is_path, iter_subtrees,
+                      restore_default_icon, set_default_icon, uriparse,
+                      walk_folders)
+from search import IconSearch
+from tracing import traced
+from windows import get_window_folder
+
+
+class PixbufCache(object):
+    """Bounded LRU cache of rendered icons.
+
+    The pixbufs are keyed by the icon name (or the file path & it's mtime),
+    the size & the scale factor. The theme icons are invalidated when the
+    icon theme changes.
+    """
+    MAX_SIZE = 64
 
-SUPPORTED_EXTS = [".svg", ".png"]
+    def __init__(self, theme=None, max_size=None):
+        self._theme = theme or Gtk.IconTheme.get_default()
+        self._max_size = max_size or PixbufCache.MAX_SIZE
+        if theme is None:
+            self._names = IconNames.get_default()
+        else:
+            self._names = IconNames(theme)
+        self._pixbufs = OrderedDict()
+        # The keys being loaded in the background
+        self._loading = set()
+        self.hits = 0
+        self.misses = 0
+        self._theme.connect("changed", self._on_theme_changed)
+
+    _default = None
+
+    @staticmethod
+    def get_default():
+        if PixbufCache._default is None:
+            PixbufCache._default = PixbufCache()
+        return PixbufCache._default
+
+    def _get_key(self, icon_name, size, scale):
+        """Returns the cache key & the icon's file path if it's a file."""
+        if "://" in icon_name:
+            icon_name = uriparse(icon_name)
+        if is_path(icon_name):
+            # Be sure that the icon still exists on the system
+            try:
+                mtime = os.stat(icon_name).st_mtime
+            except OSError:
+                return ("image-missing", None, size, scale), None
+            if get_ext(icon_name) in SUPPORTED_EXTS:
+                return (icon_name, mtime, size, scale), icon_name
+            return ("image-missing", None, size, scale), None
+        if icon_name not in self._names:
+            icon_name = "image-missing"
+        return (icon_name, None, size, scale), None
+
+    def _store(self, key, pixbuf):
+        self._pixbufs[key] = pixbuf
+        self._pixbufs.move_to_end(key)
+        while len(self._pixbufs) > self._max_size:
+            self._pixbufs.popitem(last=False)
+
+    def get(self, icon_name, size, scale=1):
+        """Returns the pixbuf of an icon, rendered at size * scale.
+
+        Args:
+            icon_name (str): the icon name or path.
+            size (int): the icon size in pixels.
+            scale (int): the scale factor.
+        """
+        key, filename = self._get_key(icon_name, size, scale)
+        pixbuf = self._pixbufs.get(key)
+        if pixbuf is not None:
+            self.hits += 1
+            self._pixbufs.move_to_end(key)
+            return pixbuf
+        self.misses += 1
+        if filename:
+            pixbuf = GdkPixbuf.Pixbuf.new_from_file_at_scale(
+                filename, size * scale, size * scale, True)
+        else:
+            pixbuf = self._theme.load_icon_for_scale(key[0], size, scale, 0)
+        self._store(key, pixbuf)
+        return pixbuf
+
+    def prefetch(self, icon_names, size, scale=1):
+        """Render the missing icons in the background.
+
+        The icons are decoded by Gtk/GdkPixbuf's worker threads.
+        """
+        for icon_name in icon_names:
+            key, filename = self._get_key(icon_name, size, scale)
+            if key in self._pixbufs or key in self._loading:
+                continue
+            self._loading.add(key)
+            if filename:
+                gfile = Gio.File.new_for_path(filename)
+                gfile.read_async(GLib.PRIORITY_LOW, None,
+                                 self._on_file_read, key)
+            else:
+                icon_info = self._theme.lookup_icon_for_scale(
+                    key[0], size, scale, 0)
+                if icon_info is None:
+                    self._loading.discard(key)
+                    continue
+                icon_info.load_icon_async(None, self._on_icon_loaded, key)
+
+    def _on_file_read(self, gfile, result, key):
+        try:
+            stream = gfile.read_finish(result)
+            size = key[2] * key[3]
+            GdkPixbuf.Pixbuf.new_from_stream_at_scale_async(
+                stream, size, size, True, None, self._on_stream_loaded, key)
+        except GLib.Error:
+            self._loading.discard(key)
+
+    def _on_stream_loaded(self, stream, result, key):
+        self._loading.discard(key)
+        try:
+            pixbuf = GdkPixbuf.Pixbuf.new_from_stream_finish(result)
+        except GLib.Error:
+            return
+        if key not in self._pixbufs:
+            self._store(key, pixbuf)
+
+    def _on_icon_loaded(self, icon_info, result, key):
+        self._loading.discard(key)
+        try:
+            pixbuf = icon_info.load_icon_finish(result)
+        except GLib.Error:
+            return
+        if key not in self._pixbufs:
+            self._store(key, pixbuf)
+
+    def get_stats(self):
+        """Returns the cache's size & hit rate."""
+        total = self.hits + self.misses
+        return {
+            "size": len(self._pixbufs),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": float(self.hits) / total if total else 0.0,
+        }
+
+    def _on_theme_changed(self, *args):
+        self._pixbufs.clear()
 
 
 class Image(Gtk.Image):
@@ -38,149 +187,532 @@ class Image(Gtk.Image):
         Gtk.Image.__init__(self)
         self.props.icon_size = Image.SIZE
 
+    @traced("Image.set_icon")
     def set_icon(self, icon_name):
-        icon_name = uriparse(icon_name)
-        theme = Gtk.IconTheme.get_default()
-        # Make sure the icon name doesn't contain any special char
-        # Be sure that the icon still exists on the system
-        if (is_path(icon_name) and path.exists(icon_name)
-                and get_ext(icon_name) in SUPPORTED_EXTS):
-            pixbuf = GdkPixbuf.Pixbuf.new_from_file_at_scale(icon_name,
-                                                             Image.SIZE, Image.SIZE,
-                                                             True)
-        elif theme.has_icon(icon_name):
-            pixbuf = theme.load_icon_for_scale(icon_name, Image.SIZE, 1, 0)
+        # Render the icon at the real scale factor, HiDPI screens
+        # would get a blurry upscaled preview otherwise
+        scale = self.get_scale_factor()
+        pixbuf = PixbufCache.get_default().get(icon_name, Image.SIZE, scale)
+        if scale > 1:
+            surface = Gdk.cairo_surface_create_from_pixbuf(pixbuf, scale,
+                                                           None)
+            self.set_from_surface(surface)
         else:
-            pixbuf = theme.load_icon_for_scale("image-missing",
-                                               Image.SIZE, 1, 0)
-        self.set_from_pixbuf(pixbuf)
-
-
-def get_attribute_value(ginfo, attribute):
-    if ginfo.has_attribute(attribute):
-        attribute_type = ginfo.get_attribute_type(attribute)
-        if attribute_type == Gio.FileAttributeType.STRING:
-            value = ginfo.get_attribute_string(attribute)
-            if value is not None:
-                return uriparse(value)
-        elif attribute_type == Gio.FileAttributeType.OBJECT:
-            # This return a Gio.ThemedIcon object
-            value = ginfo.get_attribute_object(attribute)
-            icon_names = value.props.names
-            if icon_names:
-                return icon_names[0]
-    return None
+            self.set_from_pixbuf(pixbuf)
 
+    def prefetch(self, icon_names):
+        """Render the icons that might be previewed next."""
+        PixbufCache.get_default().prefetch(icon_names, Image.SIZE,
+                                           self.get_scale_factor())
 
-def get_default_icon(directory):
-    """Use Gio to get the default icon."""
-    attributes = ["metadata::custom-icon",
-                  "metadata::custom-icon-name",
-                  "standard::icon"]
 
-    gfile = Gio.File.new_for_path(directory)
-    ginfo = gfile.query_info("standard::icon,metadata::*",
-                             Gio.FileQueryInfoFlags.NOFOLLOW_SYMLINKS)
+def get_icon_theme():
+    """Returns the default icon theme.
 
-    for attribute in attributes:
-        icon_name = get_attribute_value(ginfo, attribute)
-        if icon_name:
-            return icon_name
-    return "inode-directory"
+    Without a display, e.g. the command line on a headless host, there's
+    no default theme: the theme set in the desktop settings is loaded.
+    """
+    theme = Gtk.IconTheme.get_default()
+    if theme is None:
+        theme = Gtk.IconTheme.new()
+        schema = "org.gnome.desktop.interface"
+        source = Gio.SettingsSchemaSource.get_default()
+        if source and source.lookup(schema, True):
+            theme.set_custom_theme(
+                Gio.Settings.new(schema).get_string("icon-theme"))
+    return theme
 
 
-def restore_default_icon(folder):
-    """Restore default icon of a folder.
+class IconNames(object):
+    """Set of all the icon names of a theme & the themes it inherits.
 
-    Args:
-        folder (str): the folder's path.
+    The set is built the first time it's used & only rebuilt once
+    the icon theme emits the "changed" signal.
+    """
+    _default = None
+
+    def __init__(self, theme=None):
+        self._theme = theme or get_icon_theme()
+        self._names = None
+        self._lock = Lock()
+        self.builds = 0
+        self._theme.connect("changed", self._on_theme_changed)
+
+    @staticmethod
+    def get_default():
+        """Returns the icon names of the default icon theme."""
+        if IconNames._default is None:
+            IconNames._default = IconNames()
+        return IconNames._default
+
+    def _get_names(self):
+        with self._lock:
+            if self._names is None:
+                self._names = frozenset(self._theme.list_icons(None))
+                self.builds += 1
+            return self._names
+
+    def __contains__(self, icon_name):
+        return icon_name in self._get_names()
+
+    def __len__(self):
+        return len(self._get_names())
+
+    def get_symbolic(self, icon_name):
+        """Returns the icon's symbolic variant name, None if missing."""
+        symbolic_icon = "{}-symbolic".format(icon_name)
+        if symbolic_icon in self._get_names():
+            return symbolic_icon
+        return None
+
+    def _on_theme_changed(self, *args):
+        with self._lock:
+            self._names = None
+
+
+class IconEntry(object):
+    """A themed icon & it's rendered pixbuf."""
+    __slots__ = ("name", "pixbuf")
+
+    def __init__(self, name, pixbuf):
+        self.name = name
+        self.pixbuf = pixbuf
+
+
+class IconCatalog(object):
+    """Session wide catalog of the theme's Places icons & the user icons.
+
+    The catalog is built once, the first time it's iterated, and shared
+    by all the icon choosers. It's only rebuilt once the icon theme
+    emits the "changed" signal, or the user icons once refresh_library
+    finds new or modified ones.
+    """
+    _default = None
+
+    def __init__(self, theme=None, size=64):
+        self._theme = theme or Gtk.IconTheme.get_default()
+        self._size = size
+        self._entries = []
+        # The theme's icons, kept when only the user icons changed
+        self._places = None
+        # The ThemeSnapshot the theme's icons were loaded from
+        self._snapshot = None
+        # The (path, mtime) of the user icons in the catalog
+        self._library_scan = None
+        self._search = None
+        self._complete = False
+        self._generation = 0
+        # Only incremented on theme changes, outdates the snapshots
+        self._theme_generation = 0
+        self._lock = Lock()
+        self._build_lock = Lock()
+        self.hits = 0
+        self.misses = 0
+        self._theme.connect("changed", self._on_theme_changed)
+
+    @staticmethod
+    def get_default():
+        """Returns the catalog of the default icon theme."""
+        if IconCatalog._default is None:
+            IconCatalog._default = IconCatalog()
+        return IconCatalog._default
+
+    @property
+    def is_complete(self):
+        return self._complete
+
+    @property
+    def generation(self):
+        """Incremented each time the catalog is invalidated."""
+        return self._generation
+
+    def get_snapshot(self):
+        """Returns a ThemeSnapshot to build the catalog with.
+
+        Must be called from the main loop.
+        """
+        snapshot = ThemeSnapshot(self._theme, self._size)
+        snapshot.generation = self._theme_generation
+        return snapshot
+
+    def iter_entries(self, snapshot=None):
+        """Yields the catalog's IconEntry, builds the catalog if needed.
+
+        Args:
+            snapshot (ThemeSnapshot): the icon theme's files, taken
+                on the main loop if needed & missing.
+        """
+        with self._build_lock:
+            with self._lock:
+                complete = self._complete
+                entries = self._entries
+                generation = self._generation
+                if complete:
+                    self.hits += 1
+                else:
+                    self.misses += 1
+            if complete:
+                for entry in entries:
+                    yield entry
+                return
+
+            with self._lock:
+                places = self._places
+                places_snapshot = self._snapshot
+                theme_generation = self._theme_generation
+            if places is None:
+                if (snapshot is None
+                        or snapshot.generation != theme_generation):
+                    snapshot = ThemeSnapshot.take(self._theme, self._size)
+                places_snapshot = snapshot
+                places = []
+                for name, pixbuf in iter_places_icons(snapshot):
+                    entry = IconEntry(name, pixbuf)
+                    places.append(entry)
+                    yield entry
+            else:
+                for entry in places:
+                    yield entry
+            entries = list(places)
+            # The user icons, named by their path
+            library = IconLibrary(size=self._size)
+            for name, pixbuf in iter_library_icons(library=library):
+                entry = IconEntry(name, pixbuf)
+                entries.append(entry)
+                yield entry
+            with self._lock:
+                # The theme might have changed while loading the icons
+                if generation == self._generation:
+                    self._places = places
+                    self._snapshot = places_snapshot
+                    self._library_scan = library.scanned
+                    self._entries = entries
+                    self._complete = True
+
+    def refresh_library(self):
+        """Rescan the user icon directories, called when a chooser opens.
+
+        Only the directories are read, the user icons are reloaded
+        the next time the catalog is iterated if they changed.
+        The directories may be slow to read, it's called from a thread.
+
+        Returns:
+            bool: whether the user icons changed.
+        """
+        scanned = IconLibrary(size=self._size).scan()
+        with self._lock:
+            if not self._complete or scanned == self._library_scan:
+                return False
+            self._entries = []
+            self._search = None
+            self._complete = False
+            self._generation += 1
+        return True
+
+    def get_search(self):
+        """Returns the IconSearch of a complete catalog, None otherwise.
+
+        The search index is built once per catalog, including
+        the theme's icons aliases & the user icons file names.
+        """
+        with self._lock:
+            if not self._complete:
+                return None
+            if self._search is None:
+                names = [entry.name for entry in self._entries]
+                aliases = theme_aliases(self._snapshot.name,
+                                        self._snapshot.search_path)
+                labels = dict((name, get_library_label(name))
+                              for name in names if is_path(name))
+                self._search = IconSearch(names, aliases, labels)
+            return self._search
+
+    def memory_usage(self):
+        """Returns the size in bytes of the catalog's pixels."""
+        with self._lock:
+            entries = self._entries
+        return sum(entry.pixbuf.get_byte_length() for entry in entries)
+
+    def get_stats(self):
+        """Returns the catalog's size, memory & hit/miss statistics."""
+        return {
+            "entries": len(self._entries),
+            "memory": self.memory_usage(),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+    def _on_theme_changed(self, *args):
+        """Invalidate the catalog on icon theme changes."""
+        with self._lock:
+            self._entries = []
+            self._places = None
+            self._snapshot = None
+            self._theme_generation += 1
+            self._search = None
+            self._complete = False
+            self._generation += 1
+
+
+def reload_window(window):
+    """Refresh Nautilus's view (doesn't work on Nemo...)."""
+    if window.has_action("reload"):
+        action = window.lookup_action("reload")
+        action.emit("activate", None)
+
+
+def touch_folder(folder):
+    """Make the file manager reload a single folder's information.
+
+    The folder's times are set to their current values, the inode change
+    is reported by the file manager's directory monitor. It's a change
+    of the folder all the same: it's ctime is updated & every watcher
+    gets an IN_ATTRIB event, backup & sync tools included. Only the
+    parent's monitor of a shown folder makes the file manager reload it.
+
+    Returns:
+        bool: whether the folder could be touched.
+    """
+    try:
+        stat = os.stat(folder, follow_symlinks=False)
+        os.utime(folder, ns=(stat.st_atime_ns, stat.st_mtime_ns),
+                 follow_symlinks=False)
+    except (OSError, NotImplementedError):
+        return False
+    return True
+
+
+class RefreshScheduler(object):
+    """Coalesces the view refreshes of a file manager window.
+
+    The changed folders are collected for a short delay. Each one is
+    then invalidated on it's own, or the whole view is reloaded once if
+    there are too many of them, one isn't shown in the window's location
+    or can't be invalidated.
     """
-    gfile = Gio.File.new_for_path(folder)
-    ginfo = gfile.query_info("standard::icon",
-                            Gio.FileQueryInfoFlags.NOFOLLOW_SYMLINKS)
-    default_icon = get_attribute_value(ginfo, "standard::icon")
-    set_default_icon(folder, default_icon)
+    # Time (in milliseconds) the changes are collected for
+    DELAY = 150
+    # Maximum number of folders invalidated one by one
+    MAX_TARGETED = 256
+
+    def __init__(self, window, delay=None, max_targeted=None,
+                 invalidate=None, location=None):
+        """
+        Args:
+            window (Gtk.Window): the file manager window.
+            delay (int): see DELAY.
+            max_targeted (int): see MAX_TARGETED.
+            invalidate (callable): invalidates a folder, returns whether
+                it succeeded. Defaults to touch_folder.
+            location (callable): returns the path shown by the window,
+                None if unknown. Defaults to get_window_folder.
+        """
+        self._window = window
+        self._location = location or get_window_folder
+        self._delay = delay or RefreshScheduler.DELAY
+        self._max_targeted = max_targeted or RefreshScheduler.MAX_TARGETED
+        self._invalidate = invalidate or touch_folder
+        self._folders = set()
+        self._reload = False
+        self._source_id = None
+        self.reloads = 0
+        self.invalidations = 0
+
+    def changed(self, folders=None):
+        """Schedule the refresh of folders, of the whole view if None."""
+        if folders is None:
+            self._reload = True
+        elif not self._reload:
+            self._folders.update(folders)
+            if len(self._folders) > self._max_targeted:
+                self._reload = True
+        if self._reload:
+            self._folders.clear()
+        if self._source_id is None:
+            self._source_id = GLib.timeout_add(self._delay, self._on_timeout)
+
+    def _on_timeout(self):
+        self._source_id = None
+        self.flush()
+        return False
+
+    def flush(self):
+        """Refresh the view now."""
+        if self._source_id is not None:
+            GLib.source_remove(self._source_id)
+            self._source_id = None
+        folders, self._folders = self._folders, set()
+        reload = self._reload
+        self._reload = False
+        # Only the shown folders are invalidated one by one
+        location = self._location(self._window) if folders else None
+        for folder in folders:
+            if (location is None or path.dirname(folder) != location
+                    or not self._invalidate(folder)):
+                reload = True
+                break
+            self.invalidations += 1
+        if reload:
+            self.reloads += 1
+            reload_window(self._window)
+
+
+# The refresh scheduler of each file manager window
+_SCHEDULERS = WeakKeyDictionary()
+
+
+def get_refresh_scheduler(window):
+    """Returns the RefreshScheduler of a window."""
+    scheduler = _SCHEDULERS.get(window)
+    if scheduler is None:
+        scheduler = RefreshScheduler(window)
+        _SCHEDULERS[window] = scheduler
+    return scheduler
+
+
+# Keep a reference to the running batches until they're finished
+_BATCHES = set()
+
+
+def apply_icon(folders, icon, window, concurrency=None):
+    """Set (or restore if icon is None) the icon of folders asynchronously.
 
-def set_default_icon(folder, icon):
-    """Use Gio to set the default folder icon.
+    The changed folders are refreshed in the window's view once all the
+    folders are done.
+
+    Returns:
+        BatchApply: the running batch.
+    """
+    def on_finished(batch, report):
+        _BATCHES.discard(batch)
+        if batch.written:
+            get_refresh_scheduler(window).changed(batch.written)
+
+    # The changes are journaled, so they can be undone
+    operation = Journal.get_default().begin(
+        "restore" if icon is None else "set {}".format(icon))
+    batch = BatchApply(folders, icon, concurrency, operation=operation)
+    batch.connect("finished", on_finished)
+    _BATCHES.add(batch)
+    batch.start()
+    return batch
+
+
+def undo_icon(window, concurrency=None):
+    """Revert the last journaled change asynchronously.
+
+    Returns:
+        BatchApply: the running batch, None if there's nothing to undo.
+    """
+    def on_finished(batch, report):
+        _BATCHES.discard(batch)
+        if batch.written:
+            get_refresh_scheduler(window).changed(batch.written)
+
+    batch = Journal.get_default().undo(concurrency)
+    if batch is None:
+        return None
+    batch.connect("finished", on_finished)
+    _BATCHES.add(batch)
+    batch.start()
+    return batch
+
+
+# The prewarm modes: only build the icons catalog, or a hidden chooser too
+PREWARM_CATALOG = "catalog"
+PREWARM_WINDOW = "window"
+# The hidden, ready to be shown, chooser
+_PREWARMED = {}
+
+
+def prewarm(mode=PREWARM_CATALOG):
+    """Prepare the icon chooser during the main loop idle time.
 
     Args:
-        folder (str): the folder's path.
-        icon   (str): the icon name to be set.
-    """
-    gfile = Gio.File.new_for_path(folder)
-    # Property to set by default
-    prop = "metadata::custom-icon-name"
-    # Property to unsert by default
-    # Otherwise Nautilus won't be able
-    # to handle both icons at the same time
-    unset_prop = "metadata::custom-icon"
-
-    ginfo = gfile.query_info("metadata::*",
-                             Gio.FileQueryInfoFlags.NOFOLLOW_SYMLINKS)
-    # In case the icon is a path & not an icon name
-    set_symbolic = False
-    if is_path(icon):
-        prop, unset_prop = unset_prop, prop
-        icon = "file://{}".format(icon)
-    else:  # Makes sure we have a fallback icon.
-        symbolic_icon = "{}-symbolic".format(icon)
-        if symbolic_icon and has_icon(symbolic_icon):
-            set_symbolic = True
-
-    # Set the new icon name
-    ginfo.set_attribute_string(prop, icon)
-    ginfo.set_attribute_status(prop, Gio.FileAttributeStatus.SET)
-
-    # Set the symbolic icon if exists.
-    if set_symbolic and symbolic_icon:
-        ginfo.set_attribute_string('metadata::symbolic-icon', symbolic_icon)
-        ginfo.set_attribute_status(
-            'metadata::symbolic-icon', Gio.FileAttributeStatus.SET)
-    elif ginfo.has_attribute('metadata::symbolic-icon'):
-        # Unset the attribute otherwise
-        ginfo.set_attribute("metadata::symbolic-icon",
-                            Gio.FileAttributeType.INVALID, 0)
-
-    # Unset the other attribute
-    if ginfo.has_attribute(unset_prop):
-        ginfo.set_attribute(unset_prop,
-                            Gio.FileAttributeType.INVALID, 0)
-    # Set the attributes to the file
-    gfile.set_attributes_from_info(ginfo,
-                                   Gio.FileQueryInfoFlags.NOFOLLOW_SYMLINKS)
-
-
-def change_folder_icon(folders, window):
-    """Change default folder icon."""
+        mode (str): PREWARM_CATALOG to load the icons catalog & the search
+            index, PREWARM_WINDOW to build a hidden chooser as well.
+    """
+    def build_catalog(catalog, snapshot):
+        for _ in catalog.iter_entries(snapshot):
+            pass
+        catalog.get_search()
+
+    def on_idle():
+        if mode == PREWARM_WINDOW:
+            from widgets import FolderIconChooser
+            if "chooser" not in _PREWARMED:
+                chooser = FolderIconChooser([GLib.get_home_dir()],
+                                            reusable=True)
+                # Create the window resources without showing it
+                chooser.realize()
+                _PREWARMED["chooser"] = chooser
+        else:
+            catalog = IconCatalog.get_default()
+            # Only the files decoding runs in the thread
+            Thread(target=build_catalog,
+                   args=(catalog, catalog.get_snapshot()),
+                   daemon=True).start()
+        return False
+    GLib.idle_add(on_idle, priority=GLib.PRIORITY_LOW)
+
+
+def get_chooser(folders):
+    """Returns the prewarmed chooser retargeted to the folders if possible.
+
+    A new chooser is created otherwise, it replaces the outdated prewarmed
+    one. While the prewarmed chooser is shown, the others are destroyed
+    on close.
+    """
     from widgets import FolderIconChooser
+    chooser = _PREWARMED.get("chooser")
+    if chooser and chooser.can_retarget:
+        chooser.retarget(folders)
+        # The user might have added icons since the catalog was loaded,
+        # outdates the chooser for the next time if so
+        Thread(target=IconCatalog.get_default().refresh_library,
+               daemon=True).start()
+        return chooser
+    if chooser is None or chooser.get_visible():
+        return FolderIconChooser(folders)
+    # Outdated, the icons have changed since
+    chooser.destroy()
+    chooser = FolderIconChooser(folders, reusable=True)
+    _PREWARMED["chooser"] = chooser
+    return chooser
+
+
+def change_folder_icon(folders, window, recursive=False, max_depth=None,
+                       include=None, exclude=None):
+    """Change default folder icon.
+
+    Args:
+        folders (list): the folders paths.
+        window (Gtk.Window): the file manager window.
+        recursive (bool): whether to apply the icon to the subfolders.
+        max_depth, include, exclude: see walk_folders.
+    """
+    handlers = []
 
     def set_icon(icon_window, icon_name):
         """Set the folder icon & refresh Nautilus's view."""
-        for folder in folders:
-            set_default_icon(folder, icon_name)
-        # Refresh Nautilus (doesn't work on Nemo...)
-        if window.has_action("reload"):
-            action = window.lookup_action("reload")
-            action.emit("activate", None)
+        if recursive:
+            targets = iter_subtrees(folders, max_depth, include, exclude)
+        else:
+            targets = folders
+        apply_icon(targets, icon_name, window)
         icon_window.emit("delete-event", Gdk.Event.new(Gdk.EventType.DELETE))
+
+    def on_hide(icon_window):
+        """A reused chooser must not apply the icon to these folders."""
+        for handler in handlers:
+            icon_window.disconnect(handler)
     # Show Icon Chooser window
-    icon_window = FolderIconChooser(folders)
+    icon_window = get_chooser(folders)
     icon_window.set_transient_for(window)
-    icon_window.connect("selected", set_icon)
+    handlers.append(icon_window.connect("selected", set_icon))
+    handlers.append(icon_window.connect("hide", on_hide))
     icon_window.show_all()
-
-
-def uriparse(uri):
-    """Uri parser & return the path."""
-    if not isinstance(uri, str):
-        uri = uri.get_uri()
-    return unquote(urlparse(uri).path)
-
-
-def is_path(icon):
-    """Returns whether an icon is an absolute path or an icon name."""
-    return len(icon.split("/")) > 1
+    icon_window.present()
 
 
 def get_ext(filepath):
@@ -198,23 +730,275 @@ def has_icon(icon_name):
     Args:
         icon_name (str): the icon name to be checked.
     """
-    theme = Gtk.IconTheme.get_default()
-    if theme:
-        theme.has_icon(icon_name)
+    return icon_name in IconNames.get_default()
+
+
+# The GdkPixbuf loader type of each file extension
+_LOADER_TYPES = {}
+
+
+def get_loader_type(filename):
+    """Returns the name of the GdkPixbuf loader of a file.
+
+    The loader is looked up once per file extension.
+    """
+    ext = get_ext(filename)
+    if ext not in _LOADER_TYPES:
+        pixbuf_format = GdkPixbuf.Pixbuf.get_file_info(filename)[0]
+        if pixbuf_format:
+            _LOADER_TYPES[ext] = pixbuf_format.get_name()
+        else:
+            _LOADER_TYPES[ext] = None
+    return _LOADER_TYPES[ext]
+
+
+def fit_size(width, height, size):
+    """Returns the (width, height) fitting in a square, ratio kept."""
+    ratio = float(size) / max(width, height, 1)
+    return (max(int(round(width * ratio)), 1),
+            max(int(round(height * ratio)), 1))
+
+
+def decode_at_size(data, loader_type, size):
+    """Decode an image, the loader rasterizes it directly at the size.
+
+    Args:
+        data (bytes): the image content.
+        loader_type (str): the GdkPixbuf loader name.
+        size (int): the maximum width & height in pixels.
+    """
+    def on_size_prepared(loader, width, height):
+        loader.set_size(*fit_size(width, height, size))
+
+    loader = GdkPixbuf.PixbufLoader.new_with_type(loader_type)
+    loader.connect("size-prepared", on_size_prepared)
+    try:
+        loader.write(data)
+    finally:
+        loader.close()
+    return loader.get_pixbuf()
+
+
+def lookup_icon_file(theme, icon_name, size, scale=1):
+    """Returns the file of a folder icon, None if the icon is skipped.
+
+    Must be called from the main loop, like all the Gtk.IconTheme calls.
+    """
+    icon_info = theme.lookup_icon_for_scale(icon_name, size, scale,
+                                            Gtk.IconLookupFlags.FORCE_SIZE)
+    if not icon_info or icon_info.is_symbolic():
+        return None
+    icon_path = icon_info.get_filename()
+    if (not icon_path or path.islink(icon_path)
+            or not icon_name.startswith("folder")):
+        return None
+    return icon_path
+
+
+def render_icon_file(icon_path, sizes, scale=1):
+    """Render an icon file at several sizes from a single file read.
+
+    Vector icons are rasterized at each size, bitmaps are decoded once
+    at the largest size then downscaled for the smaller ones. The aspect
+    ratio is kept, the size is the largest dimension.
+    It doesn't use the icon theme, so it can run in any thread.
+
+    Raises:
+        GLib.Error, IOError: if the file can't be decoded.
+
+    Returns:
+        dict: the pixbuf of each size.
+    """
+    sizes = sorted(set(sizes), reverse=True)
+    loader_type = get_loader_type(icon_path)
+    if not loader_type:
+        raise IOError("Unsupported image format")
+    with open(icon_path, 'rb') as icon_file:
+        data = icon_file.read()
+    pixbufs = {}
+    if loader_type == "svg":
+        for size in sizes:
+            pixbufs[size] = decode_at_size(data, loader_type, size * scale)
     else:
-        return False
+        largest = decode_at_size(data, loader_type, sizes[0] * scale)
+        for size in sizes:
+            if size == sizes[0]:
+                pixbufs[size] = largest
+            else:
+                width, height = fit_size(largest.get_width(),
+                                         largest.get_height(), size * scale)
+                pixbufs[size] = largest.scale_simple(
+                    width, height, GdkPixbuf.InterpType.HYPER)
+    return pixbufs
 
-def load_pixbuf(theme, icon_name):
-    pixbuf = None
+
+def render_icon(theme, icon_name, sizes, scale=1):
+    """Render a theme's folder icon at several sizes.
+
+    Args:
+        theme (Gtk.IconTheme): the icon theme.
+        icon_name (str): the icon name.
+        sizes (list): the icon sizes in pixels.
+        scale (int): the scale factor.
+
+    Returns:
+        dict: the pixbuf of each size, empty if the icon is skipped.
+    """
+    icon_path = lookup_icon_file(theme, icon_name, max(sizes), scale)
+    if not icon_path:
+        return {}
     try:
-        icon_info = theme.lookup_icon(icon_name, 64, 0)
-        if not icon_info.is_symbolic():
-            icon_path = icon_info.get_filename()
-            if not path.islink(icon_path) and icon_name.startswith("folder"):
-                pixbuf = icon_info.load_icon()
-    except GLib.Error:
-        pixbuf = theme.load_icon("image-missing", 64, 0)
-    if pixbuf and (pixbuf.props.width != 64 or pixbuf.props.height != 64):
-        pixbuf = pixbuf.scale_simple(64, 64,
-                                     GdkPixbuf.InterpType.BILINEAR)
-    return pixbuf
+        return render_icon_file(icon_path, sizes, scale)
+    except (GLib.Error, IOError, OSError):
+        return dict((size, theme.load_icon_for_scale("image-missing", size,
+                                                     scale, 0))
+                    for size in sizes)
+
+
+@traced()
+def load_pixbuf(theme, icon_name, size=64):
+    """Returns the pixbuf of a Places icon rendered at the size."""
+    return render_icon(theme, icon_name, [size]).get(size)
+
+
+@traced()
+def load_icon_file(icon_path, size, missing=None):
+    """Returns the pixbuf of an icon file, thread safe.
+
+    Args:
+        icon_path (str): the icon file.
+        size (int): the icon size in pixels.
+        missing (str): the file used if the icon can't be decoded.
+    """
+    for filename in (icon_path, missing):
+        if filename:
+            try:
+                return render_icon_file(filename, [size])[size]
+            except (GLib.Error, IOError, OSError):
+                continue
+    return None
+
+
+class ThemeSnapshot(object):
+    """What loading the theme's folder icons needs from the icon theme.
+
+    Gtk.IconTheme & Gtk.Settings aren't thread safe & the file manager
+    uses the default theme on the main loop, so the snapshot is taken
+    there. The threads only read & decode the files.
+    """
+
+    def __init__(self, theme, size=64, scale=1):
+        self.name = get_icon_theme_name()
+        self.search_path = theme.get_search_path()
+        self.size = size
+        self.scale = scale
+        # The catalog's theme generation, see IconCatalog.get_snapshot
+        self.generation = None
+        # (icon name, file path) of the folder icons, sorted by name
+        self.files = []
+        for icon_name in sorted(theme.list_icons("Places")):
+            icon_path = lookup_icon_file(theme, icon_name, size * scale)
+            if icon_path:
+                self.files.append((icon_name, icon_path))
+        missing = theme.lookup_icon_for_scale("image-missing", size,
+                                              scale, 0)
+        self.missing = missing.get_filename() if missing else None
+
+    @staticmethod
+    def take(theme, size=64, scale=1):
+        """Returns a snapshot, taken on the main loop.
+
+        The other threads wait until the main loop took it.
+        """
+        if current_thread() is main_thread():
+            return ThemeSnapshot(theme, size, scale)
+        result = []
+        done = Event()
+
+        def on_idle():
+            try:
+                result.append(ThemeSnapshot(theme, size, scale))
+            finally:
+                done.set()
+            return False
+        GLib.idle_add(on_idle, priority=GLib.PRIORITY_HIGH_IDLE)
+        done.wait()
+        if not result:
+            raise RuntimeError("Failed to read the icon theme")
+        return result[0]
+
+
+def get_icon_theme_name():
+    """Returns the name of the current icon theme."""
+    settings = Gtk.Settings.get_default()
+    if settings:
+        return settings.props.gtk_icon_theme_name
+    return "hicolor"
+
+
+def pixbuf_to_cache_entry(name, pixbuf):
+    """Convert a pixbuf to a raw CacheEntry."""
+    pixels = pixbuf.read_pixel_bytes().get_data()
+    return CacheEntry(name, pixbuf.props.width, pixbuf.props.height,
+                      pixbuf.props.rowstride, pixbuf.props.has_alpha,
+                      pixels)
+
+
+def cache_entry_to_pixbuf(entry):
+    """Create a pixbuf from the raw pixels of a CacheEntry."""
+    # The pixels are a memoryview of the cache file or bytes
+    pixels = GLib.Bytes.new(bytes(entry.pixels))
+    return GdkPixbuf.Pixbuf.new_from_bytes(pixels,
+                                           GdkPixbuf.Colorspace.RGB,
+                                           entry.has_alpha, 8,
+                                           entry.width, entry.height,
+                                           entry.rowstride)
+
+
+def iter_places_icons(snapshot):
+    """Yields the (icon name, pixbuf) of the theme's Places icons.
+
+    The rendered pixbufs are stored in a persistent cache, keyed by the
+    theme name, the size, the scale factor & the mtimes of the theme
+    directories. A warm cache doesn't decode any icon.
+    It only uses the snapshot, so it can run in any thread.
+
+    Args:
+        snapshot (ThemeSnapshot): the icon theme's files.
+    """
+    size, scale = snapshot.size, snapshot.scale
+    cache_path = get_cache_path(snapshot.name, size, scale)
+    fingerprint = theme_fingerprint(snapshot.name, snapshot.search_path,
+                                    size, scale)
+    entries = read_cache(cache_path, fingerprint)
+    if entries is not None:
+        for entry in entries:
+            yield entry.name, cache_entry_to_pixbuf(entry)
+        return
+
+    entries = []
+    for icon_name, icon_path in snapshot.files:
+        pixbuf = load_icon_file(icon_path, size * scale, snapshot.missing)
+        if pixbuf:
+            entries.append(pixbuf_to_cache_entry(icon_name, pixbuf))
+            yield icon_name, pixbuf
+    try:
+        write_cache(cache_path, fingerprint, entries)
+    except (IOError, OSError):
+        pass
+
+
+def iter_library_icons(size=64, scale=1, library=None):
+    """Yields the (path, pixbuf) of the user icon directories' icons.
+
+    Only the new & modified icons are rendered, see IconLibrary.
+
+    Args:
+        size (int): the icon size in pixels.
+        scale (int): the scale factor.
+        library (IconLibrary): the library to update, instead of
+            the one of the size & scale.
+    """
+    library = library or IconLibrary(size=size, scale=scale)
+    for entry in library.update():
+        yield entry.name, cache_entry_to_pixbuf(entry)
@@ -17,42 +17,24 @@ along with nautilus-folder-icons. If not, see <http://www.gnu.org/licenses/>.
 """
 from gettext import gettext as _
 from os import path
-from threading import Thread
+from threading import Event, Thread
+from time import time
 
 from gi import require_version
 require_version("Gtk", "3.0")
 from gi.repository import GdkPixbuf, Gio, GLib, GObject, Gtk, Pango
 
+from library import get_library_label
+from tracing import traced
 from utils import (SUPPORTED_EXTS, Image, get_default_icon,
-                   get_ext, is_path, load_pixbuf, uriparse)
+                   IconCatalog, get_ext, is_path, uriparse)
 
 
-class FolderBox(Gtk.FlowBoxChild):
-    """
-    FloderBox with icon preview
-    """
-
-    def __init__(self, icon_name, pixbuf):
-        Gtk.FlowBoxChild.__init__(self)
-        self.name = icon_name
-        self.pixbuf = pixbuf
-        self._build_widget()
-        self.show()
-
-    def _build_widget(self):
-        """Build the widgets."""
-        container = Gtk.Box(orientation=Gtk.Orientation.VERTICAL)
-        container.show()
-
-        image = Gtk.Image.new_from_pixbuf(self.pixbuf)
-        image.show()
-        container.pack_start(image, False, False, 6)
-
-        label = Gtk.Label()
-        label.set_text(self.name)
-        label.show()
-        container.pack_start(label, False, False, 6)
-        self.add(container)
+def get_label(icon_name):
+    """Returns the shown name of an icon, the file name for the paths."""
+    if is_path(icon_name):
+        return get_library_label(icon_name)
+    return icon_name
 
 
 class FolderIconChooser(Gtk.Window, GObject.GObject, Thread):
@@ -63,20 +45,39 @@ class FolderIconChooser(Gtk.Window, GObject.GObject, Thread):
         'selected': (GObject.SignalFlags.RUN_FIRST, None, (str, )),
         'loaded': (GObject.SignalFlags.RUN_FIRST, None, ()),
     }
+    # Number of icons pushed to the icon view per idle callback
+    BATCH_SIZE = 24
+    # Maximum time (in seconds) a loaded icon waits before being shown
+    BATCH_DELAY = 0.05
 
-    def __init__(self, folders):
+    def __init__(self, folders, reusable=False):
         GObject.GObject.__init__(self)
         Thread.__init__(self)
         Gtk.Window.__init__(self)
         self.connect("delete-event", self._close_window)
+        self.connect("destroy", self._on_destroy)
         # Here i assume that all folders got the same icon...
         self._folders = folders
         self.model = []
-        self._flowbox = Gtk.FlowBox()
-
-        # Threading stuff
-        self.setDaemon(True)
-        self.run()
+        self._catalog = IconCatalog.get_default()
+        # The icon theme is only read from the main loop,
+        # the loading thread decodes the files
+        self._snapshot = None
+        if not self._catalog.is_complete:
+            self._snapshot = self._catalog.get_snapshot()
+        # The catalog generation the icons were loaded from
+        self._generation = None
+        # icon name -> pixbuf of the loaded icons
+        self._pixbufs = {}
+        self._search = None
+        self._query = ""
+        # Icon name (or path), pixbuf, label
+        self._store = Gtk.ListStore(str, GdkPixbuf.Pixbuf, str)
+        self._iconview = Gtk.IconView.new_with_model(self._store)
+        self._cancelled = Event()
+        self._loaded = False
+        # A reusable chooser is hidden on close instead of being destroyed
+        self._reusable = reusable
 
         # Window configurations
         self.set_default_size(650, 500)
@@ -90,35 +91,70 @@ class FolderIconChooser(Gtk.Window, GObject.GObject, Thread):
         self._build_content()
         self._setup_accels()
 
+        # Threading stuff
+        self.setDaemon(True)
+        self.start()
+
     def emit(self, *args):
         # Use idle_add to make it possible to use emit within a Thread
         GLib.idle_add(GObject.GObject.emit, self, *args)
 
+    @traced("FolderIconChooser.run")
     def run(self):
-        """Threading run method."""
-        # Load the completion entries
-        self.model = []
-        # List all the places icons
-        theme = Gtk.IconTheme.get_default()
-        folders = theme.list_icons('Places')
-        folders.sort()
-        # Fill in the model (str: icon path, pixbuf)
-        theme = Gtk.IconTheme.get_default()
-        for folder in folders:
-            pixbuf = load_pixbuf(theme, folder)
-            if pixbuf:
-                self.model.append({
-                    "path": folder,
-                    "pixbuf": pixbuf
-                })
+        """Threading run method.
+
+        Loads the icons in the background and pushes them to the
+        icon view in small batches from idle callbacks.
+        """
+        # The user might have added icons since the catalog was loaded
+        self._catalog.refresh_library()
+        self._generation = self._catalog.generation
+        batch = []
+        last_push = time()
+        # Fill in the model from the shared icon catalog
+        for entry in self._catalog.iter_entries(self._snapshot):
+            if self._cancelled.is_set():
+                return
+            batch.append(entry)
+            # Push the first icon right away
+            if (not self.model and len(batch) == 1
+                    or len(batch) >= FolderIconChooser.BATCH_SIZE
+                    or time() - last_push >= FolderIconChooser.BATCH_DELAY):
+                self._push_batch(batch)
+                batch = []
+                last_push = time()
+        self._push_batch(batch)
+        # Build the search index off the main loop
+        self._search = self._catalog.get_search()
         self.emit("loaded")
+
+    def _push_batch(self, batch):
+        """Schedule the addition of a batch of icons on the main loop."""
+        if batch and not self._cancelled.is_set():
+            self.model.extend(batch)
+            GLib.idle_add(self._add_batch, batch)
+
+    def _add_batch(self, batch):
+        """Add a batch of icons to the icon view, runs on the main loop."""
+        if not self._cancelled.is_set():
+            for entry in batch:
+                self._pixbufs[entry.name] = entry.pixbuf
+                # The search results are shown once the icons are loaded
+                if not self._query:
+                    self._store.append([entry.name, entry.pixbuf,
+                                        get_label(entry.name)])
         return False
 
+    @traced("FolderIconChooser.do_loaded")
     def do_loaded(self):
         """loaded signal handler."""
-        for entry in self.model:
-            child = FolderBox(entry["path"], entry["pixbuf"])
-            self._flowbox.add(child)
+        self._loaded = True
+        if self._query:
+            self._on_search()
+
+    def _on_destroy(self, *args):
+        """Cancel the icons loading when the window is closed."""
+        self._cancelled.set()
 
     def _build_header_bar(self):
         """Setup window headerbar."""
@@ -132,14 +168,12 @@ class FolderIconChooser(Gtk.Window, GObject.GObject, Thread):
         title.get_style_context().add_class("title")
         headerbar_container.pack_start(title, False, False, 0)
 
-        subtitle = Gtk.Label()
-        subtitle.get_style_context().add_class("subtitle")
-        subtitle_text = ", ".join(self._folders)
-        subtitle.set_text(subtitle_text)
-        subtitle.set_ellipsize(Pango.EllipsizeMode.END)
-        subtitle.set_tooltip_text(subtitle_text)
-        subtitle.props.max_width_chars = 30
-        headerbar_container.pack_start(subtitle, False, False, 0)
+        self._subtitle = Gtk.Label()
+        self._subtitle.get_style_context().add_class("subtitle")
+        self._subtitle.set_ellipsize(Pango.EllipsizeMode.END)
+        self._subtitle.props.max_width_chars = 30
+        self._set_subtitle()
+        headerbar_container.pack_start(self._subtitle, False, False, 0)
 
         headerbar.set_custom_title(headerbar_container)
         headerbar.set_show_close_button(False)
@@ -159,6 +193,11 @@ class FolderIconChooser(Gtk.Window, GObject.GObject, Thread):
         headerbar.pack_end(self._search_btn)
         self.set_titlebar(headerbar)
 
+    def _set_subtitle(self):
+        subtitle_text = ", ".join(self._folders)
+        self._subtitle.set_text(subtitle_text)
+        self._subtitle.set_tooltip_text(subtitle_text)
+
     def _build_content(self):
         """"Setup window content widges."""
         container = Gtk.Box(orientation=Gtk.Orientation.VERTICAL)
@@ -188,17 +227,18 @@ class FolderIconChooser(Gtk.Window, GObject.GObject, Thread):
         scrolled = Gtk.ScrolledWindow()
         scrolled.set_policy(Gtk.PolicyType.NEVER, Gtk.PolicyType.AUTOMATIC)
 
-        self._flowbox.connect("child-activated", self._do_select)
-        self._flowbox.connect("selected-children-changed",
-                              self._on_update_preview)
-        self._flowbox.set_valign(Gtk.Align.START)
-        self._flowbox.set_row_spacing(0)
-        self._flowbox.set_activate_on_single_click(False)
-        self._flowbox.set_min_children_per_line(4)
-        self._flowbox.set_max_children_per_line(12)
-        self._flowbox.set_selection_mode(Gtk.SelectionMode.SINGLE)
+        # The icon view only renders the visible icons
+        # instead of creating a widget per icon
+        self._iconview.set_text_column(2)
+        self._iconview.set_pixbuf_column(1)
+        self._iconview.set_item_width(96)
+        self._iconview.set_row_spacing(0)
+        self._iconview.set_activate_on_single_click(False)
+        self._iconview.set_selection_mode(Gtk.SelectionMode.SINGLE)
+        self._iconview.connect("item-activated", self._do_select)
+        self._iconview.connect("selection-changed", self._on_update_preview)
 
-        scrolled.add(self._flowbox)
+        scrolled.add(self._iconview)
 
         container.pack_start(self._preview, False, False, 0)
         container.pack_start(scrolled, True, True, 0)
@@ -224,23 +264,102 @@ class FolderIconChooser(Gtk.Window, GObject.GObject, Thread):
 
     def _get_selected_icon(self):
         """Return the selected icon name."""
-        icon_name = self._flowbox.get_selected_children()[0].name
-        return icon_name
+        selected = self._iconview.get_selected_items()
+        if selected:
+            return self._store[selected[0]][0]
+        return None
 
     def _on_update_preview(self, *args):
         icon_name = self._get_selected_icon()
-        self._preview.set_icon(icon_name)
+        if icon_name:
+            self._preview.set_icon(icon_name)
+            self._prefetch_neighbours()
+
+    def _prefetch_neighbours(self):
+        """Render the icons around the selection, arrow keys move there."""
+        selected = self._iconview.get_selected_items()
+        if not selected:
+            return
+        index = selected[0].get_indices()[0]
+        # The next/previous items & the ones above/below
+        columns = max(self._iconview.get_columns(), 1)
+        if columns == 1:
+            columns = max(self._iconview.get_allocated_width()
+                          // max(self._iconview.get_item_width(), 1), 1)
+        names = []
+        for offset in (1, -1, columns, -columns):
+            position = index + offset
+            if offset and 0 <= position < len(self._store):
+                names.append(self._store[position][0])
+        self._preview.prefetch(names)
 
     def _do_select(self, *args):
-        self.emit("selected", self._get_selected_icon())
+        icon_name = self._get_selected_icon()
+        if icon_name:
+            self.emit("selected", icon_name)
 
     def _on_key_press(self, window, event):
         self._search_bar.handle_event(event)
 
     def _on_search(self, *args):
-        """On search signal handler."""
-        data = self._search_entry.get_text().strip()
-        self._flowbox.set_filter_func(self._filter_func, data, True)
+        """On search signal handler.
+
+        Gtk.SearchEntry's search-changed is already debounced,
+        the query is evaluated once against the search index.
+        """
+        self._query = self._search_entry.get_text().strip()
+        # The index is built before the last icons are added to the view
+        if self._loaded and self._search:
+            self._show_icons(self._search.search(self._query))
+        else:
+            # The icons are still loading, filter the loaded ones
+            terms = self._query.lower().split()
+            self._show_icons([icon_name for icon_name in self._pixbufs
+                              if all(term in get_label(icon_name).lower()
+                                     for term in terms)])
+
+    def _show_icons(self, icon_names):
+        """Replace the icon view content with the icons, in order."""
+        self._iconview.set_model(None)
+        self._store.clear()
+        for icon_name in icon_names:
+            self._store.append([icon_name, self._pixbufs[icon_name],
+                                get_label(icon_name)])
+        self._iconview.set_model(self._store)
+
+    @property
+    def can_retarget(self):
+        """Whether the hidden chooser can be shown for other folders.
+
+        The icons must be loaded & the catalog unchanged since then,
+        the icon theme & the user icons.
+        """
+        return (self._reusable and self._loaded and not self.get_visible()
+                and self._catalog.is_complete
+                and self._generation == self._catalog.generation)
+
+    def retarget(self, folders):
+        """Point the chooser to other folders, the icons aren't reloaded.
+
+        Args:
+            folders (list): the folders paths.
+        """
+        self._folders = folders
+        self._set_subtitle()
+        self._default_icon = get_default_icon(self._folders[0])
+        self._preview.set_icon(self._default_icon)
+        self._search_bar.set_search_mode(False)
+        if self._query:
+            self._search_entry.set_text("")
+            self._query = ""
+            if self._search:
+                self._show_icons(self._search.search(""))
+            else:
+                self._show_icons([entry.name for entry in self.model])
+        self._iconview.unselect_all()
+        if len(self._store):
+            self._iconview.scroll_to_path(Gtk.TreePath.new_first(),
+                                          False, 0, 0)
 
     def _close_window(self, *args):
         """Handle the destroy/delete-event signal."""
@@ -248,6 +367,10 @@ class FolderIconChooser(Gtk.Window, GObject.GObject, Thread):
         is_cancel_btn = not isinstance(args[0], Gtk.AccelGroup)
         if self._search_bar.get_search_mode() and not is_cancel_btn:
             self._search_bar.set_search_mode(False)
+        elif self._reusable:
+            self.hide()
+            # Stop the window from being destroyed
+            return True
         else:
             self.destroy()
 
@@ -255,15 +378,3 @@ class FolderIconChooser(Gtk.Window, GObject.GObject, Thread):
         """Toggle the search bar."""
         self._search_bar.set_search_mode(
             not self._search_bar.get_search_mode())
-
-    def _filter_func(self, row, data, notify_destroy):
-        """Filter func used to filter FlowBoxChild's."""
-        folder_icon_name = row.name
-        if data:
-            split_data = data.split(" ")
-            found = True
-            for string in split_data:
-                found = string.lower() in folder_icon_name
-            return found
-        else:
-            return True
@@ -0,0 +1,105 @@
+"""
+Change your nautilus directories icons easily
+
+Author : Bilal Elmoussaoui (bil.elmoussaoui@gmail.com)
+Website : https://github.com/bilelmoussaoui/nautilus-folder-icons
+Licence : GPL-3.0
+nautilus-folder-icons is free software: you can redistribute it and/or
+modify it under the terms of the GNU General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+nautilus-folder-icons is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+You should have received a copy of the GNU General Public License
+along with nautilus-folder-icons. If not, see <http://www.gnu.org/licenses/>.
+"""
+from urllib.parse import unquote, urlparse
+from weakref import WeakKeyDictionary
+
+
+class WindowState(object):
+    """The state of a file manager window."""
+    __slots__ = ("uri", "accel_group", "__weakref__")
+
+    def __init__(self):
+        self.uri = None
+        self.accel_group = None
+
+    @property
+    def folder(self):
+        """The current location path, None if it's not a local location.
+
+        The uri is only parsed when needed, not on each navigation.
+        """
+        if not self.uri:
+            return None
+        uri = urlparse(self.uri)
+        if uri.scheme != "file":
+            return None
+        return unquote(uri.path)
+
+
+class WindowRegistry(object):
+    """Weakly referenced state of each file manager window.
+
+    The windows are set up once, the first time they're seen, and their
+    state is dropped when they're destroyed.
+    """
+    _default = None
+
+    def __init__(self, setup=None):
+        """
+        Args:
+            setup (callable): called with the window & it's WindowState
+                the first time a window is seen.
+        """
+        self.setup = setup
+        self._states = WeakKeyDictionary()
+
+    @staticmethod
+    def get_default():
+        """Returns the registry of the file manager windows."""
+        if WindowRegistry._default is None:
+            WindowRegistry._default = WindowRegistry()
+        return WindowRegistry._default
+
+    def __len__(self):
+        return len(self._states)
+
+    def get(self, window):
+        """Returns the WindowState of a window, None if it's unknown."""
+        return self._states.get(window)
+
+    def update(self, window, uri):
+        """Set the current location of a window.
+
+        Args:
+            window (Gtk.Window): the file manager window.
+            uri (str): the current location uri.
+
+        Returns:
+            WindowState: the window's state.
+        """
+        state = self._states.get(window)
+        if state is None:
+            state = WindowState()
+            # PyGObject keeps the same wrapper for the window's lifetime
+            # once it has python attributes, the weak key stays valid
+            window.folder_icons_registered = True
+            self._states[window] = state
+            window.connect("destroy", self._on_destroy)
+            if self.setup:
+                self.setup(window, state)
+        state.uri = uri
+        return state
+
+    def _on_destroy(self, window):
+        self._states.pop(window, None)
+
+
+def get_window_folder(window):
+    """Returns the current location path of a window, None if unknown."""
+    state = WindowRegistry.get_default().get(window)
+    return state.folder if state else None
@@ -0,0 +1,118 @@
+"""
+Change your nautilus directories icons easily
+
+Author : Bilal Elmoussaoui (bil.elmoussaoui@gmail.com)
+Website : https://github.com/bilelmoussaoui/nautilus-folder-icons
+Licence : GPL-3.0
+nautilus-folder-icons is free software: you can redistribute it and/or
+modify it under the terms of the GNU General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+nautilus-folder-icons is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+You should have received a copy of the GNU General Public License
+along with nautilus-folder-icons. If not, see <http://www.gnu.org/licenses/>.
+"""
+import os
+import unittest
+from os import path, makedirs
+from shutil import rmtree
+from sys import path as sys_path
+from tempfile import mkdtemp
+
+CURRENT_DIR = path.dirname(path.abspath(__file__))
+ABS_PATH = path.abspath(path.join(CURRENT_DIR, "../"))
+sys_path.insert(0, path.join(ABS_PATH, 'src/'))
+
+from cache import CacheEntry, read_cache, theme_fingerprint, write_cache
+
+
+INDEX_THEME = """[Icon Theme]
+Name=Test
+Inherits={inherits}
+Directories=64x64/places
+
+[64x64/places]
+Size=64
+Context=Places
+"""
+
+
+def create_theme(base_dir, name, inherits="hicolor"):
+    theme_dir = path.join(base_dir, name)
+    makedirs(path.join(theme_dir, "64x64", "places"))
+    with open(path.join(theme_dir, "index.theme"), "w") as index_file:
+        index_file.write(INDEX_THEME.format(inherits=inherits))
+    return theme_dir
+
+
+class TestCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = mkdtemp()
+        self.cache_file = path.join(self.tmp_dir, "cache", "test.cache")
+
+    def tearDown(self):
+        rmtree(self.tmp_dir)
+
+    def test_round_trip(self):
+        entries = [
+            CacheEntry("folder", 2, 1, 8, True, b"\x01" * 8),
+            CacheEntry("folder-music", 1, 2, 4, False, b"\x02\x03" * 3),
+        ]
+        write_cache(self.cache_file, "fingerprint", entries)
+        cached = read_cache(self.cache_file, "fingerprint")
+        self.assertEqual(len(cached), 2)
+        for entry, cached_entry in zip(entries, cached):
+            self.assertEqual(entry.name, cached_entry.name)
+            self.assertEqual(entry.width, cached_entry.width)
+            self.assertEqual(entry.height, cached_entry.height)
+            self.assertEqual(entry.rowstride, cached_entry.rowstride)
+            self.assertEqual(entry.has_alpha, cached_entry.has_alpha)
+            self.assertEqual(entry.pixels, cached_entry.pixels.tobytes())
+
+    def test_stale_cache(self):
+        write_cache(self.cache_file, "old", [])
+        self.assertEqual(read_cache(self.cache_file, "old"), [])
+        self.assertIsNone(read_cache(self.cache_file, "new"))
+        self.assertIsNone(read_cache(path.join(self.tmp_dir, "missing"),
+                                     "old"))
+
+    def test_corrupted_cache(self):
+        entries = [CacheEntry("folder", 2, 2, 8, True, b"\x01" * 16)]
+        write_cache(self.cache_file, "fingerprint", entries)
+        with open(self.cache_file, "r+b") as cache_file:
+            cache_file.truncate(path.getsize(self.cache_file) - 4)
+        self.assertIsNone(read_cache(self.cache_file, "fingerprint"))
+
+    def test_theme_fingerprint(self):
+        create_theme(self.tmp_dir, "hicolor", inherits="")
+        theme_dir = create_theme(self.tmp_dir, "Test")
+        search_path = [self.tmp_dir]
+
+        fingerprint = theme_fingerprint("Test", search_path, 64, 1)
+        self.assertEqual(fingerprint,
+                         theme_fingerprint("Test", search_path, 64, 1))
+        self.assertNotEqual(fingerprint,
+                            theme_fingerprint("Test", search_path, 64, 2))
+
+        # Updating the theme directories invalidates the fingerprint
+        places_dir = path.join(theme_dir, "64x64", "places")
+        stat = os.stat(places_dir)
+        os.utime(places_dir, (stat.st_atime, stat.st_mtime + 10))
+        self.assertNotEqual(fingerprint,
+                            theme_fingerprint("Test", search_path, 64, 1))
+
+        # So does updating an inherited theme
+        fingerprint = theme_fingerprint("Test", search_path, 64, 1)
+        places_dir = path.join(self.tmp_dir, "hicolor", "64x64", "places")
+        stat = os.stat(places_dir)
+        os.utime(places_dir, (stat.st_atime, stat.st_mtime + 10))
+        self.assertNotEqual(fingerprint,
+                            theme_fingerprint("Test", search_path, 64, 1))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,145 @@
+"""
+Change your nautilus directories icons easily
+
+Author : Bilal Elmoussaoui (bil.elmoussaoui@gmail.com)
+Website : https://github.com/bilelmoussaoui/nautilus-folder-icons
+Licence : GPL-3.0
+nautilus-folder-icons is free software: you can redistribute it and/or
+modify it under the terms of the GNU General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+nautilus-folder-icons is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+You should have received a copy of the GNU General Public License
+along with nautilus-folder-icons. If not, see <http://www.gnu.org/licenses/>.
+"""
+import json
+import os
+import subprocess
+import sys
+import unittest
+from io import BytesIO, StringIO
+from os import path, makedirs
+from shutil import rmtree
+from sys import path as sys_path
+from tempfile import mkdtemp
+
+CURRENT_DIR = path.dirname(path.abspath(__file__))
+ABS_PATH = path.abspath(path.join(CURRENT_DIR, "../"))
+sys_path.insert(0, path.join(ABS_PATH, 'src/'))
+
+from cli import main, read_paths, run_parallel
+from journal import Journal
+
+
+class TestCli(unittest.TestCase):
+
+    def setUp(self):
+        self.root = mkdtemp(dir=path.expanduser("~"))
+        self.folders = [path.join(self.root, "folder-{}".format(i))
+                        for i in range(10)]
+        for folder in self.folders:
+            makedirs(folder)
+        Journal._default = Journal(path.join(self.root, "journal"))
+
+    def tearDown(self):
+        Journal._default = None
+        rmtree(self.root)
+
+    def run_cli(self, argv, stdin=b""):
+        stdout = StringIO()
+        code = main(argv, BytesIO(stdin), stdout)
+        lines = stdout.getvalue().splitlines()
+        return code, [json.loads(line) for line in lines]
+
+    def test_read_paths(self):
+        self.assertEqual(list(read_paths(["/a", "/b"])), ["/a", "/b"])
+        stream = BytesIO(b"/a\0/b c\0\0/d")
+        self.assertEqual(list(read_paths([], stream)),
+                         ["/a", "/b c", "/d"])
+
+    def test_run_parallel(self):
+        results = list(run_parallel(lambda i: i * 2, iter(range(100)), 4))
+        self.assertEqual(results, [i * 2 for i in range(100)])
+
+    def test_no_gtk(self):
+        self.run_cli(["get"] + self.folders)
+        self.assertNotIn("gi.repository.Gtk", sys.modules)
+        self.assertNotIn("widgets", sys.modules)
+
+    def test_set_get_restore(self):
+        stdin = b"\0".join(folder.encode() for folder in self.folders)
+        code, results = self.run_cli(["-j", "4", "set", "folder-videos"],
+                                     stdin)
+        self.assertEqual(code, 0)
+        self.assertEqual([result["path"] for result in results],
+                         self.folders)
+        self.assertTrue(all(result["written"] for result in results))
+        # Applying the same icon again doesn't write anything
+        code, results = self.run_cli(["set", "folder-videos"] + self.folders)
+        self.assertFalse(any(result["written"] for result in results))
+
+        code, results = self.run_cli(["get"] + self.folders)
+        self.assertEqual(set(result["icon"] for result in results),
+                         set(["folder-videos"]))
+
+        code, results = self.run_cli(["restore"] + self.folders)
+        self.assertEqual(code, 0)
+        code, results = self.run_cli(["get"] + self.folders)
+        self.assertEqual(set(result["icon"] for result in results),
+                         set(["inode-directory"]))
+
+    def test_set_headless(self):
+        # There's no default icon theme without a display
+        env = dict((key, value) for key, value in os.environ.items()
+                   if key not in ("DISPLAY", "WAYLAND_DISPLAY"))
+        env["XDG_DATA_HOME"] = path.join(self.root, "data")
+        script = ("import sys; sys.path.insert(0, {!r}); from cli import main;"
+                  " sys.exit(main(sys.argv[1:]))").format(
+                      path.join(ABS_PATH, "src"))
+        process = subprocess.run(
+            [sys.executable, "-c", script, "set", "folder-music"]
+            + self.folders[:2], env=env, stdout=subprocess.PIPE,
+            universal_newlines=True)
+        self.assertEqual(process.returncode, 0)
+        results = [json.loads(line) for line in process.stdout.splitlines()]
+        self.assertTrue(all(result["written"] for result in results))
+        code, results = self.run_cli(["get"] + self.folders[:2])
+        self.assertEqual(set(result["icon"] for result in results),
+                         set(["folder-music"]))
+
+    def test_undo(self):
+        self.run_cli(["set", "folder-videos"] + self.folders)
+        self.run_cli(["set", "folder-music"] + self.folders[:5])
+        code, results = self.run_cli(["undo"])
+        self.assertEqual(code, 0)
+        self.assertEqual(len(results), 5)
+        code, results = self.run_cli(["get"] + self.folders)
+        self.assertEqual(set(result["icon"] for result in results),
+                         set(["folder-videos"]))
+        self.run_cli(["undo"])
+        code, results = self.run_cli(["get"] + self.folders)
+        self.assertEqual(set(result["icon"] for result in results),
+                         set(["inode-directory"]))
+        code, results = self.run_cli(["undo"])
+        self.assertEqual(code, 1)
+
+    def test_recursive(self):
+        makedirs(path.join(self.folders[0], "a", "b"))
+        code, results = self.run_cli(["-r", "get", self.folders[0]])
+        self.assertEqual(len(results), 3)
+        code, results = self.run_cli(["-r", "--dry-run", "get",
+                                      self.folders[0]])
+        self.assertEqual(results[0]["count"], 3)
+
+    def test_errors(self):
+        missing = path.join(self.root, "missing")
+        code, results = self.run_cli(["get", missing])
+        self.assertEqual(code, 1)
+        self.assertIn("error", results[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,171 @@
+"""
+Change your nautilus directories icons easily
+
+Author : Bilal Elmoussaoui (bil.elmoussaoui@gmail.com)
+Website : https://github.com/bilelmoussaoui/nautilus-folder-icons
+Licence : GPL-3.0
+nautilus-folder-icons is free software: you can redistribute it and/or
+modify it under the terms of the GNU General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+nautilus-folder-icons is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+You should have received a copy of the GNU General Public License
+along with nautilus-folder-icons. If not, see <http://www.gnu.org/licenses/>.
+"""
+import unittest
+from os import path
+from shutil import rmtree
+from sys import path as sys_path
+from tempfile import mkdtemp
+
+CURRENT_DIR = path.dirname(path.abspath(__file__))
+ABS_PATH = path.abspath(path.join(CURRENT_DIR, "../"))
+sys_path.insert(0, path.join(ABS_PATH, 'src/'))
+
+from journal import EntryRecord, Journal, OperationRecord
+
+ICON_NAME = "metadata::custom-icon-name"
+
+
+class TestJournal(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = mkdtemp()
+        self.filename = path.join(self.tmp_dir, "data", "journal")
+        self.journal = Journal(self.filename)
+
+    def tearDown(self):
+        rmtree(self.tmp_dir)
+
+    def record_operation(self, journal, icon, folders):
+        operation = journal.begin("set {}".format(icon))
+        for folder in folders:
+            operation.record(folder, {ICON_NAME: None}, {ICON_NAME: icon})
+        operation.close()
+        # Written by a thread
+        journal.sync()
+        return operation
+
+    def test_replay(self):
+        operation = self.record_operation(self.journal, "folder-music",
+                                          ["/a", "/b"])
+        records = list(Journal(self.filename).replay())
+        self.assertIsInstance(records[0], OperationRecord)
+        self.assertEqual(records[0].id, operation.id)
+        self.assertEqual(records[0].description, "set folder-music")
+        self.assertEqual(records[1], EntryRecord(operation.id, "/a",
+                                                 {ICON_NAME: None},
+                                                 {ICON_NAME: "folder-music"}))
+        self.assertEqual(len(records), 3)
+
+    def test_batches(self):
+        operation = self.journal.begin("set folder")
+        for i in range(Journal.BATCH_SIZE + 1):
+            operation.record("/{}".format(i), {}, {ICON_NAME: "folder"})
+        # The first batch is written by a thread, without the last record
+        self.journal.sync()
+        with open(self.filename) as journal_file:
+            self.assertEqual(len(journal_file.readlines()),
+                             Journal.BATCH_SIZE)
+        operation.close()
+        self.journal.sync()
+        self.assertEqual(len(list(Journal(self.filename).replay())),
+                         Journal.BATCH_SIZE + 2)
+
+    def test_corrupted_lines(self):
+        self.record_operation(self.journal, "folder", ["/a"])
+        with open(self.filename, "a") as journal_file:
+            journal_file.write('["E", 1, "/tru')
+        self.assertEqual(len(list(Journal(self.filename).replay())), 2)
+
+    def test_undoable(self):
+        self.assertIsNone(self.journal.get_undoable())
+        first = self.record_operation(self.journal, "folder-music", ["/a"])
+        second = self.record_operation(self.journal, "folder-videos",
+                                       ["/a", "/b", "/a"])
+        self.assertEqual(self.journal.get_undoable().id, second.id)
+        states = list(self.journal.iter_previous_states(second.id))
+        self.assertEqual(states, [("/a", {ICON_NAME: None}),
+                                  ("/b", {ICON_NAME: None})])
+        self.journal.begin("undo", undoes=second.id).close()
+        self.assertEqual(self.journal.get_undoable().id, first.id)
+        self.journal.begin("undo", undoes=first.id).close()
+        self.assertIsNone(self.journal.get_undoable())
+
+    def test_empty_operation(self):
+        operation = self.record_operation(self.journal, "folder", ["/a"])
+        # An operation that changes nothing isn't journaled
+        self.journal.begin("set folder").close()
+        self.assertEqual(self.journal.get_undoable().id, operation.id)
+        self.assertEqual(len(list(self.journal.iter_operations())), 1)
+
+    def test_other_writer(self):
+        self.record_operation(self.journal, "folder", ["/a"])
+        self.assertEqual(len(list(self.journal.iter_operations())), 1)
+        # Another process appends to the same journal
+        other = self.record_operation(Journal(self.filename), "folder",
+                                      ["/b"])
+        self.assertEqual(self.journal.get_undoable().id, other.id)
+        self.assertEqual(list(self.journal.iter_previous_states(other.id)),
+                         [("/b", {ICON_NAME: None})])
+        self.assertGreater(self.journal.begin("set folder").id, other.id)
+
+    def test_compaction(self):
+        journal = Journal(self.filename, max_size=10000, max_operations=2)
+        operations = [self.record_operation(journal, "folder", ["/a", "/b"])
+                      for _ in range(5)]
+        journal.begin("undo", undoes=operations[-1].id).close()
+        journal.compact()
+        ids = [operation.id for operation in journal.iter_operations()]
+        # The undone operation & it's undo are dropped
+        self.assertEqual(ids, [operations[2].id, operations[3].id])
+        self.assertEqual(journal.get_undoable().id, operations[3].id)
+        self.assertEqual(list(journal.iter_previous_states(ids[0])),
+                         [("/a", {ICON_NAME: None}),
+                          ("/b", {ICON_NAME: None})])
+        # The records written since are kept
+        last = self.record_operation(journal, "folder", ["/c"])
+        self.assertEqual(Journal(self.filename).get_undoable().id, last.id)
+
+    def test_compaction_size(self):
+        folders = ["/{:04d}".format(i) for i in range(20)]
+        journal = Journal(self.filename, max_size=4000)
+        operations = [self.record_operation(journal, "folder", folders)
+                      for _ in range(4)]
+        size = path.getsize(self.filename) // 4
+        # Over the maximum size, compacted in a thread by begin
+        for _ in range(4000 // size):
+            operations.append(self.record_operation(journal, "folder",
+                                                    folders))
+        journal.wait()
+        # The operations recorded during the compaction are kept
+        journal.begin("set folder")
+        journal.wait()
+        self.assertLessEqual(path.getsize(self.filename), 4000)
+        ids = [operation.id for operation in journal.iter_operations()]
+        self.assertLess(len(ids), len(operations))
+        self.assertEqual(ids, [operation.id for operation
+                               in operations[-len(ids):]])
+        self.assertEqual(journal.get_undoable().id, operations[-1].id)
+
+    def test_compaction_large_operation(self):
+        folders = ["/{:04d}".format(i) for i in range(100)]
+        journal = Journal(self.filename, max_size=4000)
+        self.record_operation(journal, "folder", ["/a"])
+        operation = self.record_operation(journal, "folder", folders)
+        self.assertGreater(path.getsize(self.filename), 4000)
+        journal.begin("set b")
+        journal.wait()
+        # The undo target is kept even if it's over the maximum size
+        self.assertEqual(journal.get_undoable().id, operation.id)
+        self.assertEqual(len(list(journal.iter_previous_states(
+            operation.id))), 100)
+        self.assertEqual([record.id for record in journal.iter_operations()],
+                         [operation.id])
+
+
+if __name__ == "__main__":
+    unittest.main()
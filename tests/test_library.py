@@ -0,0 +1,100 @@
+"""
+Change your nautilus directories icons easily
+
+Author : Bilal Elmoussaoui (bil.elmoussaoui@gmail.com)
+Website : https://github.com/bilelmoussaoui/nautilus-folder-icons
+Licence : GPL-3.0
+nautilus-folder-icons is free software: you can redistribute it and/or
+modify it under the terms of the GNU General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+nautilus-folder-icons is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+You should have received a copy of the GNU General Public License
+along with nautilus-folder-icons. If not, see <http://www.gnu.org/licenses/>.
+"""
+import os
+import unittest
+from os import path, makedirs
+from shutil import rmtree
+from sys import path as sys_path
+from tempfile import mkdtemp
+
+CURRENT_DIR = path.dirname(path.abspath(__file__))
+ABS_PATH = path.abspath(path.join(CURRENT_DIR, "../"))
+sys_path.insert(0, path.join(ABS_PATH, 'src/'))
+
+from library import (LIBRARIES_ENV, IconLibrary, get_library_dirs,
+                     get_library_label, scan_library)
+
+SVG = """<svg xmlns="http://www.w3.org/2000/svg" width="32" height="32">
+  <rect width="32" height="32" fill="#{:06x}"/>
+</svg>
+"""
+
+
+class TestLibrary(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = mkdtemp()
+        self.library = path.join(self.tmp_dir, "icons")
+        makedirs(path.join(self.library, "team", ".hidden"))
+        self.icons = []
+        for i, name in enumerate(["Blue Folder.svg", "team/red_folder.svg",
+                                  "team/.hidden/hidden.svg", "notes.txt"]):
+            filename = path.join(self.library, name)
+            with open(filename, "w") as icon_file:
+                icon_file.write(SVG.format(i * 0x102030))
+            self.icons.append(filename)
+        self._environ = dict(os.environ)
+        os.environ["XDG_CACHE_HOME"] = path.join(self.tmp_dir, "cache")
+        os.environ["XDG_DATA_HOME"] = path.join(self.tmp_dir, "data")
+
+    def tearDown(self):
+        os.environ.clear()
+        os.environ.update(self._environ)
+        rmtree(self.tmp_dir)
+
+    def test_get_library_dirs(self):
+        os.environ[LIBRARIES_ENV] = os.pathsep.join(
+            [self.library, self.library, path.join(self.tmp_dir, "missing")])
+        self.assertEqual(get_library_dirs(), [self.library])
+
+    def test_get_library_label(self):
+        self.assertEqual(get_library_label("/a/Blue  Folder.svg"),
+                         "Blue-Folder")
+        self.assertEqual(get_library_label("/a/red_folder.png"),
+                         "red-folder")
+
+    def test_scan_library(self):
+        icons = [filename for filename, mtime
+                 in scan_library([self.library])]
+        self.assertEqual(icons, self.icons[:2])
+
+    def test_incremental_update(self):
+        library = IconLibrary([self.library], size=48)
+        entries = library.update()
+        self.assertEqual([entry.name for entry in entries], self.icons[:2])
+        self.assertEqual(entries[0].width, 48)
+        self.assertEqual(library.rendered, 2)
+
+        # Nothing changed, nothing is rendered again
+        library = IconLibrary([self.library], size=48)
+        self.assertEqual(len(library.update()), 2)
+        self.assertEqual(library.rendered, 0)
+
+        # Only the modified icon is rendered again
+        stat = os.stat(self.icons[1])
+        os.utime(self.icons[1], ns=(stat.st_atime_ns,
+                                    stat.st_mtime_ns + 10 ** 9))
+        os.remove(self.icons[0])
+        library = IconLibrary([self.library], size=48)
+        entries = library.update()
+        self.assertEqual([entry.name for entry in entries], self.icons[1:2])
+        self.assertEqual(library.rendered, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,134 @@
+"""
+Change your nautilus directories icons easily
+
+Author : Bilal Elmoussaoui (bil.elmoussaoui@gmail.com)
+Website : https://github.com/bilelmoussaoui/nautilus-folder-icons
+Licence : GPL-3.0
+nautilus-folder-icons is free software: you can redistribute it and/or
+modify it under the terms of the GNU General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+nautilus-folder-icons is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+You should have received a copy of the GNU General Public License
+along with nautilus-folder-icons. If not, see <http://www.gnu.org/licenses/>.
+"""
+import json
+import os
+import unittest
+from os import path, makedirs
+from shutil import rmtree
+from sys import path as sys_path
+from tempfile import mkdtemp
+from time import time
+
+CURRENT_DIR = path.dirname(path.abspath(__file__))
+ABS_PATH = path.abspath(path.join(CURRENT_DIR, "../"))
+sys_path.insert(0, path.join(ABS_PATH, 'src/'))
+
+from gi.repository import GLib
+
+from journal import Journal
+from metadata import get_default_icon
+from rules import Rule, RuleSet, RulesEngine, load_rules
+
+
+class TestRules(unittest.TestCase):
+
+    def setUp(self):
+        # The GVfs metadata is stored per home directory
+        self.root = mkdtemp(dir=path.expanduser("~"))
+        Journal._default = Journal(path.join(self.root, ".journal"))
+
+    def tearDown(self):
+        Journal._default = None
+        rmtree(self.root)
+
+    def test_rule_set(self):
+        project = path.join(self.root, "project")
+        makedirs(path.join(project, ".git"))
+        rules = RuleSet([
+            Rule(0, "folder-music", name="*music*"),
+            Rule(1, "folder-development", marker=".git"),
+            Rule(2, "folder-documents", parent=self.root, name="docs"),
+            Rule(3, "folder-download", name="down-*"),
+            Rule(4, "folder-pictures", name="*.photos"),
+        ])
+        self.assertEqual(rules.match(project).icon, "folder-development")
+        self.assertEqual(rules.match(path.join(self.root, "docs")).icon,
+                         "folder-documents")
+        self.assertIsNone(rules.match("/docs"))
+        self.assertEqual(rules.match("/a/down-1").icon, "folder-download")
+        self.assertEqual(rules.match("/a/2017.photos").icon,
+                         "folder-pictures")
+        # The lowest index wins
+        self.assertEqual(rules.match("/a/down-music").icon, "folder-music")
+        self.assertIsNone(rules.match("/a/other"))
+
+    def test_many_rules(self):
+        rules = RuleSet([Rule(i, "folder", name="project-{:05d}-*".format(i))
+                         for i in range(10000)])
+        start = time()
+        for i in range(1000):
+            rule = rules.match("/a/project-{:05d}-x".format(i * 10))
+            self.assertEqual(rule.index, i * 10)
+        self.assertLess(time() - start, 0.5)
+
+    def test_load_rules(self):
+        filename = path.join(self.root, "rules.json")
+        with open(filename, "w") as config_file:
+            json.dump({"roots": ["~/Projects", {"path": "/tmp", "depth": 3}],
+                       "rules": [{"icon": "folder-music",
+                                  "name": "*music*"}]}, config_file)
+        roots, rules = load_rules(filename)
+        self.assertEqual(roots, [(path.expanduser("~/Projects"), 1),
+                                 ("/tmp", 3)])
+        self.assertEqual(len(rules), 1)
+
+    def test_engine(self):
+        existing = path.join(self.root, "existing-music")
+        os.mkdir(existing)
+        rules = RuleSet([Rule(0, "folder-music", name="*music*"),
+                         Rule(1, "folder-development", marker=".git")])
+        engine = RulesEngine([(self.root, 2)], rules, delay=50)
+        engine.start()
+        # The roots are watched from an idle source
+        context = GLib.MainContext.default()
+        while context.iteration(False):
+            pass
+        folders = [path.join(self.root, "music-{}".format(i))
+                   for i in range(5)]
+        for folder in folders:
+            os.mkdir(folder)
+        # A folder created in a new folder, within the watched depth
+        project = path.join(self.root, "other", "project")
+        os.mkdir(path.join(self.root, "other"))
+
+        loop = GLib.MainLoop()
+
+        def create_project():
+            os.makedirs(path.join(project, ".git"))
+            return False
+
+        def check():
+            if engine.applied == 6:
+                loop.quit()
+                return False
+            return True
+        GLib.timeout_add(300, create_project)
+        GLib.timeout_add(10, check)
+        GLib.timeout_add_seconds(10, loop.quit)
+        loop.run()
+        engine.stop()
+
+        for folder in folders:
+            self.assertEqual(get_default_icon(folder), "folder-music")
+        self.assertEqual(get_default_icon(project), "folder-development")
+        # The existing folders are left untouched
+        self.assertEqual(get_default_icon(existing), "inode-directory")
+
+
+if __name__ == "__main__":
+    unittest.main()
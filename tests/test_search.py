@@ -0,0 +1,113 @@
+"""
+Change your nautilus directories icons easily
+
+Author : Bilal Elmoussaoui (bil.elmoussaoui@gmail.com)
+Website : https://github.com/bilelmoussaoui/nautilus-folder-icons
+Licence : GPL-3.0
+nautilus-folder-icons is free software: you can redistribute it and/or
+modify it under the terms of the GNU General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+nautilus-folder-icons is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+You should have received a copy of the GNU General Public License
+along with nautilus-folder-icons. If not, see <http://www.gnu.org/licenses/>.
+"""
+import unittest
+from os import path
+from sys import path as sys_path
+from time import time
+
+CURRENT_DIR = path.dirname(path.abspath(__file__))
+ABS_PATH = path.abspath(path.join(CURRENT_DIR, "../"))
+sys_path.insert(0, path.join(ABS_PATH, 'src/'))
+
+from search import IconSearch, tokenize
+
+ICONS = [
+    "folder",
+    "folder-documents",
+    "folder-download",
+    "folder-music",
+    "folder-pictures",
+    "folder-videos",
+    "folder-black-music",
+    "user-home",
+]
+
+
+class TestSearch(unittest.TestCase):
+
+    def setUp(self):
+        self.search = IconSearch(ICONS, {"folder-downloads":
+                                         "folder-download"})
+
+    def test_tokenize(self):
+        self.assertEqual(tokenize("Folder-Music"),
+                         set(["folder", "music"]))
+
+    def test_empty_query(self):
+        self.assertEqual(self.search.search(""), ICONS)
+        self.assertEqual(self.search.search("   "), ICONS)
+
+    def test_ranking(self):
+        # exact > prefix > substring
+        results = self.search.search("do")
+        self.assertEqual(results, ["folder-download", "folder-documents"])
+        results = self.search.search("music")
+        self.assertEqual(results, ["folder-music", "folder-black-music"])
+        results = self.search.search("usi")
+        self.assertEqual(results, ["folder-music", "folder-black-music"])
+        results = self.search.search("home")
+        self.assertEqual(results, ["user-home"])
+        self.assertEqual(self.search.search("folder")[0], "folder")
+        results = self.search.search("folder-mu")
+        self.assertEqual(results, ["folder-music"])
+        results = self.search.search("der-music")
+        self.assertEqual(results, ["folder-music"])
+        results = self.search.search("folder-music")
+        self.assertEqual(results, ["folder-music"])
+
+    def test_all_terms_match(self):
+        self.assertEqual(self.search.search("black music"),
+                         ["folder-black-music"])
+        self.assertEqual(self.search.search("music black"),
+                         ["folder-black-music"])
+        self.assertEqual(self.search.search("music videos"), [])
+
+    def test_case_insensitive(self):
+        self.assertEqual(self.search.search("VIDEOS"), ["folder-videos"])
+
+    def test_aliases(self):
+        self.assertEqual(self.search.search("downloads"),
+                         ["folder-download"])
+
+    def test_no_match(self):
+        self.assertEqual(self.search.search("xyz"), [])
+        self.assertEqual(self.search.search("q"), [])
+
+    def test_labels(self):
+        path = "/home/user/icons/folder-design-team.svg"
+        search = IconSearch(ICONS + [path], labels={path: "design-team"})
+        self.assertEqual(search.search("design"), [path])
+        self.assertEqual(search.search("team"), [path])
+        self.assertEqual(search.search("home"), ["user-home"])
+        self.assertEqual(search.search("")[-1], path)
+
+    def test_large_index(self):
+        names = ["folder-{}-{:05d}".format(color, i)
+                 for i, color in enumerate(["red", "green", "blue"] * 3334)]
+        search = IconSearch(names)
+        start = time()
+        results = search.search("green 0001")
+        elapsed = time() - start
+        self.assertEqual(results[0], "folder-green-00010")
+        self.assertTrue(all("green" in name and "0001" in name
+                            for name in results))
+        self.assertLess(elapsed, 0.1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,101 @@
+"""
+Change your nautilus directories icons easily
+
+Author : Bilal Elmoussaoui (bil.elmoussaoui@gmail.com)
+Website : https://github.com/bilelmoussaoui/nautilus-folder-icons
+Licence : GPL-3.0
+nautilus-folder-icons is free software: you can redistribute it and/or
+modify it under the terms of the GNU General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+nautilus-folder-icons is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+You should have received a copy of the GNU General Public License
+along with nautilus-folder-icons. If not, see <http://www.gnu.org/licenses/>.
+"""
+import unittest
+from os import path
+from sys import path as sys_path
+
+CURRENT_DIR = path.dirname(path.abspath(__file__))
+ABS_PATH = path.abspath(path.join(CURRENT_DIR, "../"))
+sys_path.insert(0, path.join(ABS_PATH, 'src/'))
+
+from selection import FolderSelection, SelectionCache
+
+
+class FakeLocation(object):
+
+    def __init__(self, path_):
+        self._path = path_
+
+    def get_path(self):
+        return self._path
+
+
+class FakeFileInfo(object):
+    """Mimics the file manager's FileInfo & counts the calls."""
+    calls = 0
+
+    def __init__(self, path_, is_directory=True, scheme="file"):
+        self._path = path_
+        self._is_directory = is_directory
+        self._scheme = scheme
+
+    def is_directory(self):
+        FakeFileInfo.calls += 1
+        return self._is_directory
+
+    def get_uri_scheme(self):
+        FakeFileInfo.calls += 1
+        return self._scheme
+
+    def get_location(self):
+        FakeFileInfo.calls += 1
+        return FakeLocation(self._path)
+
+
+class TestSelection(unittest.TestCase):
+
+    def setUp(self):
+        FakeFileInfo.calls = 0
+
+    def test_folders_only(self):
+        files = [FakeFileInfo("/a"), FakeFileInfo("/b.txt", False),
+                 FakeFileInfo("/c", scheme="trash"), FakeFileInfo("/d")]
+        selection = FolderSelection(files)
+        self.assertTrue(selection)
+        self.assertFalse(selection.is_single)
+        self.assertEqual(selection.folders, ["/a", "/d"])
+        self.assertEqual(selection.count(), 2)
+
+    def test_no_folders(self):
+        self.assertFalse(FolderSelection([FakeFileInfo("/a.txt", False)]))
+        self.assertFalse(FolderSelection([]))
+        self.assertTrue(FolderSelection([FakeFileInfo("/a")]).is_single)
+
+    def test_lazy_scan(self):
+        files = [FakeFileInfo("/{}".format(i)) for i in range(50000)]
+        selection = FolderSelection(files)
+        self.assertTrue(selection)
+        self.assertFalse(selection.is_single)
+        # Only the two first folders were checked, no path was resolved
+        self.assertEqual(FakeFileInfo.calls, 4)
+        self.assertEqual(len(selection.folders), 50000)
+
+    def test_selection_cache(self):
+        files = [FakeFileInfo("/{}".format(i)) for i in range(100)]
+        cache = SelectionCache()
+        selection = cache.get(files)
+        self.assertIs(cache.get(list(files)), selection)
+        self.assertIsNot(cache.get(files[:-1]), selection)
+        self.assertIsNot(cache.get(files[:-1] + [FakeFileInfo("/99")]),
+                         selection)
+        self.assertEqual(cache.hits, 1)
+        self.assertEqual(cache.misses, 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
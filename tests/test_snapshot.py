@@ -0,0 +1,162 @@
+"""
+Change your nautilus directories icons easily
+
+Author : Bilal Elmoussaoui (bil.elmoussaoui@gmail.com)
+Website : https://github.com/bilelmoussaoui/nautilus-folder-icons
+Licence : GPL-3.0
+nautilus-folder-icons is free software: you can redistribute it and/or
+modify it under the terms of the GNU General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+nautilus-folder-icons is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+You should have received a copy of the GNU General Public License
+along with nautilus-folder-icons. If not, see <http://www.gnu.org/licenses/>.
+"""
+import json
+import unittest
+from io import StringIO
+from os import makedirs, path
+from shutil import rmtree
+from sys import path as sys_path
+from tempfile import mkdtemp
+
+CURRENT_DIR = path.dirname(path.abspath(__file__))
+ABS_PATH = path.abspath(path.join(CURRENT_DIR, "../"))
+sys_path.insert(0, path.join(ABS_PATH, 'src/'))
+
+from gi.repository import GLib
+
+from metadata import get_default_icon, set_default_icon
+from snapshot import (FORMAT, VERSION, export_snapshot, import_snapshot,
+                      read_header)
+
+# 500 parents of 100 folders each
+PARENTS = 500
+CHILDREN = 100
+
+
+def create_tree(root):
+    folders = []
+    for i in range(PARENTS):
+        for j in range(CHILDREN):
+            folder = path.join(root, "{:03d}".format(i), "{:02d}".format(j))
+            makedirs(folder)
+            folders.append(folder)
+    return folders
+
+
+def run(batch):
+    loop = GLib.MainLoop()
+    batch.connect("finished", lambda *args: loop.quit())
+    batch.start()
+    loop.run()
+    return batch
+
+
+def read_entries(stream):
+    stream.seek(0)
+    read_header(stream)
+    return dict(json.loads(line) for line in stream)
+
+
+class TestSnapshot(unittest.TestCase):
+
+    def setUp(self):
+        # The GVfs metadata is stored per home directory
+        self.tmp = mkdtemp(dir=path.expanduser("~"))
+        self.source = path.join(self.tmp, "source")
+        self.target = path.join(self.tmp, "target")
+        self.folders = create_tree(self.source)
+        create_tree(self.target)
+
+    def tearDown(self):
+        rmtree(self.tmp)
+
+    def test_round_trip(self):
+        icon = path.join(self.source, "000", "icon.svg")
+        open(icon, "w").close()
+        for folder in self.folders[::97]:
+            set_default_icon(folder, "folder-music", True)
+        set_default_icon(self.folders[1], icon)
+        set_default_icon(self.source, "folder-videos", False)
+
+        exported = StringIO()
+        count = export_snapshot(self.source, exported)
+        entries = read_entries(exported)
+        self.assertEqual(count, len(entries))
+        self.assertEqual(entries["."], {"n": "folder-videos"})
+        self.assertEqual(entries["000/00"], {"n": "folder-music",
+                                             "s": "folder-music-symbolic"})
+        # The icon inside the tree is stored relatively
+        self.assertEqual(entries["000/01"], {"c": "./000/icon.svg"})
+
+        exported.seek(0)
+        batch = run(import_snapshot(exported, self.target))
+        self.assertFalse(batch.failed)
+        self.assertEqual(len(batch.written), count)
+
+        reexported = StringIO()
+        export_snapshot(self.target, reexported)
+        self.assertEqual(read_entries(reexported), entries)
+        self.assertEqual(get_default_icon(path.join(self.target, "000", "01")),
+                         path.join(self.target, "000", "icon.svg"))
+
+    def test_overwrite(self):
+        folder = path.join(self.target, "000", "00")
+        set_default_icon(folder, "folder-music", True)
+        set_default_icon(self.folders[0], "folder-videos", False)
+        exported = StringIO()
+        export_snapshot(self.source, exported)
+        exported.seek(0)
+        run(import_snapshot(exported, self.target))
+        # The symbolic icon that isn't in the snapshot is unset
+        reexported = StringIO()
+        export_snapshot(self.target, reexported)
+        self.assertEqual(read_entries(reexported),
+                         {"000/00": {"n": "folder-videos"}})
+
+    def test_outside_root(self):
+        outside = path.join(self.tmp, "outside")
+        makedirs(outside)
+        entries = [(".", {"n": "folder-videos"}),
+                   ("000/../001/00", {"n": "folder-music"}),
+                   ("../outside", {"n": "folder-music"}),
+                   (outside, {"n": "folder-music"})]
+        header = {"format": FORMAT, "version": VERSION, "root": self.source}
+        snapshot = StringIO("\n".join(json.dumps(line) for line
+                                      in [header] + entries))
+        batch = run(import_snapshot(snapshot, self.target))
+        self.assertEqual(sorted(batch.failed), sorted(["../outside",
+                                                       outside]))
+        self.assertEqual(get_default_icon(outside), "inode-directory")
+        self.assertEqual(get_default_icon(self.target), "folder-videos")
+        self.assertEqual(get_default_icon(path.join(self.target, "001", "00")),
+                         "folder-music")
+
+    def test_corrupt_lines(self):
+        header = {"format": FORMAT, "version": VERSION, "root": self.source}
+        lines = [json.dumps(header),
+                 json.dumps(["000/00", {"n": "folder-music"}]),
+                 json.dumps(["000/01", ["n"]]),
+                 '42',
+                 # An interrupted export
+                 '["000/02", {"n": "fol']
+        batch = run(import_snapshot(StringIO("\n".join(lines)),
+                                    self.target))
+        self.assertEqual(sorted(batch.failed), ["line 3", "line 4",
+                                                "line 5"])
+        self.assertEqual(get_default_icon(path.join(self.target, "000", "00")),
+                         "folder-music")
+        self.assertEqual(get_default_icon(path.join(self.target, "000", "02")),
+                         "inode-directory")
+
+    def test_invalid(self):
+        self.assertRaises(ValueError, read_header, StringIO('{"a": 1}\n'))
+        self.assertRaises(ValueError, read_header, StringIO(""))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,125 @@
+"""
+Change your nautilus directories icons easily
+
+Author : Bilal Elmoussaoui (bil.elmoussaoui@gmail.com)
+Website : https://github.com/bilelmoussaoui/nautilus-folder-icons
+Licence : GPL-3.0
+nautilus-folder-icons is free software: you can redistribute it and/or
+modify it under the terms of the GNU General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+nautilus-folder-icons is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+You should have received a copy of the GNU General Public License
+along with nautilus-folder-icons. If not, see <http://www.gnu.org/licenses/>.
+"""
+import json
+import unittest
+from os import path
+from shutil import rmtree
+from sys import path as sys_path
+from tempfile import mkdtemp
+
+CURRENT_DIR = path.dirname(path.abspath(__file__))
+ABS_PATH = path.abspath(path.join(CURRENT_DIR, "../"))
+sys_path.insert(0, path.join(ABS_PATH, 'src/'))
+
+import tracing
+from tracing import (GVFS, NULL_SPAN, Histogram, Tracer, get_trace_paths,
+                     span, traced)
+
+
+def double(value):
+    return 2 * value
+
+
+class TestTracing(unittest.TestCase):
+
+    def setUp(self):
+        self.enabled = tracing.ENABLED
+        self.tracer = tracing.TRACER
+        tracing.ENABLED = True
+        tracing.TRACER = Tracer()
+
+    def tearDown(self):
+        tracing.ENABLED = self.enabled
+        tracing.TRACER = self.tracer
+
+    def test_disabled(self):
+        tracing.ENABLED = False
+        self.assertIs(span("query_info"), NULL_SPAN)
+        self.assertIs(traced()(double), double)
+        with span("query_info"):
+            pass
+        tracing.count("hits")
+        self.assertEqual(tracing.TRACER.get_stats()["spans"], {})
+        self.assertEqual(tracing.TRACER.get_stats()["counters"], {})
+
+    def test_spans(self):
+        traced_double = traced()(double)
+        self.assertEqual(traced_double.__name__, "double")
+        for i in range(10):
+            self.assertEqual(traced_double(i), 2 * i)
+        with span("query_info", GVFS):
+            pass
+        # An async operation, finished from the callback
+        trace = span("set_attributes", GVFS)
+        trace.finish()
+
+        stats = tracing.TRACER.get_stats()
+        self.assertEqual(stats["spans"]["double"]["count"], 10)
+        self.assertEqual(stats["spans"]["query_info"]["count"], 1)
+        self.assertEqual(stats["counters"], {"gvfs_round_trips": 2})
+
+    def test_histogram(self):
+        histogram = Histogram()
+        for duration in [1e-6] * 90 + [1e-3] * 9 + [1.0]:
+            histogram.add(duration)
+        self.assertEqual(histogram.count, 100)
+        self.assertEqual(histogram.max, 1.0)
+        self.assertLessEqual(histogram.get_percentile(0.5), 4e-6)
+        self.assertLessEqual(histogram.get_percentile(0.9), 4e-6)
+        self.assertGreater(histogram.get_percentile(0.99), 1e-3)
+        self.assertLessEqual(histogram.get_percentile(0.99), 2e-3)
+        self.assertEqual(sum(histogram.to_dict()["buckets"].values()), 100)
+
+    def test_max_events(self):
+        tracing.TRACER = Tracer(max_events=5)
+        for _ in range(10):
+            with span("get_file_items"):
+                pass
+        stats = tracing.TRACER.get_stats()
+        self.assertEqual(len(tracing.TRACER.events), 5)
+        self.assertEqual(stats["dropped_events"], 5)
+        self.assertEqual(stats["spans"]["get_file_items"]["count"], 10)
+
+    def test_export(self):
+        directory = mkdtemp()
+        try:
+            trace_file, histograms_file = get_trace_paths(
+                path.join(directory, "trace", "session.json"))
+            self.assertEqual(histograms_file,
+                             path.join(directory, "trace",
+                                       "session.histograms.json"))
+            with span("get_widget", args={"windows": 1}):
+                pass
+            tracing.count("hits", 3)
+            tracing.TRACER.export(trace_file, histograms_file)
+            with open(trace_file) as trace:
+                events = json.load(trace)["traceEvents"]
+            self.assertEqual(events[0]["name"], "get_widget")
+            self.assertEqual(events[0]["ph"], "X")
+            self.assertEqual(events[0]["args"], {"windows": 1})
+            self.assertEqual(events[1]["ph"], "C")
+            self.assertEqual(events[1]["args"], {"hits": 3})
+            with open(histograms_file) as histograms:
+                stats = json.load(histograms)
+            self.assertEqual(stats["spans"]["get_widget"]["count"], 1)
+        finally:
+            rmtree(directory)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -15,16 +15,28 @@ GNU General Public License for more details.
 You should have received a copy of the GNU General Public License
 along with nautilus-folder-icons. If not, see <http://www.gnu.org/licenses/>.
 """
+import os
 import unittest
-from os import getenv, path, makedirs, rmdir
+from os import getenv, path, makedirs, rmdir, symlink
+from shutil import rmtree
 from sys import path as sys_path
-from tempfile import NamedTemporaryFile
+from tempfile import NamedTemporaryFile, mkdtemp
+from time import sleep, time
 
 CURRENT_DIR = path.dirname(path.abspath(__file__))
 ABS_PATH = path.abspath(path.join(CURRENT_DIR, "../"))
 sys_path.insert(0, path.join(ABS_PATH, 'src/'))
 
-from utils import is_path, get_ext, uriparse, get_default_icon, set_default_icon, restore_default_icon
+from utils import (BatchApply, IconCatalog, IconNames, PixbufCache,
+                   RefreshScheduler, is_path, get_ext,
+                   has_icon, iter_library_icons, render_icon,
+                   render_icon_file, uriparse,
+                   get_default_icon,
+                   set_default_icon, restore_default_icon, estimate_apply,
+                   walk_folders)
+from metadata import (ChildrenIcons, MetadataWriter, get_attribute_value,
+                      iter_children_icons)
+from gi.repository import GdkPixbuf, Gio, GLib, Gtk
 
 USERNAME = getenv("SUDO_USER") or getenv("USER")
 if USERNAME:
@@ -32,6 +44,31 @@ if USERNAME:
 else:
     HOME = path.expanduser("~")
 
+SVG = """<svg xmlns="http://www.w3.org/2000/svg" width="48" height="48">
+  <rect width="48" height="48" fill="#3465a4"/>
+</svg>
+"""
+
+
+class MockWindow(object):
+    """Counts the reloads of the file manager's view."""
+
+    def __init__(self):
+        self.reloads = 0
+
+    def has_action(self, name):
+        return name == "reload"
+
+    def lookup_action(self, name):
+        window = self
+
+        class Action(object):
+
+            def emit(self, signal, parameter):
+                window.reloads += 1
+        return Action()
+
+
 class TestUtils(unittest.TestCase):
 
     def test_is_path(self):
@@ -62,8 +99,33 @@ class TestUtils(unittest.TestCase):
         self.assertEqual(get_default_icon(test_dir), "inode-directory")
         set_default_icon(test_dir, "folder-videos")
         self.assertEqual(get_default_icon(test_dir), "folder-videos")
+        # The symbolic variant is used as a fallback
+        ginfo = Gio.File.new_for_path(test_dir).query_info(
+            "metadata::symbolic-icon", Gio.FileQueryInfoFlags.NONE, None)
+        symbolic = get_attribute_value(ginfo, "metadata::symbolic-icon")
+        self.assertEqual(symbolic,
+                         IconNames.get_default().get_symbolic("folder-videos"))
         rmdir(test_dir)
 
+    def test_icon_names(self):
+        theme = Gtk.IconTheme.get_default()
+        names = IconNames(theme)
+        for icon_name in theme.list_icons("Places"):
+            self.assertIn(icon_name, names)
+        self.assertNotIn("not-an-icon-name", names)
+        self.assertFalse(has_icon("not-an-icon-name"))
+        self.assertEqual(has_icon("folder"), theme.has_icon("folder"))
+        if theme.has_icon("folder-symbolic"):
+            self.assertEqual(names.get_symbolic("folder"), "folder-symbolic")
+        self.assertIsNone(names.get_symbolic("not-an-icon-name"))
+        # The theme is only listed once for all the lookups
+        for _ in range(1000):
+            "folder" in names
+        self.assertEqual(names.builds, 1)
+        theme.emit("changed")
+        self.assertIn("folder", names)
+        self.assertEqual(names.builds, 2)
+
     def test_restore_default_icon(self):
         test_dir = path.join(HOME, NamedTemporaryFile().name)
         makedirs(test_dir)
@@ -74,5 +136,290 @@ class TestUtils(unittest.TestCase):
         self.assertEqual(get_default_icon(test_dir), "inode-directory")
         rmdir(test_dir)
 
+    def _run_batch(self, batch):
+        loop = GLib.MainLoop()
+        progress = []
+        finished = []
+
+        def on_finished(*args):
+            finished.append(True)
+            loop.quit()
+
+        batch.connect("progress", lambda b, done, total:
+                      progress.append((done, total)))
+        batch.connect("finished", on_finished)
+        batch.start()
+        if not finished:
+            loop.run()
+        return progress
+
+    def test_batch_apply(self):
+        test_dirs = [path.join(HOME, NamedTemporaryFile().name)
+                     for i in range(20)]
+        for test_dir in test_dirs:
+            makedirs(test_dir)
+        missing_dir = path.join(HOME, NamedTemporaryFile().name)
+
+        batch = BatchApply(test_dirs + [missing_dir], "folder-videos",
+                           concurrency=4)
+        progress = self._run_batch(batch)
+        self.assertEqual(progress[-1], (21, 21))
+        self.assertEqual(list(batch.failed), [missing_dir])
+        for test_dir in test_dirs:
+            self.assertIsNone(batch.report[test_dir])
+            self.assertEqual(get_default_icon(test_dir), "folder-videos")
+
+        # Restore the default icons, from a generator
+        batch = BatchApply((test_dir for test_dir in test_dirs))
+        progress = self._run_batch(batch)
+        self.assertEqual(progress[-1], (20, -1))
+        for test_dir in test_dirs:
+            self.assertEqual(get_default_icon(test_dir), "inode-directory")
+            rmdir(test_dir)
+
+    def test_batch_apply_slow_walker(self):
+        test_dirs = [path.join(HOME, NamedTemporaryFile().name)
+                     for i in range(5)]
+        for test_dir in test_dirs:
+            makedirs(test_dir)
+
+        def walk():
+            for test_dir in test_dirs:
+                # A large directory scan
+                sleep(0.2)
+                yield test_dir
+
+        # The main loop keeps running while the folders are walked
+        ticks = [time()]
+
+        def tick():
+            ticks.append(time())
+            return True
+        source_id = GLib.timeout_add(10, tick)
+        batch = BatchApply(walk(), "folder-videos")
+        progress = self._run_batch(batch)
+        GLib.source_remove(source_id)
+        self.assertEqual(progress[-1], (5, -1))
+        self.assertLess(max(b - a for a, b in zip(ticks, ticks[1:])), 0.1)
+        for test_dir in test_dirs:
+            self.assertEqual(get_default_icon(test_dir), "folder-videos")
+            rmtree(test_dir)
+
+    def test_refresh_scheduler(self):
+        window = MockWindow()
+        invalidated = []
+
+        def invalidate(folder):
+            invalidated.append(folder)
+            return not folder.startswith("/remote")
+
+        scheduler = RefreshScheduler(window, delay=10, max_targeted=5,
+                                     invalidate=invalidate,
+                                     location=lambda window: "/")
+        loop = GLib.MainLoop()
+
+        def run():
+            GLib.timeout_add(50, loop.quit)
+            loop.run()
+
+        # A burst of changes is coalesced
+        for i in range(3):
+            scheduler.changed(["/a", "/b"])
+        run()
+        self.assertEqual(sorted(invalidated), ["/a", "/b"])
+        self.assertEqual(window.reloads, 0)
+
+        # Too many folders, the view is reloaded once
+        del invalidated[:]
+        scheduler.changed(["/{}".format(i) for i in range(10)])
+        scheduler.changed(["/c"])
+        run()
+        self.assertEqual(invalidated, [])
+        self.assertEqual(window.reloads, 1)
+
+        # A folder that can't be invalidated falls back to a reload
+        scheduler.changed(["/remote"])
+        scheduler.flush()
+        self.assertEqual(window.reloads, 2)
+        self.assertEqual(scheduler.invalidations, 2)
+
+        # So does a folder that isn't shown, it's left untouched
+        del invalidated[:]
+        scheduler.changed(["/a/b"])
+        scheduler.flush()
+        self.assertEqual(invalidated, [])
+        self.assertEqual(window.reloads, 3)
+
+    def test_metadata_writer(self):
+        test_dir = path.join(HOME, NamedTemporaryFile().name)
+        makedirs(test_dir)
+        writer = MetadataWriter()
+        # Nothing to restore
+        self.assertFalse(writer.write(test_dir, None))
+        self.assertTrue(writer.write(test_dir, "folder-videos"))
+        self.assertFalse(writer.write(test_dir, "folder-videos"))
+        self.assertEqual(get_default_icon(test_dir), "folder-videos")
+        # From an icon name to a path, then back to the default icon
+        self.assertTrue(writer.write(test_dir, "/usr/share/icon.png"))
+        self.assertEqual(get_default_icon(test_dir), "/usr/share/icon.png")
+        self.assertTrue(writer.write(test_dir, None))
+        self.assertFalse(writer.write(test_dir, None))
+        self.assertEqual(get_default_icon(test_dir), "inode-directory")
+        self.assertEqual(writer.get_stats(), {"written": 3, "skipped": 3})
+        rmdir(test_dir)
+
+    def test_walk_folders(self):
+        root = mkdtemp()
+        for folder in ["a/b/c", "a/.git/objects", "d/e", "build"]:
+            makedirs(path.join(root, folder))
+        open(path.join(root, "a", "file"), "w").close()
+        # A symlink loop is never followed
+        symlink(root, path.join(root, "d", "loop"))
+
+        def walk(*args, **kwargs):
+            return sorted(path.relpath(folder, root)
+                          for folder in walk_folders(root, *args, **kwargs))
+
+        self.assertEqual(walk(), [".", "a", "a/.git", "a/.git/objects",
+                                  "a/b", "a/b/c", "build", "d", "d/e"])
+        self.assertEqual(walk(max_depth=0), ["."])
+        self.assertEqual(walk(max_depth=1), [".", "a", "build", "d"])
+        self.assertEqual(walk(exclude=[".git", "build"]),
+                         [".", "a", "a/b", "a/b/c", "d", "d/e"])
+        self.assertEqual(walk(include=["[bce]"]), ["a/b", "a/b/c", "d/e"])
+
+        count, estimate = estimate_apply(walk_folders(root), sample=2)
+        self.assertEqual(count, 9)
+        self.assertGreater(estimate, 0)
+        rmtree(root)
+
+    def test_iter_children_icons(self):
+        root = mkdtemp(dir=HOME)
+        for name in ["a", "b", "c"]:
+            makedirs(path.join(root, name))
+        open(path.join(root, "file"), "w").close()
+        set_default_icon(path.join(root, "b"), "folder-videos")
+        expected = [(path.join(root, name), get_default_icon(path.join(root,
+                                                                       name)))
+                    for name in ["a", "b", "c"]]
+
+        self.assertEqual(sorted(iter_children_icons(root)), expected)
+        self.assertEqual(len(list(iter_children_icons(root, False))), 4)
+
+        # Async variant
+        loop = GLib.MainLoop()
+        icons = []
+        errors = []
+        reader = ChildrenIcons(root)
+        reader.connect("icons", lambda r, batch: icons.extend(batch))
+        reader.connect("finished", lambda r, error: (errors.append(error),
+                                                     loop.quit()))
+        reader.start()
+        loop.run()
+        self.assertEqual(errors, [None])
+        self.assertEqual(sorted(icons), expected)
+        rmtree(root)
+
+    def test_icon_catalog(self):
+        theme = Gtk.IconTheme.get_default()
+        catalog = IconCatalog(theme)
+        names = [entry.name for entry in catalog.iter_entries()]
+        self.assertTrue(catalog.is_complete)
+        self.assertEqual(names,
+                         [entry.name for entry in catalog.iter_entries()])
+        stats = catalog.get_stats()
+        self.assertEqual(stats["entries"], len(names))
+        self.assertEqual(stats["misses"], 1)
+        self.assertEqual(stats["hits"], 1)
+
+        # A theme change invalidates the catalog
+        theme.emit("changed")
+        self.assertFalse(catalog.is_complete)
+        self.assertEqual(names,
+                         [entry.name for entry in catalog.iter_entries()])
+        self.assertEqual(catalog.get_stats()["misses"], 2)
+
+    def test_render_icon_file(self):
+        tmp_dir = mkdtemp()
+        icon = path.join(tmp_dir, "wide.png")
+        GdkPixbuf.Pixbuf.new(GdkPixbuf.Colorspace.RGB, True, 8,
+                             200, 100).savev(icon, "png", [], [])
+        pixbufs = render_icon_file(icon, [64, 32])
+        # The bitmap's ratio is kept at every size
+        self.assertEqual((pixbufs[64].get_width(),
+                          pixbufs[64].get_height()), (64, 32))
+        self.assertEqual((pixbufs[32].get_width(),
+                          pixbufs[32].get_height()), (32, 16))
+        rmtree(tmp_dir)
+
+    def test_library_icons(self):
+        tmp_dir = mkdtemp()
+        environ = dict(os.environ)
+        try:
+            os.environ["XDG_CACHE_HOME"] = path.join(tmp_dir, "cache")
+            os.environ["XDG_DATA_HOME"] = path.join(tmp_dir, "data")
+            library = path.join(tmp_dir, "data", "nautilus-folder-icons",
+                                "icons")
+            makedirs(library)
+            icon = path.join(library, "blue.svg")
+            with open(icon, "w") as icon_file:
+                icon_file.write(SVG)
+            # Rendered now, not read from the cache
+            icons = list(iter_library_icons(32))
+            self.assertEqual([name for name, pixbuf in icons], [icon])
+            self.assertEqual(icons[0][1].get_width(), 32)
+            # Read from the cache
+            icons = list(iter_library_icons(32))
+            self.assertEqual(icons[0][1].get_width(), 32)
+
+            # The icons added later show up once the chooser opens
+            catalog = IconCatalog(Gtk.IconTheme.get_default(), 32)
+            names = [entry.name for entry in catalog.iter_entries()]
+            self.assertFalse(catalog.refresh_library())
+            other_icon = path.join(library, "red.svg")
+            with open(other_icon, "w") as icon_file:
+                icon_file.write(SVG)
+            self.assertTrue(catalog.refresh_library())
+            self.assertFalse(catalog.is_complete)
+            self.assertEqual([entry.name for entry in catalog.iter_entries()],
+                             names + [other_icon])
+        finally:
+            os.environ.clear()
+            os.environ.update(environ)
+            rmtree(tmp_dir)
+
+    def test_pixbuf_cache(self):
+        theme = Gtk.IconTheme.get_default()
+        cache = PixbufCache(theme, max_size=2)
+        pixbuf = cache.get("folder", 96)
+        self.assertIs(cache.get("folder", 96), pixbuf)
+        # HiDPI icons are rendered at the real size
+        self.assertEqual(cache.get("folder", 96, 2).get_width(), 192)
+        self.assertEqual(cache.get_stats()["hit_rate"], 1.0 / 3)
+        # The least recently used icon is evicted
+        cache.get("user-home", 96)
+        self.assertEqual(cache.get_stats()["size"], 2)
+        self.assertIsNot(cache.get("folder", 96), pixbuf)
+        # Missing icons fall back to image-missing
+        cache.get("not-an-icon-name", 96)
+        self.assertEqual(cache.get("/not/a/path.svg", 96).get_width(), 96)
+
+        theme.emit("changed")
+        self.assertEqual(cache.get_stats()["size"], 0)
+
+    def test_render_icon(self):
+        theme = Gtk.IconTheme.get_default()
+        icon_name = [name for name in theme.list_icons("Places")
+                     if name.startswith("folder")][0]
+        pixbufs = render_icon(theme, icon_name, [64, 96], 2)
+        self.assertEqual(sorted(pixbufs), [64, 96])
+        self.assertEqual(max(pixbufs[64].get_width(),
+                             pixbufs[64].get_height()), 128)
+        self.assertEqual(max(pixbufs[96].get_width(),
+                             pixbufs[96].get_height()), 192)
+        # Only the folder icons are rendered
+        self.assertEqual(render_icon(theme, "user-home", [64]), {})
+
+
 if __name__ == "__main__":
     unittest.main()
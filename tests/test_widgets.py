@@ -0,0 +1,177 @@
+"""
+Change your nautilus directories icons easily
+
+Author : Bilal Elmoussaoui (bil.elmoussaoui@gmail.com)
+Website : https://github.com/bilelmoussaoui/nautilus-folder-icons
+Licence : GPL-3.0
+nautilus-folder-icons is free software: you can redistribute it and/or
+modify it under the terms of the GNU General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+nautilus-folder-icons is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+You should have received a copy of the GNU General Public License
+along with nautilus-folder-icons. If not, see <http://www.gnu.org/licenses/>.
+"""
+import os
+import unittest
+from os import path, rmdir
+from shutil import rmtree
+from sys import path as sys_path
+from tempfile import mkdtemp
+from time import time
+
+CURRENT_DIR = path.dirname(path.abspath(__file__))
+ABS_PATH = path.abspath(path.join(CURRENT_DIR, "../"))
+sys_path.insert(0, path.join(ABS_PATH, 'src/'))
+
+from gi import require_version
+require_version("Gtk", "3.0")
+from gi.repository import GLib, Gtk
+
+HAS_DISPLAY = Gtk.init_check(None)[0]
+
+if HAS_DISPLAY:
+    from utils import _PREWARMED, IconCatalog, get_chooser
+    from widgets import FolderIconChooser
+
+# Maximum time (in seconds) the main loop is allowed to be blocked
+MAX_STALL = 0.1
+# Maximum time (in seconds) before the first icon is shown
+MAX_FIRST_ICON = 0.1
+# The same, when the icons are decoded for the first time
+MAX_COLD_FIRST_ICON = 0.5
+# Interval (in milliseconds) of the main loop probe
+PROBE_INTERVAL = 5
+
+
+@unittest.skipUnless(HAS_DISPLAY, "A display is required")
+class TestFolderIconChooser(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = mkdtemp()
+
+    def tearDown(self):
+        rmdir(self.folder)
+
+    def _run_chooser(self):
+        """Open the chooser & record the main loop stalls until loaded."""
+        loop = GLib.MainLoop()
+        stats = {"stalls": [], "first_icon": None}
+        start = time()
+        chooser = FolderIconChooser([self.folder])
+        chooser.show_all()
+        last_tick = [time()]
+        # The icon theme is read on the main loop by the constructor
+        stats["stalls"].append(last_tick[0] - start)
+
+        def probe():
+            now = time()
+            stats["stalls"].append(now - last_tick[0])
+            last_tick[0] = now
+            if (stats["first_icon"] is None
+                    and len(chooser._store)):
+                stats["first_icon"] = now - start
+            return True
+
+        def on_loaded(*args):
+            GLib.idle_add(loop.quit)
+
+        chooser.connect("loaded", on_loaded)
+        GLib.timeout_add(PROBE_INTERVAL, probe,
+                         priority=GLib.PRIORITY_HIGH)
+        GLib.timeout_add_seconds(60, loop.quit)
+        loop.run()
+        chooser.destroy()
+        return stats
+
+    def test_main_loop_stalls(self):
+        # Nothing is loaded nor cached yet
+        cache_home = os.environ.get("XDG_CACHE_HOME")
+        cache_dir = mkdtemp()
+        os.environ["XDG_CACHE_HOME"] = cache_dir
+        IconCatalog._default = None
+        try:
+            stats = self._run_chooser()
+            self.assertLess(max(stats["stalls"]), MAX_STALL)
+            self.assertIsNotNone(stats["first_icon"])
+            self.assertLess(stats["first_icon"], MAX_COLD_FIRST_ICON)
+            # The shared catalog is loaded
+            stats = self._run_chooser()
+            self.assertLess(max(stats["stalls"]), MAX_STALL)
+            self.assertIsNotNone(stats["first_icon"])
+            self.assertLess(stats["first_icon"], MAX_FIRST_ICON)
+        finally:
+            if cache_home is None:
+                del os.environ["XDG_CACHE_HOME"]
+            else:
+                os.environ["XDG_CACHE_HOME"] = cache_home
+            rmtree(cache_dir)
+
+    def test_retarget(self):
+        loop = GLib.MainLoop()
+        chooser = FolderIconChooser([self.folder], reusable=True)
+        chooser.connect("loaded", lambda *args: GLib.idle_add(loop.quit))
+        GLib.timeout_add_seconds(60, loop.quit)
+        loop.run()
+        chooser.show_all()
+        self.assertFalse(chooser.can_retarget)
+        # Closing a reusable chooser only hides it
+        chooser._close_window(chooser)
+        self.assertFalse(chooser.get_visible())
+        self.assertTrue(chooser.can_retarget)
+        count = len(chooser._store)
+        other_folder = mkdtemp()
+        chooser.retarget([other_folder])
+        self.assertEqual(chooser._subtitle.get_text(), other_folder)
+        self.assertEqual(len(chooser._store), count)
+        # Another chooser rebuilt the catalog since
+        IconCatalog.get_default()._on_theme_changed()
+        for _ in IconCatalog.get_default().iter_entries():
+            pass
+        self.assertTrue(IconCatalog.get_default().is_complete)
+        self.assertFalse(chooser.can_retarget)
+        chooser.destroy()
+        rmdir(other_folder)
+
+    def test_search_while_loading(self):
+        chooser = FolderIconChooser([self.folder])
+        # The icons are loaded, not added to the icon view yet
+        chooser.join(60)
+        chooser._search_entry.set_text("folder")
+        chooser._on_search()
+        loop = GLib.MainLoop()
+        chooser.connect("loaded", lambda *args: GLib.idle_add(loop.quit))
+        GLib.timeout_add_seconds(60, loop.quit)
+        loop.run()
+        self.assertTrue(len(chooser._store))
+        for row in chooser._store:
+            self.assertIn("folder", (row[0] + row[2]).lower())
+        chooser.destroy()
+
+    def test_get_chooser(self):
+        prewarmed = FolderIconChooser([self.folder], reusable=True)
+        _PREWARMED["chooser"] = prewarmed
+        try:
+            prewarmed.show_all()
+            # The prewarmed chooser is in use, the new one isn't kept
+            chooser = get_chooser([self.folder])
+            self.assertIsNot(chooser, prewarmed)
+            self.assertFalse(chooser._reusable)
+            self.assertIs(_PREWARMED["chooser"], prewarmed)
+            chooser.destroy()
+        finally:
+            _PREWARMED.clear()
+            prewarmed.destroy()
+
+    def test_cancel_on_close(self):
+        chooser = FolderIconChooser([self.folder])
+        chooser.destroy()
+        chooser.join(10)
+        self.assertFalse(chooser.is_alive())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+"""
+Change your nautilus directories icons easily
+
+Author : Bilal Elmoussaoui (bil.elmoussaoui@gmail.com)
+Website : https://github.com/bilelmoussaoui/nautilus-folder-icons
+Licence : GPL-3.0
+nautilus-folder-icons is free software: you can redistribute it and/or
+modify it under the terms of the GNU General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+nautilus-folder-icons is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+You should have received a copy of the GNU General Public License
+along with nautilus-folder-icons. If not, see <http://www.gnu.org/licenses/>.
+"""
+import gc
+import unittest
+from os import path
+from sys import path as sys_path
+
+CURRENT_DIR = path.dirname(path.abspath(__file__))
+ABS_PATH = path.abspath(path.join(CURRENT_DIR, "../"))
+sys_path.insert(0, path.join(ABS_PATH, 'src/'))
+
+from windows import WindowRegistry, WindowState
+
+
+class FakeWindow(object):
+    """Mimics the destroy signal of a Gtk.Window."""
+
+    def __init__(self):
+        self._handlers = []
+
+    def connect(self, signal, handler):
+        self._handlers.append(handler)
+
+    def destroy(self):
+        for handler in self._handlers:
+            handler(self)
+
+
+class TestWindows(unittest.TestCase):
+
+    def setUp(self):
+        self.setups = []
+        self.registry = WindowRegistry(
+            lambda window, state: self.setups.append(window))
+
+    def test_folder(self):
+        state = WindowState()
+        self.assertIsNone(state.folder)
+        state.uri = "file:///home/user/My%20Music"
+        self.assertEqual(state.folder, "/home/user/My Music")
+        state.uri = "trash:///"
+        self.assertIsNone(state.folder)
+
+    def test_setup_once(self):
+        windows = [FakeWindow() for _ in range(3)]
+        for i in range(100):
+            for window in windows:
+                self.registry.update(window, "file:///{}".format(i))
+        self.assertEqual(self.setups, windows)
+        self.assertEqual(self.registry.get(windows[1]).folder, "/99")
+        self.assertEqual(len(self.registry), 3)
+
+    def test_cleanup(self):
+        window = FakeWindow()
+        self.registry.update(window, "file:///")
+        window.destroy()
+        self.assertIsNone(self.registry.get(window))
+        self.assertEqual(len(self.registry), 0)
+        # The windows aren't kept alive by the registry
+        registry = WindowRegistry()
+        registry.update(FakeWindow(), "file:///")
+        gc.collect()
+        self.assertEqual(len(registry), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()